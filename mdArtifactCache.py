@@ -0,0 +1,145 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import hashlib, os, tarfile, tempfile, mdCommands, mdDownloadCache, mdInstall, mdPath, mdStrings, utilityFunctions
+
+from mdLogger import *
+
+#Installs are staged while the artifact cache is used, the manifest of the stage tells
+# exactly which files a target installed, whatever else writes to the prefix meanwhile
+
+def getSourceHash(target, options):
+    #Content based so the hash is the same on every machine, empty when it cannot be known cheaply
+    if target.checksum != "":
+        return "checksum:" + target.checksum.strip().lower()
+    location = target.origPath or target.path
+    pathType = mdPath.classify(location)
+    if pathType == mdPath.pathTypeFile:
+        return "sha256:" + mdDownloadCache.hashFile(location, "sha256")
+    elif pathType == mdPath.pathTypeURL:
+        objectPath = options.getDownloadCache().lookup(location)
+        if objectPath != "":
+            return "sha256:" + os.path.basename(objectPath)
+    return ""
+
+def getArtifactFingerprint(target, options):
+    sourceHash = getSourceHash(target, options)
+    if sourceHash == "":
+        return ""
+    fingerprint = hashlib.sha1()
+    fingerprint.update(sourceHash + "\0")
+    fingerprint.update(options.getDefine(mdStrings.mdDefinePrefix) + "\0")
+    for stepName in ("patch", "preconfig", "config", "build", "install"):
+        if target.hasStep(stepName):
+            fingerprint.update(stepName + "\0" + mdCommands.getCommand(stepName, target, options) + "\0")
+    for dependancyTarget in sorted(target.dependancyTargets, key=lambda dependancy: dependancy.name):
+        if dependancyTarget.artifactFingerprint == "":
+            return ""
+        fingerprint.update(dependancyTarget.artifactFingerprint + "\0")
+    return fingerprint.hexdigest()
+
+def getInstalledFiles(target, prefix):
+    #Paths relative to the prefix, None when the install cannot be stored as a whole
+    manifest = target.installManifest
+    if manifest == None or len(manifest) == 0:
+        Logger().writeMessage("Install did not go through DESTDIR, not stored in the artifact cache", target.name, "install")
+        return None
+    prefix = utilityFunctions.includeTrailingPathDelimiter(os.path.abspath(prefix))
+    files = []
+    for installedPath in manifest.keys():
+        if not installedPath.startswith(prefix):
+            Logger().writeMessage("Installed outside of the prefix, not stored in the artifact cache", target.name, "install")
+            return None
+        files.append(installedPath[len(prefix):])
+    #Restored installs can be uninstalled like built ones
+    files.append(os.path.relpath(mdInstall.getManifestPath(target.name, prefix), prefix))
+    files.sort()
+    return files
+
+class ArtifactCache:
+    def __init__(self, path):
+        self.path = utilityFunctions.includeTrailingPathDelimiter(path)
+
+    def __str__(self):
+        return "ArtifactCache(" + self.path + ")"
+
+    def getEntryPath(self, fingerprint):
+        return self.path + fingerprint + ".tar.gz"
+
+    def hasEntry(self, fingerprint):
+        return os.path.isfile(self.getEntryPath(fingerprint))
+
+    def store(self, fingerprint, prefix, files):
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                #Another machine sharing the cache may have created it first
+                if not os.path.isdir(self.path):
+                    raise
+        fd, tempPath = tempfile.mkstemp(prefix=".tmp-", dir=self.path)
+        os.close(fd)
+        try:
+            tar = tarfile.open(tempPath, "w:gz")
+            try:
+                for path in files:
+                    tar.add(os.path.join(prefix, path), path, recursive=False)
+            finally:
+                tar.close()
+            os.chmod(tempPath, 0644)
+            #Rename is atomic, readers never see a partial entry
+            os.rename(tempPath, self.getEntryPath(fingerprint))
+        except:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+
+    def restore(self, target, options):
+        fingerprint = target.artifactFingerprint
+        if fingerprint == "" or not self.hasEntry(fingerprint):
+            return False
+        try:
+            utilityFunctions.untar(self.getEntryPath(fingerprint), options.getDefine(mdStrings.mdDefinePrefix))
+        except (IOError, OSError, tarfile.TarError), e:
+            Logger().writeError("Artifact cache entry " + fingerprint + " could not be restored: " + str(e), target.name, "install")
+            return False
+        #Dependents' state fingerprints stay stable whether this target was built or restored
+        target.stepFingerprints["install"] = "artifact:" + fingerprint
+        if options.stateDatabase != None:
+            #Kept for builds leaving this target out
+            options.stateDatabase.setRecord(target.name, "install", target.stepFingerprints["install"], target.path)
+        Logger().writeMessage("Installed from artifact cache entry " + fingerprint, target.name, "install")
+        return True
+
+    def install(self, target, options, runStep=mdCommands.buildStepActor):
+        prefix = options.getDefine(mdStrings.mdDefinePrefix)
+        target.installManifest = None
+        if not runStep("install", target, options):
+            return False
+        files = getInstalledFiles(target, prefix)
+        if files == None:
+            return True
+        try:
+            self.store(target.artifactFingerprint, prefix, files)
+        except (IOError, OSError, tarfile.TarError), e:
+            Logger().writeError("Artifact cache entry could not be stored: " + str(e), target.name, "install")
+        return True
@@ -24,10 +24,13 @@ import os, re, mdMake, mdStrings, mdTarget, utilityFunctions
 
 from mdLogger import *
 
+markerFiles = ("configure", "configure.ac", "configure.in")
+
 def isAutoToolsProject(path):
     path = utilityFunctions.includeTrailingPathDelimiter(path)
-    if os.path.exists(path + "configure") or os.path.exists(path + "configure.ac") or os.path.exists(path + "configure.in"):
-        return True
+    for markerFile in markerFiles:
+        if os.path.exists(path + markerFile):
+            return True
     return False
 
 def getInstallDir(command):
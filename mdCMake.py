@@ -24,10 +24,13 @@ import os, re, mdMake, mdStrings, mdTarget, utilityFunctions
 
 from mdLogger import *
 
+markerFiles = ("CMakeLists.txt",)
+
 def isCMakeProject(path):
     path = utilityFunctions.includeTrailingPathDelimiter(path)
-    if os.path.exists(path + "CMakeLists.txt"):
-        return True
+    for markerFile in markerFiles:
+        if os.path.exists(path + markerFile):
+            return True
     return False
 
 def getInstallDir(command):
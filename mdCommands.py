@@ -21,7 +21,7 @@
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
 import os, time, utilityFunctions
-import mdAutoTools, mdCMake, mdMake, mdOptions, mdPython, mdStrings, mdTarget, utilityFunctions
+import mdAutoTools, mdCMake, mdInstall, mdLayout, mdMake, mdOptions, mdPython, mdState, mdStrings, mdTarget, utilityFunctions
 
 from mdLogger import *
 
@@ -35,9 +35,22 @@ def buildStepActor(stepName, target, options, verbose=True):
 
     timeStart = time.time()
 
+    stateDatabase = options.stateDatabase
+    fingerprint = ""
+    resourceUsage = dict()
     if target.hasStep(stepName):
         command = getCommand(stepName, target, options)
-        if command != "":
+        if stateDatabase != None and stepName != "clean":
+            fingerprint = mdState.getStepFingerprint(stepName, target, command)
+            target.stepFingerprints[stepName] = fingerprint
+            target.lastFingerprintedStep = stepName
+        if command != "" and fingerprint != "" and stepName in mdState.reusableSteps and\
+           stateDatabase.isStepCurrent(target.name, stepName, fingerprint):
+            target.path = str(stateDatabase.getRecord(target.name, stepName)["path"])
+            skipReason = "Step is up to date"
+        elif command != "":
+            if fingerprint != "" and stepName in ("fetch", "unpack"):
+                __removeStaleOutputPath(target, options)
             isPythonCommand, namespace, function = mdPython.parsePythonCommand(command)
             if isPythonCommand:
                 success = mdPython.callPythonCommand(namespace, function, target, options)
@@ -47,7 +60,15 @@ def buildStepActor(stepName, target, options, verbose=True):
                     returnCode = 0
             else:
                 outFd = Logger().getOutFd(target.name, stepName)
-                returnCode = utilityFunctions.executeSubProcess(command, target.path, outFd, options.verbose)
+                environment = None
+                if options.jobServer != None:
+                    environment = options.jobServer.getEnvironment()
+                staged = stepName == "install" and options.stagedInstall
+                if staged:
+                    environment = mdInstall.getInstallEnvironment(mdInstall.prepareStage(target, options), environment)
+                returnCode = utilityFunctions.executeSubProcess(command, target.path, outFd, options.verbose, environment=environment, resourceUsage=resourceUsage)
+                if staged and returnCode == 0 and not mdInstall.mergeStage(target, options):
+                    returnCode = 1
         else:
             skipReason = "Command could not be determined by MixDown"
     else:
@@ -56,18 +77,40 @@ def buildStepActor(stepName, target, options, verbose=True):
     timeFinished = time.time()
     timeElapsed = timeFinished - timeStart
 
+    if "peakMemory" in resourceUsage and options.buildHistory != None:
+        #Kept for failed steps too, they are likely to need as much the next time
+        options.buildHistory.recordPeakMemory(target.name, stepName, resourceUsage["peakMemory"])
+
+    if returnCode != None:
+        #The step may have generated build files, what the tree holds has to be probed again
+        mdLayout.invalidate(target.path)
+
     if returnCode == None:
         if verbose:
             Logger().reportSkipped(target.name, stepName, skipReason)
     elif returnCode != 0:
         if verbose:
             Logger().reportFailure(target.name, stepName, timeElapsed, returnCode)
+        if fingerprint != "":
+            stateDatabase.removeRecord(target.name, stepName)
         return False
     else:
         if verbose:
             Logger().reportSuccess(target.name, stepName, timeElapsed)
+        if options.buildHistory != None:
+            options.buildHistory.recordStep(target.name, stepName, timeElapsed)
+        if fingerprint != "":
+            stateDatabase.setRecord(target.name, stepName, fingerprint, target.path)
+        elif stateDatabase != None and stepName == "clean":
+            stateDatabase.removeTarget(target.name)
     return True
 
+def __removeStaleOutputPath(target, options):
+    #Output directories kept from an earlier run are recreated by fetch and unpack
+    if target.outputPath != "" and os.path.isdir(target.outputPath) and \
+       os.path.abspath(target.outputPath) != os.path.abspath(target.path):
+        utilityFunctions.removeDirInBackground(target.outputPath, utilityFunctions.getTrashDir(options.buildDir))
+
 def getCommand(stepName, target, options):
     command = ""
     if target.commands.has_key(stepName) and target.commands[stepName] != "":
@@ -104,45 +147,42 @@ def __getPatchCommand(target):
 
 def __getPreconfigureCommand(target):
     command = ""
-    path = utilityFunctions.includeTrailingPathDelimiter(target.path)
-    if mdCMake.isCMakeProject(path):
+    layout = mdLayout.getLayout(target.path)
+    if layout.isCMake:
         command = mdCMake.getPreconfigureCommand()
-    elif os.path.exists(path + "autogen.sh"):
+    elif layout.hasFile("autogen.sh"):
         command = "./autogen.sh"
-    elif os.path.exists(path + "buildconf"):
+    elif layout.hasFile("buildconf"):
         command = "./buildconf"
-    elif mdAutoTools.isAutoToolsProject(path):
+    elif layout.isAutoTools:
         command = mdAutoTools.getPreconfigureCommand()
     return command
 
 def __getConfigureCommand(target):
     command = ""
-    path = utilityFunctions.includeTrailingPathDelimiter(target.path)
-    if mdCMake.isCMakeProject(path):
+    layout = mdLayout.getLayout(target.path)
+    if layout.isCMake:
         command = mdCMake.getConfigureCommand()
-    elif os.path.exists(path + "Configure"):
+    elif layout.hasFile("Configure"):
         command = "./Configure"
-    elif mdAutoTools.isAutoToolsProject(path):
+    elif layout.isAutoTools:
         command = mdAutoTools.getConfigureCommand(target)
     return command
 
 def __getBuildCommand(target):
     command = ""
-    path = utilityFunctions.includeTrailingPathDelimiter(target.path)
-    if mdMake.isMakeProject(path):
+    if mdLayout.getLayout(target.path).isMake:
         command = mdMake.getBuildCommand()
     return command
 
 def __getInstallCommand(target):
     command = ""
-    path = utilityFunctions.includeTrailingPathDelimiter(target.path)
-    if mdMake.isMakeProject(path):
+    if mdLayout.getLayout(target.path).isMake:
         command = mdMake.getInstallCommand()
     return command
 
 def __getCleanCommand(target):
     command = ""
-    path = utilityFunctions.includeTrailingPathDelimiter(target.path)
-    if mdMake.isMakeProject(path):
+    if mdLayout.getLayout(target.path).isMake:
         command = mdMake.getCleanCommand()
     return command
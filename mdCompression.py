@@ -0,0 +1,86 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, subprocess, tarfile, mdTools
+
+readBlockSize = 1024 * 1024
+
+#Leading bytes of each compression format tarballs come in
+magicNumbers = [("gz", "\x1f\x8b"), ("bz2", "BZh"), ("xz", "\xfd7zXZ\x00")]
+
+#Multi-threaded decompressors per format, the first one found on PATH is used.
+# xz is listed even though it only decompresses in parallel from 5.4 on,
+# python's tarfile cannot read xz at all.
+decompressors = {"gz": [["pigz", "-d", "-c"]],
+                 "bz2": [["pbzip2", "-d", "-c"], ["lbzip2", "-d", "-c"]],
+                 "xz": [["xz", "-d", "-c", "-T0"]]}
+
+def getCompression(path):
+    f = open(path, "rb")
+    try:
+        header = f.read(6)
+    finally:
+        f.close()
+    for compression, magicNumber in magicNumbers:
+        if header.startswith(magicNumber):
+            return compression
+    return ""
+
+def getDecompressCommand(compression):
+    for command in decompressors.get(compression, []):
+        executable = mdTools.findExecutable(command[0])
+        if executable != "":
+            return [executable] + command[1:]
+    return []
+
+def isTarFile(path):
+    if tarfile.is_tarfile(path):
+        return True
+    return getCompression(path) == "xz" and getDecompressCommand("xz") != []
+
+def openTar(path):
+    #Returns a stream opened tar and the decompressor process feeding it, None when tarfile
+    # decompresses on its own because no parallel decompressor is installed
+    command = getDecompressCommand(getCompression(path))
+    if command == []:
+        return tarfile.open(path, "r|*"), None
+    process = subprocess.Popen(command + [path], stdout=subprocess.PIPE)
+    try:
+        return tarfile.open(fileobj=process.stdout, mode="r|"), process
+    except:
+        closeTar(None, process, False)
+        raise
+
+def closeTar(tar, process, checkDecompressor=True):
+    if tar != None:
+        tar.close()
+    if process == None:
+        return
+    if checkDecompressor:
+        #tarfile stops at the end of archive marker, the decompressor gets a broken pipe
+        # if the zero padding after it is left unread
+        while process.stdout.read(readBlockSize) != "":
+            pass
+    process.stdout.close()
+    returnCode = process.wait()
+    if checkDecompressor and returnCode != 0:
+        raise tarfile.TarError("Decompressor exited with error code " + str(returnCode))
@@ -20,21 +20,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, mdLogger, utilityFunctions
+import os, mdLogger, mdTools, utilityFunctions
 
 _isCvsInstalled = None
 
 def isCvsInstalled():
     global _isCvsInstalled
     if _isCvsInstalled == None:
-        outFile = open(os.devnull, "w")
-        try:
-            returnCode = utilityFunctions.executeSubProcess("cvs --version", outFileHandle = outFile)
-        except:
-            #Assume any exceptions means Cvs is not installed
-            returnCode = 1
-        outFile.close()
-        if returnCode == 0:
+        if mdTools.isToolInstalled("cvs", "cvs --version"):
             _isCvsInstalled = True
         else:
             mdLogger.Logger().writeMessage("Cvs is not installed, cvs repositories will fail to be checked out")
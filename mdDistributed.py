@@ -0,0 +1,302 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import hmac, json, os, Queue, socket, SocketServer, sys, threading, time, mdCommands, mdLayout, mdOptions, mdScheduler, mdTarget
+
+from mdLogger import *
+
+#Coordinator and workers exchange one JSON object per line. A work item is a single
+# (target, step) node; the directories it uses, including the prefix, have to be at the
+# same paths on every node, for example on a shared filesystem.
+#Workers run whatever commands they are sent, so a connection has to start with a hello
+# carrying the secret both sides read from the environment.
+protocolVersion = 2
+secretVariable = "MIXDOWN_WORKER_SECRET"
+targetFields = ["name", "path", "outputPath", "outputPathSpecified", "checksum", "commands", "skipSteps"]
+optionFields = ["buildDir", "downloadDir", "logDir", "tempDir", "stateDir", "verbose", "streamDownloads", "stagedInstall"]
+
+def parseAddress(address):
+    host, separator, port = address.strip().rpartition(":")
+    if not port.isdigit():
+        raise ValueError("Worker address must be given as [host:]port, " + address)
+    if host == "":
+        #Only reachable from this machine unless a host is given
+        host = "127.0.0.1"
+    return host, int(port)
+
+def getSecret():
+    secret = os.environ.get(secretVariable, "")
+    if secret == "":
+        raise ValueError(secretVariable + " has to be set to the secret shared by the coordinator and its workers")
+    return secret
+
+def sendMessage(outFile, message):
+    outFile.write(json.dumps(message) + "\n")
+    outFile.flush()
+
+def receiveMessage(inFile):
+    line = inFile.readline()
+    if line == "":
+        return None
+    return __toStr(json.loads(line))
+
+def __toStr(value):
+    #json gives unicode strings, the rest of MixDown calls str methods on them
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    if isinstance(value, list):
+        return [__toStr(item) for item in value]
+    if isinstance(value, dict):
+        converted = dict()
+        for key, item in value.items():
+            converted[__toStr(key)] = __toStr(item)
+        return converted
+    return value
+
+def packTarget(target):
+    state = dict()
+    for field in targetFields:
+        state[field] = getattr(target, field)
+    return state
+
+def unpackTarget(state):
+    target = mdTarget.Target(state["name"])
+    for field in targetFields:
+        setattr(target, field, state[field])
+    return target
+
+def packOptions(options):
+    state = dict()
+    for field in optionFields:
+        state[field] = getattr(options, field)
+    defines = dict()
+    for key, value in options._defines.items():
+        if value != None:
+            defines[key] = value
+    state["defines"] = defines
+    return state
+
+def unpackOptions(state):
+    options = mdOptions.Options()
+    for field in optionFields:
+        setattr(options, field, state[field])
+    for key, value in state["defines"].items():
+        options.setDefine(key, value)
+    return options
+
+#--------------------------------Worker---------------------------------
+def runWorkItem(item):
+    target = unpackTarget(item["target"])
+    options = unpackOptions(item["options"])
+    #The target's earlier steps may have run on other workers and changed its tree
+    mdLayout.invalidate(target.path)
+    try:
+        succeeded = mdCommands.buildStepActor(item["step"], target, options)
+    except Exception, e:
+        Logger().writeError("Unexpected exception while running step: " + str(e), target.name, item["step"])
+        succeeded = False
+    return {"type": "result", "succeeded": succeeded, "path": target.path, "outputPath": target.outputPath,
+            "installManifest": target.installManifest}
+
+class WorkerHandler(SocketServer.StreamRequestHandler):
+    #Each connection is one job slot of the worker, its steps run one after another
+    def handle(self):
+        authenticated = False
+        while True:
+            try:
+                message = receiveMessage(self.rfile)
+            except ValueError:
+                return
+            if message == None:
+                return
+            if message.get("type") == "hello":
+                if message.get("version") != protocolVersion:
+                    sendMessage(self.wfile, {"type": "error", "message": "Worker speaks protocol version " + str(protocolVersion)})
+                    return
+                if not hmac.compare_digest(str(message.get("secret")), self.server.secret):
+                    sendMessage(self.wfile, {"type": "error", "message": "Wrong secret"})
+                    return
+                authenticated = True
+                sendMessage(self.wfile, {"type": "hello", "version": protocolVersion, "jobSlots": self.server.jobSlots})
+            elif not authenticated:
+                sendMessage(self.wfile, {"type": "error", "message": "Connection has to start with a hello"})
+                return
+            elif message.get("type") == "step":
+                sendMessage(self.wfile, runWorkItem(message))
+            else:
+                sendMessage(self.wfile, {"type": "error", "message": "Unknown message type"})
+
+class WorkerServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, secret, jobSlots=1):
+        SocketServer.TCPServer.__init__(self, address, WorkerHandler)
+        self.secret = secret
+        self.jobSlots = jobSlots
+
+def runWorker(address, jobSlots=1):
+    server = WorkerServer(address, getSecret(), jobSlots)
+    host, port = server.server_address
+    #The first line tells whoever started the worker where it listens, port 0 picks a free one
+    Logger().writeMessage("Worker listening on " + host + ":" + str(port))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+#--------------------------------Coordinator---------------------------------
+#Seconds to wait for a worker to accept a connection, steps themselves may run for hours
+connectTimeout = 10
+
+class WorkerConnection:
+    def __init__(self, address):
+        self.address = address
+        self.socket = socket.create_connection(parseAddress(address), connectTimeout)
+        self.socket.settimeout(None)
+        self.inFile = self.socket.makefile("rb")
+        self.outFile = self.socket.makefile("wb")
+
+    def request(self, message):
+        sendMessage(self.outFile, message)
+        response = receiveMessage(self.inFile)
+        if response == None:
+            raise socket.error("Connection closed by worker " + self.address)
+        return response
+
+    def close(self):
+        try:
+            self.outFile.close()
+        except socket.error:
+            #Unsent data of a lost connection
+            pass
+        self.inFile.close()
+        self.socket.close()
+
+class Coordinator:
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.jobSlots = 0
+        self.stepsRun = dict()
+        self.__lock = threading.Lock()
+        self.__connections = Queue.Queue()
+        self.__openConnections = []
+        #Connections handed out or waiting in the queue, lost ones are not counted
+        self.__liveConnections = 0
+        self.__secret = ""
+
+    def connect(self):
+        try:
+            self.__secret = getSecret()
+        except ValueError, e:
+            Logger().writeError(str(e))
+            return False
+        #Every worker gets as many connections as it has job slots
+        for address in self.addresses:
+            try:
+                connection, jobSlots = self.__openConnection(address)
+                self.__connections.put(connection)
+                for i in range(1, jobSlots):
+                    self.__connections.put(self.__openConnection(address)[0])
+                self.jobSlots += jobSlots
+                self.__liveConnections += jobSlots
+                self.stepsRun[address] = 0
+            except (socket.error, ValueError), e:
+                Logger().writeError("Could not connect to worker " + address + ": " + str(e))
+                return False
+        return True
+
+    def __openConnection(self, address):
+        #Returns the connection and the worker's job slots once the worker accepted the secret
+        connection = WorkerConnection(address)
+        self.__lock.acquire()
+        self.__openConnections.append(connection)
+        self.__lock.release()
+        response = connection.request({"type": "hello", "version": protocolVersion, "secret": self.__secret})
+        if response.get("type") != "hello":
+            raise ValueError(str(response.get("message")))
+        return connection, response["jobSlots"]
+
+    def close(self):
+        self.__lock.acquire()
+        for connection in self.__openConnections:
+            connection.close()
+        self.__openConnections = []
+        self.__lock.release()
+
+    def __replaceConnection(self, connection):
+        #A restarted worker gets its slot back, otherwise the slot is gone for the rest of the build
+        self.__lock.acquire()
+        if connection in self.__openConnections:
+            self.__openConnections.remove(connection)
+        self.__lock.release()
+        connection.close()
+        try:
+            replacement = self.__openConnection(connection.address)[0]
+        except (socket.error, ValueError), e:
+            Logger().writeError("Could not reconnect to worker " + connection.address + ": " + str(e))
+            self.__lock.acquire()
+            self.__liveConnections -= 1
+            self.__lock.release()
+            return
+        self.__connections.put(replacement)
+
+    def __getConnection(self):
+        #Timeout keeps waiting threads responsive to KeyboardInterrupt and to losing the last worker
+        while True:
+            try:
+                return self.__connections.get(True, 1.0)
+            except Queue.Empty:
+                if self.__liveConnections == 0:
+                    return None
+
+    def runStep(self, stepName, target, options):
+        connection = self.__getConnection()
+        if connection == None:
+            Logger().writeError("No workers left to run the step on", target.name, stepName)
+            return False
+        timeStart = time.time()
+        try:
+            result = connection.request({"type": "step", "step": stepName, "target": packTarget(target), "options": packOptions(options)})
+        except (socket.error, ValueError), e:
+            #The step may have run partly, it fails rather than running again elsewhere
+            Logger().writeError("Lost worker " + connection.address + ": " + str(e), target.name, stepName)
+            self.__replaceConnection(connection)
+            return False
+        self.__connections.put(connection)
+        if result.get("type") != "result":
+            Logger().writeError("Unexpected response from worker " + connection.address, target.name, stepName)
+            return False
+        self.__lock.acquire()
+        self.stepsRun[connection.address] += 1
+        self.__lock.release()
+        target.path = result["path"]
+        target.outputPath = result["outputPath"]
+        #The artifact cache stores staged installs from their manifest
+        target.installManifest = result["installManifest"]
+        if result["succeeded"] and options.buildHistory != None:
+            options.buildHistory.recordStep(target.name, stepName, time.time() - timeStart)
+        return result["succeeded"]
+
+    def buildStep(self, stepName, target, options):
+        return mdScheduler.buildStep(stepName, target, options, self.runStep)
@@ -0,0 +1,224 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import hashlib, os, shutil, tempfile, time, urllib2, utilityFunctions
+
+#Downloads are stored once by their sha256 under "objects/", "urls/" maps a
+#location to the object it last downloaded.
+defaultCacheSize = 10 * 1024 * 1024 * 1024
+readBlockSize = 1024 * 1024
+
+checksumLengths = {32: "md5", 40: "sha1", 64: "sha256"}
+
+def parseChecksum(checksum):
+    #Accepts "<algorithm>:<hex digest>" or a bare digest whose length identifies the algorithm
+    checksum = checksum.strip().lower()
+    if checksum == "":
+        return "", ""
+    if ":" in checksum:
+        algorithm, digest = checksum.split(":", 1)
+        algorithm = algorithm.strip()
+        digest = digest.strip()
+    else:
+        digest = checksum
+        algorithm = checksumLengths.get(len(digest), "")
+    if not algorithm in checksumLengths.values() or len(digest) != hashlib.new(algorithm).digest_size * 2:
+        raise ValueError("Checksum '" + checksum + "' not understood, expected md5, sha1 or sha256 digest")
+    try:
+        int(digest, 16)
+    except ValueError:
+        raise ValueError("Checksum '" + checksum + "' is not a hexadecimal digest")
+    return algorithm, digest
+
+def hashFile(path, algorithm):
+    hasher = hashlib.new(algorithm)
+    f = open(path, "rb")
+    try:
+        while True:
+            block = f.read(readBlockSize)
+            if block == "":
+                break
+            hasher.update(block)
+    finally:
+        f.close()
+    return hasher.hexdigest()
+
+class TeeStream:
+    #File-like reader that hashes and stores what it hands out, so a download
+    # can be consumed while it is written to the cache
+    def __init__(self, source, destination, hashers):
+        self.source = source
+        self.destination = destination
+        self.hashers = hashers
+
+    def read(self, size=-1):
+        if size < 0:
+            blocks = []
+            while True:
+                block = self.read(readBlockSize)
+                if block == "":
+                    return "".join(blocks)
+                blocks.append(block)
+        block = self.source.read(size)
+        if block != "":
+            for hasher in self.hashers:
+                hasher.update(block)
+            self.destination.write(block)
+        return block
+
+    def drain(self):
+        while self.read(readBlockSize) != "":
+            pass
+
+class DownloadCache:
+    def __init__(self, path, maxSize=defaultCacheSize):
+        self.path = utilityFunctions.includeTrailingPathDelimiter(path)
+        self.maxSize = maxSize
+        self.objectsDir = self.path + "objects/"
+        self.urlsDir = self.path + "urls/"
+
+    def __str__(self):
+        return "DownloadCache(" + self.path + ", " + str(self.maxSize) + " bytes)"
+
+    def __createDirs(self):
+        for directory in (self.objectsDir, self.urlsDir):
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    #Another MixDown may have created it first
+                    if not os.path.isdir(directory):
+                        raise
+
+    def __urlKeyPath(self, url):
+        return self.urlsDir + hashlib.sha1(url).hexdigest()
+
+    def __writeAtomically(self, path, contents):
+        fd, tempPath = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+        try:
+            os.write(fd, contents)
+        finally:
+            os.close(fd)
+        os.rename(tempPath, path)
+
+    def lookup(self, url, checksum=""):
+        algorithm, digest = parseChecksum(checksum)
+        objectPath = ""
+        if algorithm == "sha256" and os.path.isfile(self.objectsDir + digest):
+            objectPath = self.objectsDir + digest
+        elif os.path.isfile(self.__urlKeyPath(url)):
+            keyFile = open(self.__urlKeyPath(url), "r")
+            try:
+                objectPath = self.objectsDir + keyFile.read().strip()
+            finally:
+                keyFile.close()
+            if not os.path.isfile(objectPath):
+                return ""
+            if algorithm != "" and hashFile(objectPath, algorithm) != digest:
+                #The location now serves different content than declared, download again
+                return ""
+        if objectPath != "":
+            #Modification time doubles as last use for eviction
+            os.utime(objectPath, None)
+        return objectPath
+
+    def download(self, url, checksum="", consumer=None):
+        #consumer, if given, is called with a TeeStream of the download as it arrives
+        algorithm, digest = parseChecksum(checksum)
+        self.__createDirs()
+        contentHasher = hashlib.sha256()
+        hashers = [contentHasher]
+        checksumHasher = None
+        if algorithm != "" and algorithm != "sha256":
+            checksumHasher = hashlib.new(algorithm)
+            hashers.append(checksumHasher)
+
+        fd, tempPath = tempfile.mkstemp(prefix=".tmp-", dir=self.objectsDir)
+        try:
+            tempFile = os.fdopen(fd, "wb")
+            try:
+                response = urllib2.urlopen(url)
+                try:
+                    stream = TeeStream(response, tempFile, hashers)
+                    if consumer != None:
+                        consumer(stream)
+                    #Whatever the consumer did not read still belongs to the download
+                    stream.drain()
+                finally:
+                    response.close()
+            finally:
+                tempFile.close()
+
+            contentDigest = contentHasher.hexdigest()
+            if checksumHasher != None:
+                downloadedDigest = checksumHasher.hexdigest()
+            else:
+                downloadedDigest = contentDigest
+            if algorithm != "" and downloadedDigest != digest:
+                raise IOError("Checksum mismatch for '" + url + "': expected " + algorithm + ":" + digest + ", downloaded " + algorithm + ":" + downloadedDigest)
+
+            objectPath = self.objectsDir + contentDigest
+            #mkstemp creates files only readable by their owner
+            os.chmod(tempPath, 0644)
+            #Rename is atomic, a concurrent download of the same content just replaces an identical file
+            os.rename(tempPath, objectPath)
+        except:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+        self.__writeAtomically(self.__urlKeyPath(url), contentDigest)
+        self.evict(keep=objectPath)
+        return objectPath
+
+    def fetch(self, url, destinationPath, checksum=""):
+        objectPath = self.lookup(url, checksum)
+        if objectPath == "":
+            objectPath = self.download(url, checksum)
+        if os.path.exists(destinationPath):
+            os.remove(destinationPath)
+        try:
+            os.link(objectPath, destinationPath)
+        except OSError:
+            #Different filesystem or no hard link support
+            shutil.copyfile(objectPath, destinationPath)
+        return destinationPath
+
+    def evict(self, keep=""):
+        if not os.path.isdir(self.objectsDir):
+            return
+        entries = []
+        totalSize = 0
+        for name in os.listdir(self.objectsDir):
+            if name.startswith(".tmp-"):
+                continue
+            objectPath = self.objectsDir + name
+            stat = os.stat(objectPath)
+            entries.append((stat.st_mtime, stat.st_size, objectPath))
+            totalSize += stat.st_size
+        entries.sort()
+        for mtime, size, objectPath in entries:
+            if totalSize <= self.maxSize:
+                break
+            if objectPath == keep:
+                continue
+            os.remove(objectPath)
+            totalSize -= size
@@ -20,21 +20,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, mdLogger, utilityFunctions
+import os, mdLogger, mdTools, utilityFunctions
 
 _isGitInstalled = None
 
 def isGitInstalled():
     global _isGitInstalled
     if _isGitInstalled == None:
-        outFile = open(os.devnull, "w")
-        try:
-            returnCode = utilityFunctions.executeSubProcess("git --help", outFileHandle = outFile)
-        except:
-            #Assume any exceptions means Git is not installed
-            returnCode = 1
-        outFile.close()
-        if returnCode == 0:
+        if mdTools.isToolInstalled("git", "git --help"):
             _isGitInstalled = True
         else:
             mdLogger.Logger().writeMessage("Git is not installed, git repositories will fail to be checked out")
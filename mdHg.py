@@ -20,21 +20,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, mdLogger, utilityFunctions
+import os, mdLogger, mdTools, utilityFunctions
 
 _isHgInstalled = None
 
 def isHgInstalled():
     global _isHgInstalled
     if _isHgInstalled == None:
-        outFile = open(os.devnull, "w")
-        try:
-            returnCode = utilityFunctions.executeSubProcess("hg --help", outFileHandle = outFile)
-        except:
-            #Assume any exceptions means Hg is not installed
-            returnCode = 1
-        outFile.close()
-        if returnCode == 0:
+        if mdTools.isToolInstalled("hg", "hg --help"):
             _isHgInstalled = True
         else:
             mdLogger.Logger().writeMessage("Hg is not installed, hg repositories will fail to be checked out")
@@ -0,0 +1,107 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import json, os, threading, mdTarget
+
+historyFileName = "history.json"
+
+#Targets without any recorded steps are assumed to take this long
+defaultTargetDuration = 1.0
+
+class BuildHistory:
+    #One file holds the history of every project, each kept apart by the project's path so
+    # targets of the same name in different projects do not share timings
+    def __init__(self, path, projectPath=""):
+        self.path = path
+        self.projectKey = ""
+        if projectPath != "":
+            self.projectKey = os.path.abspath(projectPath)
+        self.__lock = threading.Lock()
+        self.__durations = dict()
+        self.__peakMemory = dict()
+        self.read()
+
+    def __readProjects(self):
+        if not os.path.isfile(self.path):
+            return dict()
+        historyFile = open(self.path, "r")
+        try:
+            try:
+                history = json.load(historyFile)
+            except ValueError:
+                history = dict()
+        finally:
+            historyFile.close()
+        #Older history files were not kept per project and are not used
+        if not isinstance(history, dict) or not isinstance(history.get("projects"), dict):
+            return dict()
+        return history["projects"]
+
+    def read(self):
+        project = self.__readProjects().get(self.projectKey, dict())
+        self.__durations = project.get("durations", dict())
+        self.__peakMemory = project.get("peakMemory", dict())
+
+    def write(self):
+        self.__lock.acquire()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory != "" and not os.path.isdir(directory):
+                os.makedirs(directory)
+            #Other projects' entries are kept as found in the file
+            projects = self.__readProjects()
+            projects[self.projectKey] = {"durations": self.__durations, "peakMemory": self.__peakMemory}
+            tempPath = self.path + "." + str(os.getpid()) + ".tmp"
+            historyFile = open(tempPath, "w")
+            try:
+                json.dump({"projects": projects}, historyFile, indent=1, sort_keys=True)
+            finally:
+                historyFile.close()
+            os.rename(tempPath, self.path)
+        finally:
+            self.__lock.release()
+
+    def recordStep(self, targetName, stepName, seconds):
+        self.__lock.acquire()
+        try:
+            self.__durations.setdefault(mdTarget.normalizeName(targetName), dict())[stepName] = seconds
+        finally:
+            self.__lock.release()
+
+    def getStepDuration(self, targetName, stepName):
+        return self.__durations.get(mdTarget.normalizeName(targetName), dict()).get(stepName)
+
+    def getTargetDuration(self, targetName):
+        steps = self.__durations.get(mdTarget.normalizeName(targetName))
+        if not steps:
+            return defaultTargetDuration
+        return sum(steps.values())
+
+    def recordPeakMemory(self, targetName, stepName, megabytes):
+        self.__lock.acquire()
+        try:
+            self.__peakMemory.setdefault(mdTarget.normalizeName(targetName), dict())[stepName] = megabytes
+        finally:
+            self.__lock.release()
+
+    def getStepPeakMemory(self, targetName, stepName):
+        return self.__peakMemory.get(mdTarget.normalizeName(targetName), dict()).get(stepName)
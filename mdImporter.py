@@ -21,7 +21,7 @@
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
 import os, re, shutil, sys, tarfile, tempfile, urllib
-import mdAutoTools, mdCMake, mdCommands, mdOptions, mdProject, mdStrings, mdTarget, utilityFunctions
+import mdAutoTools, mdCMake, mdCommands, mdOptions, mdPath, mdProject, mdStrings, mdTarget, utilityFunctions
 
 from mdLogger import *
 
@@ -83,7 +83,7 @@ def importTargets(options, targetsToImport):
                 userInput = raw_input(possibleDependancy + ": Input location, target name, or blank to ignore:").strip()
                 if userInput == "":
                     ignoredTargets.append(possibleDependancy)
-                elif os.path.isfile(userInput) or os.path.isdir(userInput) or utilityFunctions.isURL(userInput):
+                elif mdPath.classify(userInput) != mdPath.pathTypeUnknown:
                     name = mdTarget.targetPathToName(userInput)
                     newTarget = mdTarget.Target(name, userInput)
                     targetsToImport.append(newTarget)
@@ -97,7 +97,7 @@ def importTargets(options, targetsToImport):
                         target.dependsOn.append(possibleDependancy)
                     else:
                         aliasLocation = raw_input(userInput + ": Target name not found in any known targets.  Location of new target:").strip()
-                        if os.path.isfile(aliasLocation) or os.path.isdir(aliasLocation) or utilityFunctions.isURL(aliasLocation):
+                        if mdPath.classify(aliasLocation) != mdPath.pathTypeUnknown:
                             name = mdTarget.targetPathToName(aliasLocation)
                             newTarget = mdTarget.Target(name, aliasLocation)
                             notReviewedTargets.append(newTarget)
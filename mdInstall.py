@@ -0,0 +1,155 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import json, os, shutil, mdDownloadCache, mdStrings, mdTarget, utilityFunctions
+
+from mdLogger import *
+
+#Staged installs run with DESTDIR pointing at a per target stage directory, which make,
+# autotools and CMake generated install rules all honor. The staged files are recorded
+# in a manifest and then linked into place.
+stageDirName = "mdStage/"
+manifestDirName = ".mixdown/manifests/"
+
+def getStageDir(target, options):
+    return os.path.abspath(options.buildDir + stageDirName + mdTarget.normalizeName(target.name)) + "/"
+
+def getManifestPath(targetName, prefix):
+    return utilityFunctions.includeTrailingPathDelimiter(prefix) + manifestDirName + mdTarget.normalizeName(targetName) + ".json"
+
+def prepareStage(target, options):
+    stageDir = getStageDir(target, options)
+    if os.path.exists(stageDir):
+        utilityFunctions.removeDir(stageDir)
+    os.makedirs(stageDir)
+    return stageDir
+
+def getInstallEnvironment(stageDir, environment=None):
+    if environment == None:
+        environment = os.environ
+    environment = dict(environment)
+    environment["DESTDIR"] = utilityFunctions.stripTrailingPathDelimiter(stageDir)
+    return environment
+
+def __placeFile(sourcePath, destinationPath):
+    #Hard links make the merge free, copies are only made across filesystems
+    directory = os.path.dirname(destinationPath)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    if os.path.lexists(destinationPath):
+        os.remove(destinationPath)
+    if os.path.islink(sourcePath):
+        os.symlink(os.readlink(sourcePath), destinationPath)
+        return
+    try:
+        os.link(sourcePath, destinationPath)
+    except OSError:
+        shutil.copy2(sourcePath, destinationPath)
+
+def mergeStage(target, options):
+    stageDir = getStageDir(target, options)
+    prefix = options.getDefine(mdStrings.mdDefinePrefix)
+    manifest = dict()
+    for root, dirs, files in os.walk(stageDir):
+        for name in files + [directory for directory in dirs if os.path.islink(os.path.join(root, directory))]:
+            sourcePath = os.path.join(root, name)
+            installedPath = "/" + os.path.relpath(sourcePath, stageDir)
+            if os.path.islink(sourcePath):
+                manifest[installedPath] = {"link": os.readlink(sourcePath)}
+            else:
+                manifest[installedPath] = {"sha256": mdDownloadCache.hashFile(sourcePath, "sha256"),
+                                           "mode": os.stat(sourcePath).st_mode & 07777}
+    target.installManifest = manifest
+    if len(manifest) == 0:
+        Logger().writeMessage("Install did not use DESTDIR, no manifest recorded", target.name, "install")
+        utilityFunctions.removeDir(stageDir)
+        return True
+    try:
+        for installedPath in sorted(manifest.keys()):
+            #Identical files keep their timestamps, dependents' kept build trees do not rebuild against them
+            if __isUnchanged(installedPath, manifest[installedPath]) and\
+               ("link" in manifest[installedPath] or os.stat(installedPath).st_mode & 07777 == manifest[installedPath]["mode"]):
+                continue
+            __placeFile(stageDir + installedPath[1:], installedPath)
+        writeManifest(getManifestPath(target.name, prefix), manifest)
+    except (IOError, OSError), e:
+        Logger().writeError("Staged install could not be merged into the prefix: " + str(e), target.name, "install")
+        return False
+    utilityFunctions.removeDir(stageDir)
+    return True
+
+def readManifest(path):
+    manifestFile = open(path, "r")
+    try:
+        return json.load(manifestFile)
+    finally:
+        manifestFile.close()
+
+def writeManifest(path, manifest):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tempPath = path + ".tmp"
+    manifestFile = open(tempPath, "w")
+    try:
+        json.dump(manifest, manifestFile, indent=1, sort_keys=True)
+    finally:
+        manifestFile.close()
+    os.rename(tempPath, path)
+
+def __isUnchanged(installedPath, entry):
+    if "link" in entry:
+        return os.path.islink(installedPath) and os.readlink(installedPath) == entry["link"]
+    return os.path.isfile(installedPath) and not os.path.islink(installedPath) and\
+           mdDownloadCache.hashFile(installedPath, "sha256") == entry["sha256"]
+
+def uninstall(targetName, prefix):
+    manifestPath = getManifestPath(targetName, prefix)
+    if not os.path.isfile(manifestPath):
+        Logger().writeError("No install manifest found for target " + targetName + " in " + prefix)
+        return False
+    try:
+        manifest = readManifest(manifestPath)
+    except ValueError:
+        Logger().writeError("Install manifest is corrupt, " + manifestPath)
+        return False
+    directories = set()
+    removedCount = 0
+    for installedPath, entry in manifest.iteritems():
+        if not os.path.lexists(installedPath):
+            continue
+        #Files overwritten since, for example by another target, are not ours to remove
+        if not __isUnchanged(installedPath, entry):
+            Logger().writeMessage("Keeping changed file " + installedPath, targetName, "uninstall")
+            continue
+        os.remove(installedPath)
+        removedCount += 1
+        directories.add(os.path.dirname(installedPath))
+    #Remove directories left empty, deepest first, never the prefix itself
+    prefix = utilityFunctions.stripTrailingPathDelimiter(os.path.abspath(prefix))
+    for directory in sorted(directories, key=len, reverse=True):
+        while directory.startswith(prefix + "/") and os.path.isdir(directory) and len(os.listdir(directory)) == 0:
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+    os.remove(manifestPath)
+    Logger().writeMessage("Uninstalled " + str(removedCount) + " files", targetName, "uninstall")
+    return True
@@ -0,0 +1,64 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import errno, os
+
+#GNU make jobserver protocol: every byte in the pipe is one job slot.  Each make
+#also owns one implicit slot, which is why MixDown holds a token for every target
+#it runs and hands the remaining tokens to make's children.
+jobServerToken = "+"
+
+class JobServer:
+    def __init__(self, jobSlots):
+        self.jobSlots = jobSlots
+        self.readFd, self.writeFd = os.pipe()
+        os.write(self.writeFd, jobServerToken * jobSlots)
+
+    def __str__(self):
+        return "JobServer(" + str(self.jobSlots) + " slots, fds " + str(self.readFd) + "," + str(self.writeFd) + ")"
+
+    def acquire(self):
+        while True:
+            try:
+                return os.read(self.readFd, 1)
+            except OSError, e:
+                if e.errno != errno.EINTR:
+                    raise
+
+    def release(self, token=jobServerToken):
+        os.write(self.writeFd, token)
+
+    def close(self):
+        os.close(self.readFd)
+        os.close(self.writeFd)
+
+    def getMakeFlags(self):
+        #Older GNU make reads --jobserver-fds, 4.2 and later read --jobserver-auth
+        fds = str(self.readFd) + "," + str(self.writeFd)
+        return "-j --jobserver-fds=" + fds + " --jobserver-auth=" + fds
+
+    def getEnvironment(self, environment=None):
+        if environment == None:
+            environment = os.environ
+        environment = dict(environment)
+        environment["MAKEFLAGS"] = self.getMakeFlags()
+        return environment
@@ -0,0 +1,83 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, mdAutoTools, mdCMake, mdMake, utilityFunctions
+
+#What build system a target directory uses, decided from a single listdir that the
+# command getters of every step share. Steps that change the tree invalidate it.
+layoutUnknown = "unknown"
+layoutCMake = "cmake"
+layoutAutoTools = "autotools"
+layoutConfigure = "configure"
+layoutMake = "make"
+
+__layouts = dict()
+
+class Layout:
+    def __init__(self, path):
+        self.path = path
+        try:
+            self.files = frozenset(os.listdir(path))
+        except OSError:
+            self.files = frozenset()
+        self.isCMake = self.hasAnyFile(mdCMake.markerFiles)
+        self.isAutoTools = self.hasAnyFile(mdAutoTools.markerFiles)
+        self.isMake = self.hasAnyFile(mdMake.markerFiles)
+        if self.isCMake:
+            self.kind = layoutCMake
+        elif self.isAutoTools:
+            self.kind = layoutAutoTools
+        elif self.hasFile("Configure"):
+            self.kind = layoutConfigure
+        elif self.isMake:
+            self.kind = layoutMake
+        else:
+            self.kind = layoutUnknown
+
+    def __str__(self):
+        return "Layout(" + self.path + ", " + self.kind + ")"
+
+    def hasFile(self, name):
+        return name in self.files
+
+    def hasAnyFile(self, names):
+        for name in names:
+            if name in self.files:
+                return True
+        return False
+
+def __normalizePath(path):
+    return utilityFunctions.includeTrailingPathDelimiter(os.path.abspath(path))
+
+def getLayout(path):
+    normalizedPath = __normalizePath(path)
+    layout = __layouts.get(normalizedPath)
+    if layout == None:
+        layout = Layout(normalizedPath)
+        __layouts[normalizedPath] = layout
+    return layout
+
+def invalidate(path=""):
+    if path == "":
+        __layouts.clear()
+    else:
+        __layouts.pop(__normalizePath(path), None)
@@ -22,12 +22,15 @@
 
 import os, mdStrings, utilityFunctions
 
+markerFiles = ("GNUmakefile", "GNUmakefile.am", "GNUmakefile.in",
+               "makefile", "makefile.am", "makefile.in",
+               "Makefile", "Makefile.am", "Makefile.in")
+
 def isMakeProject(path):
     path = utilityFunctions.includeTrailingPathDelimiter(path)
-    if os.path.exists(path + "GNUmakefile") or os.path.exists(path + "GNUmakefile.am") or os.path.exists(path + "GNUmakefile.in") or \
-       os.path.exists(path + "makefile") or os.path.exists(path + "makefile.am") or os.path.exists(path + "makefile.in") or \
-       os.path.exists(path + "Makefile") or os.path.exists(path + "Makefile.am") or os.path.exists(path + "Makefile.in"):
-        return True
+    for markerFile in markerFiles:
+        if os.path.exists(path + markerFile):
+            return True
     return False
 
 def getPreconfigureCommand():
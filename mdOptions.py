@@ -20,7 +20,7 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, sys, mdStrings, mdTarget, utilityFunctions
+import multiprocessing, os, sys, mdDownloadCache, mdJobServer, mdPath, mdPython, mdStrings, mdTarget, utilityFunctions
 
 from mdLogger import *
 
@@ -31,15 +31,41 @@ class Options:
         self.downloadDir = "mdDownload/"
         self.logDir = "mdLogFiles/"
         self.tempDir = "/tmp/"
+        self.stateDir = utilityFunctions.getStateDir()
+        self.downloadCacheSize = mdDownloadCache.defaultCacheSize
+        self.downloadCache = None
+        self.artifactCacheDir = ""
+        self.artifactCache = None
         self.cleanTargets = False
         self.cleanMixDown = True
+        self.fullBuild = False
+        self.keepGoing = False
+        self.selectedTargets = []
+        self.withDependents = False
         self.verbose = False
         self.logger = "file"
         self.importer = False
         self.interactive = False
         self.prefixDefined = False
+        self.targetJobSlots = 1
+        self.fetchJobSlots = 4
+        self.streamDownloads = False
+        self.stagedInstall = False
+        self.uninstallTargets = []
+        self.jobServer = None
+        self.maxLoad = 0
+        self.memoryLimit = 0
+        self.remoteWorkers = []
+        self.workerAddress = ""
+        self.pythonJobSlots = 0
+        self.pythonWorkerPool = None
+        self.stateDatabase = None
+        self.buildHistory = None
         self._defines = dict()
         self._defines.setdefault("")
+        self.__compiledTemplates = dict()
+        self.__resolvedDefines = dict()
+        self.__expandedStrings = dict()
         self.setDefine(mdStrings.mdDefinePrefix, '/usr/local')
 
     def __str__(self):
@@ -48,10 +74,24 @@ class Options:
   Build Dir:     " + self.buildDir + "\n\
   Download Dir:  " + self.downloadDir + "\n\
   Log Dir:       " + self.logDir + "\n\
+  State Dir:     " + self.stateDir + "\n\
+  Artifact Dir:  " + self.artifactCacheDir + "\n\
   Defines:       " + str(self._defines) + "\n\
   Import:        " + str(self.importer) + "\n\
   Clean Targets: " + str(self.cleanTargets) + "\n\
   Clean MixDown: " + str(self.cleanMixDown) + "\n\
+  Full Build:    " + str(self.fullBuild) + "\n\
+  Keep Going:    " + str(self.keepGoing) + "\n\
+  Targets:       " + ",".join(self.selectedTargets) + "\n\
+  Dependents:    " + str(self.withDependents) + "\n\
+  Target Jobs:   " + str(self.targetJobSlots) + "\n\
+  Fetch Jobs:    " + str(self.fetchJobSlots) + "\n\
+  Python Jobs:   " + str(self.pythonJobSlots) + "\n\
+  Workers:       " + ",".join(self.remoteWorkers) + "\n\
+  Max Load:      " + str(self.maxLoad) + "\n\
+  Memory Limit:  " + str(self.memoryLimit) + "\n\
+  Stream:        " + str(self.streamDownloads) + "\n\
+  Staged:        " + str(self.stagedInstall) + "\n\
   Verbose:       " + str(self.verbose) + "\n\
   Logger:        " + self.logger.capitalize() + "\n"
 
@@ -68,6 +108,9 @@ class Options:
 
     def setDefine(self, key, value):
         self._defines[self._normalizeKey(key)] = value.strip()
+        #Starts a new generation of defines, anything resolved from the old one may be stale
+        self.__resolvedDefines = dict()
+        self.__expandedStrings = dict()
 
     def getDefine(self, key):
         normalizedKey = self._normalizeKey(key)
@@ -88,37 +131,102 @@ class Options:
     def downloadDir(self, value):
         self.downloadDir = utilityFunctions.includeTrailingPathDelimiter(value)
 
+    def __compileTemplate(self, template):
+        #Parsed once into literal text and define names, ("", text) or (name, "") per token
+        tokens = self.__compiledTemplates.get(template)
+        if tokens != None:
+            return tokens
+        tokens = []
+        position = 0
+        while True:
+            startIndex = template.find("$(", position)
+            if startIndex == -1:
+                break
+            endIndex = template.find(")", startIndex)
+            if endIndex == -1:
+                Logger().writeError("Unterminated define found in '" + template + "' at index " + str(startIndex), exitProgram=True)
+            if startIndex > position:
+                tokens.append(("", template[position:startIndex]))
+            tokens.append((template[startIndex:endIndex+1], ""))
+            position = endIndex + 1
+        if position < len(template):
+            tokens.append(("", template[position:]))
+        self.__compiledTemplates[template] = tokens
+        return tokens
+
+    def __resolveDefine(self, define, resolving):
+        #Nested defines are resolved depth first, so every define is resolved after the ones it uses.
+        # Returns the value and whether it can be kept, values from os.environ may change.
+        name = self._normalizeKey(define)
+        resolvedDefines = self.__resolvedDefines
+        if name in resolvedDefines:
+            return resolvedDefines[name], True
+        if name in resolving:
+            cycle = resolving[resolving.index(name):] + [name]
+            Logger().writeError("Define cycle found: " + " -> ".join(cycle), exitProgram=True)
+        resolving.append(name)
+        value, cacheable = self.__expandTemplate(self.getDefine(define), resolving)
+        resolving.pop()
+        if not name in self._defines:
+            cacheable = False
+        if cacheable:
+            resolvedDefines[name] = value
+        return value, cacheable
+
+    def __expandTemplate(self, template, resolving):
+        values = []
+        cacheable = True
+        for define, text in self.__compileTemplate(template):
+            if define == "":
+                values.append(text)
+            else:
+                value, defineCacheable = self.__resolveDefine(define, resolving)
+                values.append(value)
+                cacheable = cacheable and defineCacheable
+        return "".join(values), cacheable
+
     def expandDefines(self, inString):
-        expandedString = inString
-        loopCount = 0
-        while expandedString.find("$(") != -1:
-            if loopCount > 10:
-                Logger().writeError("Define depth count (10) exceeded in string '" + inString + "'", exitProgram=True)
-
-            strLength = len(expandedString)
-            startIndex = 0
-            endIndex = 0
-            for i in range(strLength):
-                if expandedString[i] == "$":
-                    if strLength - i < 4:
-                        if inString == expandedString:
-                            Logger().writeError("Unterminated define found in '" + inString + "' at index " + str(i), exitProgram=True)
-                        else:
-                            Logger().writeError("Unterminated define found in original string '" + inString + "'\n After expanding defines, '" + expandedString + "'", exitProgram=True)
-                    startIndex = i
-                    break
-            if startIndex != 0:
-                for j in range(startIndex, strLength):
-                    if expandedString[j] == ")":
-                        endIndex = j
-                        break
-                defineName = expandedString[startIndex:endIndex+1]
-                defineValue = self.getDefine(defineName)
-                expandedString = expandedString.replace(defineName, defineValue)
-            loopCount += 1
-        expandedString = expandedString.replace("  ", " ").strip()
+        expandedStrings = self.__expandedStrings
+        expandedString = expandedStrings.get(inString)
+        if expandedString == None:
+            expandedString, cacheable = self.__expandTemplate(inString, [])
+            expandedString = expandedString.replace("  ", " ").strip()
+            if cacheable:
+                expandedStrings[inString] = expandedString
         return expandedString
 
+    def getDownloadCache(self):
+        if self.downloadCache == None:
+            self.downloadCache = mdDownloadCache.DownloadCache(self.stateDir + "downloads/", self.downloadCacheSize)
+        return self.downloadCache
+
+    def startJobServer(self):
+        jobSlots = self.getDefine(mdStrings.mdDefineJobSlots)
+        #Remote workers pass -j to their makes themselves
+        if jobSlots != "" and self.jobServer == None and len(self.remoteWorkers) == 0:
+            self.jobServer = mdJobServer.JobServer(int(jobSlots))
+            #make joins the jobserver through MAKEFLAGS, an explicit -j would start a second one
+            self.setDefine(mdStrings.mdMakeJobSlotsDefineName, "")
+
+    def stopJobServer(self):
+        if self.jobServer != None:
+            self.jobServer.close()
+            self.jobServer = None
+
+    def startPythonWorkers(self, namespaces):
+        #Must be forked before MixDown starts any thread, workers preload the step modules and use the -l logger
+        if self.pythonJobSlots > 0 and self.pythonWorkerPool == None:
+            self.pythonWorkerPool = multiprocessing.Pool(self.pythonJobSlots, mdPython.initializeWorker, (namespaces, self.logger, self.logDir))
+
+    def stopPythonWorkers(self, terminate=False):
+        if self.pythonWorkerPool != None:
+            if terminate:
+                self.pythonWorkerPool.terminate()
+            else:
+                self.pythonWorkerPool.close()
+            self.pythonWorkerPool.join()
+            self.pythonWorkerPool = None
+
     def validateBuildDir(self):
         if os.path.isfile(self.buildDir):
             Logger().writeError("Cannot create build directory, a file by the same name already exists", exitProgram=True)
@@ -148,7 +256,7 @@ class Options:
                 self.interactive = True
             elif currArg.lower() == "-v":
                 self.verbose = True
-            elif utilityFunctions.isURL(currArg) or os.path.isfile(currArg) or os.path.isdir(currArg):
+            elif mdPath.classify(currArg) != mdPath.pathTypeUnknown:
                 name = mdTarget.targetPathToName(currArg)
                 currTarget = mdTarget.Target(name, currArg)
                 targetsToImport.append(currTarget)
@@ -160,12 +268,65 @@ class Options:
 
         return targetsToImport
 
+    def __processUninstallCommandline(self, commandline):
+        for currArg in commandline[1:]:
+            currFlag = str.lower(currArg[:2])
+            currValue = currArg[2:]
+            if currArg == "--uninstall":
+                continue
+            elif currFlag == "-p":
+                validateOptionPair(currFlag, currValue)
+                self.setDefine(mdStrings.mdDefinePrefix, os.path.abspath(currValue))
+                self.prefixDefined = True
+            elif currFlag == "-l":
+                validateOptionPair(currFlag, currValue)
+                self.logger = str.lower(currValue)
+            elif currFlag == "-v":
+                validateOption(currFlag, currValue)
+                self.verbose = True
+            elif currArg.startswith("-"):
+                Logger().writeError("Command line argument '" + currArg + "' not understood in uninstall mode", exitProgram=True)
+            else:
+                self.uninstallTargets.append(currArg)
+
+        if len(self.uninstallTargets) == 0:
+            self.printUsageAndExit()
+
+        return []
+
+    def __processWorkerCommandline(self, commandline):
+        for currArg in commandline[1:]:
+            currFlag = str.lower(currArg[:2])
+            currValue = currArg[2:]
+            if currArg == "--worker":
+                continue
+            elif currFlag == "-t":
+                validateOptionPair(currFlag, currValue)
+                if not currValue.isdigit() or int(currValue) < 1:
+                    Logger().writeError("Number of concurrent steps must be a positive integer, " + currValue, exitProgram=True)
+                self.targetJobSlots = int(currValue)
+            elif currFlag == "-l":
+                validateOptionPair(currFlag, currValue)
+                self.logger = str.lower(currValue)
+            elif currArg.startswith("-"):
+                Logger().writeError("Command line argument '" + currArg + "' not understood in worker mode", exitProgram=True)
+            elif self.workerAddress != "":
+                Logger().writeError("Worker mode takes a single address to listen on", exitProgram=True)
+            else:
+                self.workerAddress = currArg
+        if self.workerAddress == "":
+            self.printUsageAndExit()
+
     def processCommandline(self, commandline=[]):
         if len(commandline) < 2:
             self.printUsageAndExit()
 
         if "--import" in commandline:
             return self.__processImportCommandline(commandline)
+        if "--uninstall" in commandline:
+            return self.__processUninstallCommandline(commandline)
+        if "--worker" in commandline:
+            return self.__processWorkerCommandline(commandline)
 
         for currArg in commandline[1:]: #skip script name
             currFlag = str.lower(currArg[:2])
@@ -186,9 +347,44 @@ class Options:
                 self.prefixDefined = True
             elif currFlag == "-j":
                 validateOptionPair(currFlag, currValue)
+                if not currValue.isdigit() or int(currValue) < 1:
+                    Logger().writeError("Number of job slots must be a positive integer, " + currValue, exitProgram=True)
                 self.setDefine(mdStrings.mdDefineJobSlots, currValue)
                 #Add "-j<jobSlots>" only if user defines -j on commandline
                 self.setDefine(mdStrings.mdMakeJobSlotsDefineName, mdStrings.mdMakeJobSlotsDefineValue)
+            elif currFlag == "-t":
+                validateOptionPair(currFlag, currValue)
+                if not currValue.isdigit() or int(currValue) < 1:
+                    Logger().writeError("Number of concurrent targets must be a positive integer, " + currValue, exitProgram=True)
+                self.targetJobSlots = int(currValue)
+            elif currFlag == "-w":
+                validateOptionPair(currFlag, currValue)
+                if not currValue.isdigit():
+                    Logger().writeError("Number of python step workers must be a non-negative integer, " + currValue, exitProgram=True)
+                self.pythonJobSlots = int(currValue)
+            elif currFlag == "-f":
+                validateOptionPair(currFlag, currValue)
+                if not currValue.isdigit():
+                    Logger().writeError("Number of concurrent fetches must be a non-negative integer, " + currValue, exitProgram=True)
+                self.fetchJobSlots = int(currValue)
+            elif currFlag == "-u":
+                validateOptionPair(currFlag, currValue)
+                try:
+                    self.maxLoad = float(currValue)
+                except ValueError:
+                    self.maxLoad = -1
+                if self.maxLoad < 0:
+                    Logger().writeError("Maximum load average must be a non-negative number, " + currValue, exitProgram=True)
+            elif currFlag == "-r":
+                validateOptionPair(currFlag, currValue)
+                for address in currValue.split(","):
+                    if address.strip() != "":
+                        self.remoteWorkers.append(address.strip())
+            elif currFlag == "-m":
+                validateOptionPair(currFlag, currValue)
+                if not currValue.isdigit():
+                    Logger().writeError("Memory limit must be a non-negative integer of megabytes, " + currValue, exitProgram=True)
+                self.memoryLimit = int(currValue)
             elif currFlag == "-l":
                 validateOptionPair(currFlag, currValue)
                 self.logger = str.lower(currValue)
@@ -198,20 +394,45 @@ class Options:
             elif currFlag == "-o":
                 validateOptionPair(currFlag, currValue)
                 self.downloadDir = currValue
-            elif currFlag == "-k":
+            elif currFlag == "-s":
                 validateOptionPair(currFlag, currValue)
+                self.stateDir = utilityFunctions.includeTrailingPathDelimiter(os.path.abspath(currValue))
+            elif currFlag == "-a":
+                validateOptionPair(currFlag, currValue)
+                self.artifactCacheDir = utilityFunctions.includeTrailingPathDelimiter(os.path.abspath(currValue))
+            elif currFlag == "-k":
+                validateOption(currFlag, currValue)
                 if self.cleanTargets == True:
                     Logger().writeError("Command line arguments '--clean' and '-k' cannot both be used", exitProgram=True)
+                if self.fullBuild == True:
+                    Logger().writeError("Command line arguments '--full' and '-k' cannot both be used", exitProgram=True)
                 self.cleanMixDown = False
             elif currFlag == "-v":
                 validateOption(currFlag, currValue)
                 self.verbose = True
+            elif currArg.lower() == "--stream":
+                self.streamDownloads = True
+            elif currArg.lower() == "--staged":
+                self.stagedInstall = True
+            elif currArg.lower() == "--with-dependents":
+                self.withDependents = True
+            elif currArg.lower() == "--keep-going":
+                self.keepGoing = True
+            elif currArg.lower() == "--full":
+                #Clean mode turns off cleanMixDown as well, it is not -k
+                if self.cleanTargets == True:
+                    Logger().writeError("Command line arguments '--full' and '--clean' cannot both be used", exitProgram=True)
+                if self.cleanMixDown == False:
+                    Logger().writeError("Command line arguments '--full' and '-k' cannot both be used", exitProgram=True)
+                self.fullBuild = True
             elif currArg.lower() in ("/help", "/h", "-help", "--help", "-h"):
                 self.printUsageAndExit()
             elif currFlag == "-c" or currArg.lower() == "--clean":
                 if currFlag == "-c":
                     validateOption(currFlag, currValue)
-                if self.cleanMixDown == False:
+                if self.fullBuild == True:
+                    Logger().writeError("Command line arguments '--full' and '--clean' cannot both be used", exitProgram=True)
+                if self.cleanMixDown == False and self.cleanTargets == False:
                     Logger().writeError("Command line arguments '--clean' and '-k' cannot both be used", exitProgram=True)
                 self.cleanTargets = True
                 self.cleanMixDown = False
@@ -220,8 +441,12 @@ class Options:
                     Logger().writeError("File " + currArg + " does not exist", exitProgram=True)
                 else:
                     self.projectFile = currArg
+            elif not currArg.startswith("-") and not currArg.startswith("/"):
+                self.selectedTargets.append(currArg)
             else:
                 Logger().writeError("Command line argument '" + currArg + "' not understood", exitProgram=True)
+        if self.withDependents and len(self.selectedTargets) == 0:
+            Logger().writeError("Command line argument '--with-dependents' requires target names", exitProgram=True)
 
     def printUsageAndExit(self, errorStr=""):
         self.printUsage(errorStr)
@@ -246,11 +471,27 @@ class Options:
         <path to .md file>   Path to MixDown project file\n\
     \n\
         Optional:\n\
+        <target name list>   Build only these targets and their dependancies\n\
+        --with-dependents    Build the named targets and everything depending on them instead\n\
         -p<path>      Override prefix directory\n\
         -b<path>      Override build directory\n\
         -o<path>      Override download directory\n\
+        -s<path>      Override state directory holding the download cache\n\
+        -a<path>      Shared artifact cache directory, installs are restored from it (implies --staged)\n\
         -l<logger>    Override default logger (Console, File, Html)\n\
+        -j<number>    Number of job slots passed to make\n\
+        -t<number>    Number of target build steps run concurrently\n\
+        -f<number>    Number of downloads run concurrently, 0 shares the -t slots\n\
+        -w<number>    Number of worker processes for python steps, default 0 runs them in MixDown\n\
+        -u<number>    Start no further steps while the load average is above this, 0 disables\n\
+        -m<number>    Megabytes of memory concurrent steps may reserve, 0 uses physical memory\n\
+                      A step reserves its largest process's last peak, times -j for make steps\n\
         -k            Keeps previously existing MixDown directories\n\
+        --full        Rebuild from scratch even if a previous build can be reused\n\
+        --keep-going  Keep building targets that do not depend on a failed one\n\
+        --stream      Extract tarballs while they download\n\
+        --staged      Install through a DESTDIR stage and record install manifests\n\
+        -r<workers>   Comma separated host:port list of workers to run build steps on\n\
     \n\
     Clean Mode: \n\
         Example Usage: MixDown --clean foo.md\n\
@@ -264,10 +505,40 @@ class Options:
         -o<path>      Override download directory\n\
         -l<logger>    Override default logger (Console, File, Html)\n\
     \n\
+    Uninstall Mode: \n\
+        Example Usage: MixDown --uninstall foo -p/path/to/prefix\n\
+    \n\
+        Required:\n\
+        --uninstall          Toggle Uninstall mode\n\
+        <target name list>   Targets installed with --staged to remove\n\
+    \n\
+        Optional:\n\
+        -p<path>      Override prefix directory\n\
+    \n\
+    Worker Mode: \n\
+        Example Usage: MixDown --worker 7390 -t4\n\
+    \n\
+        Required:\n\
+        --worker             Toggle Worker mode\n\
+        <[host:]port>        Address to accept build steps on, host defaults to 127.0.0.1\n\
+    \n\
+        Optional:\n\
+        -t<number>    Number of build steps run concurrently\n\
+        -l<logger>    Override default logger (Console, File, Html)\n\
+    \n\
+    Build, download and prefix directories have to be at the same paths on\n\
+    the coordinator and every worker, for example on a shared filesystem.\n\
+    \n\
+    Workers run any command a connected coordinator sends them. Both sides\n\
+    need MIXDOWN_WORKER_SECRET set to the same value, it is sent unencrypted.\n\
+    Listen on addresses other than 127.0.0.1 only inside a trusted network,\n\
+    reach workers elsewhere through an ssh tunnel.\n\
+    \n\
     Default Directories:\n\
     Builds:       mdBuild/\n\
     Downloads:    mdDownload/\n\
-    Logs:         mdLogFiles/\n"
+    Logs:         mdLogFiles/\n\
+    State:        ~/.mixdown/ (or $MIXDOWN_HOME)\n"
 
 def validateOptionPair(flag, value):
     if value == "":
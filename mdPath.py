@@ -0,0 +1,110 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, re, urlparse, mdGit, mdHg, mdSvn, utilityFunctions
+
+#Kinds of target locations
+pathTypeUnknown = "unknown"
+pathTypeDirectory = "directory"
+pathTypeFile = "file"
+pathTypeURL = "url"
+pathTypeGit = "git"
+pathTypeHg = "hg"
+pathTypeSvn = "svn"
+
+archiveExtensions = (".tar.gz", ".tgz", ".tar.bz2", ".tbz", ".tb2", ".tbz2", ".tar.xz", ".txz", ".tar", ".zip", ".gz", ".bz2", ".xz")
+tarExtensions = (".tar.gz", ".tgz", ".tar.bz2", ".tbz", ".tb2", ".tbz2", ".tar")
+gitSchemes = ("git", "git+ssh", "ssh+git")
+svnSchemes = ("svn", "svn+ssh")
+scpLikeRegExp = re.compile(r"^[\w\.\-]+@[\w\.\-]+:")
+
+#Per-run memo of classified locations, network probes are far too slow to repeat
+__pathTypeCache = dict()
+
+def clearCache():
+    __pathTypeCache.clear()
+
+def __classifyDirectory(path):
+    if os.path.isdir(os.path.join(path, ".git")):
+        return pathTypeGit
+    if os.path.isdir(os.path.join(path, ".hg")):
+        return pathTypeHg
+    #Bare git repositories have no work tree
+    if os.path.isfile(os.path.join(path, "HEAD")) and os.path.isdir(os.path.join(path, "objects")) and os.path.isdir(os.path.join(path, "refs")):
+        return pathTypeGit
+    return pathTypeDirectory
+
+def __probeRepository(location):
+    #Only reached for locations whose syntax does not say what they are
+    if mdGit.isGitRepo(location):
+        return pathTypeGit
+    if mdHg.isHgRepo(location):
+        return pathTypeHg
+    if mdSvn.isSvnRepo(location):
+        return pathTypeSvn
+    return ""
+
+def __classify(location):
+    if location == "":
+        return pathTypeUnknown
+    if os.path.isdir(location):
+        return __classifyDirectory(location)
+    if os.path.isfile(location):
+        return pathTypeFile
+
+    loweredLocation = location.lower()
+    scheme = urlparse.urlparse(location).scheme.lower()
+    if scheme in gitSchemes:
+        return pathTypeGit
+    if scheme in svnSchemes:
+        return pathTypeSvn
+    if scheme == "ssh" or scpLikeRegExp.match(location):
+        if loweredLocation.rstrip("/").endswith(".git"):
+            return pathTypeGit
+        return __probeRepository(location) or pathTypeUnknown
+    if not utilityFunctions.isURL(location):
+        return pathTypeUnknown
+
+    if loweredLocation.endswith(archiveExtensions):
+        return pathTypeURL
+    if loweredLocation.rstrip("/").endswith(".git"):
+        return pathTypeGit
+    if scheme == "file":
+        localPath = urlparse.urlparse(location).path
+        if os.path.isfile(localPath):
+            return pathTypeURL
+        if os.path.isdir(localPath):
+            directoryType = __classifyDirectory(localPath)
+            if directoryType != pathTypeDirectory:
+                return directoryType
+    return __probeRepository(location) or pathTypeURL
+
+def classify(location):
+    location = location.strip()
+    pathType = __pathTypeCache.get(location)
+    if pathType == None:
+        pathType = __classify(location)
+        __pathTypeCache[location] = pathType
+    return pathType
+
+def isRepository(pathType):
+    return pathType in (pathTypeGit, pathTypeHg, pathTypeSvn)
@@ -20,10 +20,70 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, collections, Queue, mdCommands, mdTarget, utilityFunctions
+import os, collections, mdCommands, mdDownloadCache, mdTarget, utilityFunctions
 
 from mdLogger import *
 
+class TargetList(list):
+    #Counts every change, so the project's name index notices targets being added,
+    # removed, replaced or reordered without comparing the whole list
+    version = 0
+
+    def __changed(self):
+        self.version += 1
+
+    def __setitem__(self, index, value):
+        self.__changed()
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self.__changed()
+        list.__delitem__(self, index)
+
+    def __setslice__(self, start, end, values):
+        self.__changed()
+        list.__setslice__(self, start, end, values)
+
+    def __delslice__(self, start, end):
+        self.__changed()
+        list.__delslice__(self, start, end)
+
+    def __iadd__(self, values):
+        self.__changed()
+        return list.__iadd__(self, values)
+
+    def __imul__(self, count):
+        self.__changed()
+        return list.__imul__(self, count)
+
+    def append(self, value):
+        self.__changed()
+        list.append(self, value)
+
+    def extend(self, values):
+        self.__changed()
+        list.extend(self, values)
+
+    def insert(self, index, value):
+        self.__changed()
+        list.insert(self, index, value)
+
+    def pop(self, *args):
+        self.__changed()
+        return list.pop(self, *args)
+
+    def remove(self, value):
+        self.__changed()
+        list.remove(self, value)
+
+    def reverse(self):
+        self.__changed()
+        list.reverse(self)
+
+    def sort(self, *args, **kwargs):
+        self.__changed()
+        list.sort(self, *args, **kwargs)
+
 class Project:
     def __init__(self, projectFilePath, targets=[]):
         self.path = projectFilePath
@@ -31,9 +91,14 @@ class Project:
             self.name = os.path.split(self.path)[1][:-3]
         else:
             self.name = utilityFunctions.getBasename(self.path)
-        self.targets = targets[:] #Use copy to prevent list instance to be used between project instances
+        self.targets = TargetList(targets) #Use copy to prevent list instance to be used between project instances
+        self.excludedTargets = []
         self.__validated = False
         self.__examined = False
+        self.__targetIndex = dict()
+        self.__dependentIndex = None
+        self.reindexTargets()
+        self.dependancyGraph = None
 
     def validate(self, options):
         if self.__validated:
@@ -43,6 +108,8 @@ class Project:
                 return False
             if not self.__validateDependsOnLists():
                 return False
+            for target in self.targets:
+                target.dependancyTargets = [self.getTarget(dependancy) for dependancy in target.dependsOn]
             for target in self.targets:
                 if not target.validate(options):
                     return False
@@ -56,8 +123,11 @@ class Project:
             if len(self.targets) < 1:
                 Logger().writeError("Project has no targets")
                 return False
-            self.__assignDepthToTargetList()
-            self.targets = self.__sortTargetList(self.targets)
+            self.dependancyGraph = self.__analyzeDependancies()
+            if len(self.dependancyGraph.cycle) != 0:
+                self.__reportDependancyCycle(self.dependancyGraph)
+                return False
+            self.targets = TargetList(self.dependancyGraph.order)
             for target in self.targets:
                 if not target.examine(options):
                     return False
@@ -69,22 +139,111 @@ class Project:
             Logger().writeError("New target started before previous was finished, all targets require atleast 'Name' and 'Path' to be declared", "", "", self.path, lineCount)
             return False
 
-        for currTarget in self.targets:
-            if mdTarget.normalizeName(target.name) == mdTarget.normalizeName(currTarget.name):
-                Logger().writeError("Cannot have more than one project target by the same name", currTarget.name, "", self.path, lineCount)
-                return False
+        currTarget = self.getTarget(target.name)
+        if currTarget != None and mdTarget.normalizeName(target.name) == mdTarget.normalizeName(currTarget.name):
+            Logger().writeError("Cannot have more than one project target by the same name", currTarget.name, "", self.path, lineCount)
+            return False
         self.targets.append(target)
+        self.__indexTarget(target)
         return True
 
+    def __indexTarget(self, target):
+        #Names take precedence over aliases of other targets
+        self.__targetIndex[mdTarget.normalizeName(target.name)] = target
+        for alias in target.aliases:
+            self.__targetIndex.setdefault(mdTarget.normalizeName(alias), target)
+        self.__indexedVersion = self.__getTargetsVersion()
+        self.__dependentIndex = None
+
+    def __getTargetsVersion(self):
+        #A list assigned from outside is wrapped so its changes are counted from then on
+        if not isinstance(self.targets, TargetList):
+            self.targets = TargetList(self.targets)
+        return (id(self.targets), self.targets.version)
+
+    def reindexTargets(self):
+        #Also needed after renaming a target or changing its aliases directly
+        self.__targetIndex.clear()
+        self.__dependentIndex = None
+        for target in self.targets:
+            self.__targetIndex[mdTarget.normalizeName(target.name)] = target
+        for target in self.targets:
+            for alias in target.aliases:
+                self.__targetIndex.setdefault(mdTarget.normalizeName(alias), target)
+        self.__indexedVersion = self.__getTargetsVersion()
+
+    def addAlias(self, target, alias):
+        if not alias in target.aliases:
+            target.aliases.append(alias)
+        self.__targetIndex.setdefault(mdTarget.normalizeName(alias), target)
+
     def getTarget(self, targetName):
-        normalizedTargetName = mdTarget.normalizeName(targetName)
-        for currTarget in self.targets:
-            if normalizedTargetName == mdTarget.normalizeName(currTarget.name):
-                return currTarget
-            for alias in currTarget.aliases:
-                if normalizedTargetName == mdTarget.normalizeName(alias):
-                    return currTarget
-        return None
+        #Changes made to the list directly are picked up here
+        if self.__indexedVersion != self.__getTargetsVersion():
+            self.reindexTargets()
+        normalizedName = mdTarget.normalizeName(targetName)
+        target = self.__targetIndex.get(normalizedName)
+        if target != None and mdTarget.normalizeName(target.name) != normalizedName and\
+           not normalizedName in [mdTarget.normalizeName(alias) for alias in target.aliases]:
+            #Renamed since it was indexed
+            self.reindexTargets()
+            target = self.__targetIndex.get(normalizedName)
+        return target
+
+    def getDependancies(self, target):
+        dependancies = []
+        for dependancyName in target.dependsOn:
+            dependancy = self.getTarget(dependancyName)
+            if dependancy != None and not dependancy in dependancies:
+                dependancies.append(dependancy)
+        return dependancies
+
+    def getDependents(self, target):
+        #Reverse dependsOn index, built on first use and whenever the targets change
+        if self.__indexedVersion != self.__getTargetsVersion():
+            self.reindexTargets()
+        if self.__dependentIndex == None:
+            self.__dependentIndex = dict()
+            for currTarget in self.targets:
+                for dependancy in self.getDependancies(currTarget):
+                    self.__dependentIndex.setdefault(mdTarget.normalizeName(dependancy.name), []).append(currTarget)
+        return self.__dependentIndex.get(mdTarget.normalizeName(target.name), [])
+
+    def selectTargets(self, targetNames, withDependents=False):
+        #Narrows the project to the named targets and everything they depend on, or with
+        # dependents to the named targets and everything depending on them. Dependancies
+        # left out are expected to be installed already.
+        selected = []
+        for targetName in targetNames:
+            target = self.getTarget(targetName)
+            if target == None:
+                Logger().writeError("Selected target '" + targetName + "' not found in project", "", "", self.path)
+                return False
+            selected.append(target)
+        if withDependents:
+            closure = self.__getClosure(selected, self.getDependents)
+        else:
+            closure = self.__getClosure(selected, self.getDependancies)
+        #Kept targets still refer to left out dependancies, whose recorded fingerprints stand
+        # for what they installed earlier
+        for target in self.targets:
+            target.dependancyTargets = self.getDependancies(target)
+        self.excludedTargets = [target for target in self.targets if not id(target) in closure]
+        self.targets = TargetList([target for target in self.targets if id(target) in closure])
+        self.reindexTargets()
+        self.dependancyGraph = self.__analyzeDependancies()
+        return True
+
+    def __getClosure(self, targets, getNeighbors):
+        closure = set()
+        pending = list(targets)
+        while len(pending) != 0:
+            target = pending.pop()
+            if id(target) in closure:
+                continue
+            closure.add(id(target))
+            pending.extend(getNeighbors(target))
+        return closure
 
     def read(self):
         f = open(self.path, "r")
@@ -116,6 +275,7 @@ class Project:
                         if currTarget.path != "":
                             Logger().writeError("Project targets can only have one 'Path' defined", "", "", self.path, lineCount)
                             return False
+                        currTarget.origPath = currPair[1]
                         currTarget.path = currPair[1]
                     elif currName == "output":
                         if currTarget.outputPathSpecified:
@@ -123,6 +283,16 @@ class Project:
                             return False
                         currTarget.outputPath = utilityFunctions.includeTrailingPathDelimiter(currPair[1])
                         currTarget.outputPathSpecified = True
+                    elif currName == "checksum":
+                        if currTarget.checksum != "":
+                            Logger().writeError("Project targets can only have one 'Checksum' defined", "", "", self.path, lineCount)
+                            return False
+                        try:
+                            mdDownloadCache.parseChecksum(currPair[1])
+                        except ValueError, e:
+                            Logger().writeError(str(e), currTarget.name, "", self.path, lineCount)
+                            return False
+                        currTarget.checksum = currPair[1]
                     elif currName == "dependson":
                         if currTarget.dependsOn != []:
                             Logger().writeError("Project targets can only have one 'DependsOn' defined (use a comma delimited list for multiple dependancies)", "", "", self.path, lineCount)
@@ -141,7 +311,7 @@ class Project:
                             return False
                         if currPair[1] != "":
                             aliases = utilityFunctions.stripItemsInList(currPair[1].split(","))
-                            noralizedName = mdTarget.normalizeName(currTarget.name)
+                            normalizedName = mdTarget.normalizeName(currTarget.name)
                             for alias in aliases:
                                 if mdTarget.normalizeName(alias) == normalizedName:
                                     Logger().writeError("Project target alias cannot be same as its name", currTarget.name, "", self.path, lineCount)
@@ -189,7 +359,7 @@ class Project:
 
         for currTarget in self.targets:
             normalizedName = mdTarget.normalizeName(currTarget.name)
-            checkedDependancies = []
+            checkedDependancies = set()
             for dependancy in currTarget.dependsOn:
                 normalizedDepedancy = mdTarget.normalizeName(dependancy)
                 if normalizedDepedancy == normalizedName:
@@ -201,41 +371,85 @@ class Project:
                 if self.getTarget(dependancy) is None:
                     Logger().writeError("Target has non-existant dependancy '" + dependancy + "'", currTarget.name, "", self.path)
                     return False
-                checkedDependancies.append(normalizedDepedancy)
-
-        path = [mdTarget.normalizeName(self.targets[0].name)]
-        return self.__searchPathsForCycles(path)
+                checkedDependancies.add(normalizedDepedancy)
 
-    def __searchPathsForCycles(self, path):
-        currTarget = self.getTarget(path[len(path)-1])
-        for dependancy in currTarget.dependsOn:
-            normalizedDependancy = mdTarget.normalizeName(dependancy)
-            if normalizedDependancy in path:
-                return False
-            path.append(normalizedDependancy)
-            if not self.__searchPathsForCycles(path):
-                return False
-            path.pop()
+        graph = self.__analyzeDependancies()
+        if len(graph.cycle) != 0:
+            self.__reportDependancyCycle(graph)
+            return False
         return True
 
-    def __assignDepthToTargetList(self):
-        q = Queue.Queue()
-        for target in self.targets:
-            q.put(target.name)
-            while not q.empty():
-                currName = q.get()
-                currTarget = self.getTarget(currName)
-                for currChildName in currTarget.dependsOn:
-                    currChildTarget = self.getTarget(currChildName)
-                    if currChildTarget.dependancyDepth < (currTarget.dependancyDepth + 1):
-                        currChildTarget.dependancyDepth = currTarget.dependancyDepth + 1
-                        q.put(currChildName)
-
-    def __sortTargetList(self, targetList):
-        if targetList == []:
-            return []
-        else:
-            pivot = targetList[0]
-            greater = self.__sortTargetList([x for x in targetList[1:] if x.dependancyDepth >= pivot.dependancyDepth])
-            lesser = self.__sortTargetList([x for x in targetList[1:] if x.dependancyDepth < pivot.dependancyDepth])
-            return lesser + [pivot] + greater
\ No newline at end of file
+    def __analyzeDependancies(self):
+        #Kahn's algorithm over the dependsOn edges, O(targets + dependancies)
+        graph = DependancyGraph()
+        targetCount = len(self.targets)
+        indexes = dict()
+        for i in range(targetCount):
+            indexes[id(self.targets[i])] = i
+        dependancies = []
+        dependents = [[] for i in range(targetCount)]
+        remainingDependents = [0] * targetCount
+        for i in range(targetCount):
+            currDependancies = []
+            for dependancyName in self.targets[i].dependsOn:
+                dependancy = self.getTarget(dependancyName)
+                #Missing and duplicate dependancies are reported by validate
+                if dependancy == None or indexes[id(dependancy)] in currDependancies:
+                    continue
+                j = indexes[id(dependancy)]
+                currDependancies.append(j)
+                dependents[j].append(i)
+                remainingDependents[j] += 1
+            dependancies.append(currDependancies)
+
+        depths = [0] * targetCount
+        processed = [False] * targetCount
+        processedCount = 0
+        queue = collections.deque([i for i in range(targetCount) if remainingDependents[i] == 0])
+        while len(queue) != 0:
+            i = queue.popleft()
+            processed[i] = True
+            processedCount += 1
+            for j in dependancies[i]:
+                depths[j] = max(depths[j], depths[i] + 1)
+                remainingDependents[j] -= 1
+                if remainingDependents[j] == 0:
+                    queue.append(j)
+
+        if processedCount != targetCount:
+            #Every unprocessed target still has an unprocessed dependent, so walking
+            # dependents from one of them has to come back around to a visited target
+            i = processed.index(False)
+            path = []
+            positions = dict()
+            while not i in positions:
+                positions[i] = len(path)
+                path.append(i)
+                i = [k for k in dependents[i] if not processed[k]][0]
+            cycle = path[positions[i]:]
+            cycle.reverse()
+            graph.cycle = [self.targets[k] for k in cycle]
+            return graph
+
+        for i in range(targetCount):
+            self.targets[i].dependancyDepth = depths[i]
+            while len(graph.levels) <= depths[i]:
+                graph.levels.append([])
+            graph.levels[depths[i]].append(self.targets[i])
+        for level in graph.levels:
+            graph.order.extend(level)
+        return graph
+
+    def __reportDependancyCycle(self, graph):
+        cycleNames = [target.name for target in graph.cycle]
+        cycleNames.append(cycleNames[0])
+        Logger().writeError("Dependancy cycle found: " + " -> ".join(cycleNames), "", "", self.path)
+
+class DependancyGraph:
+    def __init__(self):
+        #Dependents come before their dependancies, the order targets are sorted in
+        self.order = []
+        #Targets grouped by dependancyDepth
+        self.levels = []
+        #Targets forming a dependancy cycle, each depends on the next and the last on the first
+        self.cycle = []
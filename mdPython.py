@@ -54,28 +54,75 @@ def parsePythonCommand(command):
 
     return isPythonCommand, namespace, function
 
-def callPythonCommand(namespace, function, target, options):
+__importedNamespaces = dict()
+
+def importNamespace(namespace):
+    #Modules are looked up on disk and imported once per process
+    importedNamespace = __importedNamespaces.get(namespace)
+    if importedNamespace != None:
+        return importedNamespace
     filename = namespace + ".py"
     if not namespace == "mdSteps" and not os.path.exists(filename):
         Logger().writeError("Expected python file, " + filename + ", not found")
+        return None
+    if os.path.isdir(filename):
+        Logger().writeError("Expected python file, " + filename + ", found directory")
+        return None
+    if not "." in sys.path:
+        sys.path.append(".")
+    importedNamespace = __import__(namespace)
+    __importedNamespaces[namespace] = importedNamespace
+    return importedNamespace
+
+__workerLoggerSettings = None
+
+def initializeWorker(namespaces, loggerName="", logDir=""):
+    #Runs once in each worker process, so steps do not pay for importing their module.
+    # The pool is forked before MixDown cleans its log directory, so the logger is set up on the first step.
+    global __workerLoggerSettings
+    __workerLoggerSettings = (loggerName, logDir)
+    for namespace in namespaces:
+        try:
+            importNamespace(namespace)
+        except ImportError:
+            #Reported by the step that uses it
+            pass
+
+def runPythonCommand(namespace, function, pythonCallInfo):
+    #Entry point in worker processes, pythonCallInfo is pickled there and back
+    global __workerLoggerSettings
+    if __workerLoggerSettings != None:
+        SetLogger(*__workerLoggerSettings)
+        __workerLoggerSettings = None
+        pythonCallInfo.logger = Logger()
+    importedNamespace = importNamespace(namespace)
+    if importedNamespace == None:
+        pythonCallInfo.success = False
+        return pythonCallInfo
+    return getattr(importedNamespace, function)(pythonCallInfo)
+
+def callPythonCommand(namespace, function, target, options):
+    workerPool = options.pythonWorkerPool
+    if workerPool == None and importNamespace(namespace) == None:
         return False
-    else:
-        if os.path.isdir(filename):
-            Logger().writeError("Expected python file, " + filename + ", found directory")
-            return False
-        if not "." in sys.path:
-            sys.path.append(".")
-        importedNamespace = __import__(namespace)
 
     try:
         target.pythonCallInfo.success = False
         target.pythonCallInfo.currentPath = target.path
         target.pythonCallInfo.outputPath = target.outputPath
+        target.pythonCallInfo.outputPathSpecified = target.outputPathSpecified
         target.pythonCallInfo.downloadDir = options.downloadDir
-        pythonCallInfo = getattr(importedNamespace, function)(target.pythonCallInfo)
+        target.pythonCallInfo.downloadCache = options.getDownloadCache()
+        target.pythonCallInfo.checksum = target.checksum
+        target.pythonCallInfo.streamDownloads = options.streamDownloads
+        if workerPool != None:
+            #Only this thread waits, other targets' steps keep running
+            pythonCallInfo = workerPool.apply(runPythonCommand, (namespace, function, target.pythonCallInfo))
+        else:
+            pythonCallInfo = runPythonCommand(namespace, function, target.pythonCallInfo)
     except AttributeError as e:
         Logger().writeError(namespace + " does not have a function called '" + function + "'")
-        Logger().writeError(e)
+        Logger().writeError(str(e))
         return False
 
     if not pythonCallInfo.success:
@@ -91,5 +138,19 @@ class PythonCallInfo:
         self.success = False
         self.currentPath = ""
         self.outputPath = ""
+        self.outputPathSpecified = False
         self.downloadDir = ""
-        self.logger = Logger()
\ No newline at end of file
+        self.downloadCache = None
+        self.checksum = ""
+        self.streamDownloads = False
+        self.logger = Logger()
+
+    def __getstate__(self):
+        #The logger stays in its process, the receiving side uses its own
+        state = self.__dict__.copy()
+        del state["logger"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = Logger()
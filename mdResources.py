@@ -0,0 +1,94 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os
+
+meminfoPath = "/proc/meminfo"
+
+def getLoadAverage():
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+def __readMeminfo(field):
+    #Values in meminfo are given in kilobytes, returned in megabytes
+    try:
+        meminfoFile = open(meminfoPath, "r")
+    except IOError:
+        return None
+    try:
+        for line in meminfoFile:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == field + ":":
+                return int(parts[1]) / 1024.0
+    finally:
+        meminfoFile.close()
+    return None
+
+def getAvailableMemory():
+    return __readMeminfo("MemAvailable")
+
+def getTotalMemory():
+    return __readMeminfo("MemTotal")
+
+class AdmissionControl:
+    #Decides whether another step may start next to the ones already running. A maxLoad or
+    # memoryLimit of 0 disables that check, memory is given in megabytes.
+    def __init__(self, maxLoad=0, memoryLimit=0, loadFunction=getLoadAverage, memoryFunction=getAvailableMemory):
+        self.maxLoad = maxLoad
+        self.memoryLimit = memoryLimit
+        self.loadFunction = loadFunction
+        self.memoryFunction = memoryFunction
+        self.reservedMemory = 0.0
+
+    def canAdmit(self, reservation, runningSteps):
+        #A lone step always runs, otherwise a step larger than the limits could never start
+        if runningSteps == 0:
+            return True
+        if self.maxLoad > 0:
+            load = self.loadFunction()
+            if load != None and load >= self.maxLoad:
+                return False
+        if self.memoryLimit > 0 and self.reservedMemory + reservation > self.memoryLimit:
+            return False
+        if reservation > 0:
+            available = self.memoryFunction()
+            #Memory taken outside of MixDown counts against the reservation as well
+            if available != None and reservation > available:
+                return False
+        return True
+
+    def reserve(self, reservation):
+        self.reservedMemory += reservation
+
+    def release(self, reservation):
+        self.reservedMemory = max(0.0, self.reservedMemory - reservation)
+
+def createAdmissionControl(options):
+    memoryLimit = options.memoryLimit
+    if memoryLimit == 0:
+        #Without a limit, reservations may add up to the physical memory
+        totalMemory = getTotalMemory()
+        if totalMemory != None:
+            memoryLimit = totalMemory
+    return AdmissionControl(options.maxLoad, memoryLimit)
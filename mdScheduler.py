@@ -0,0 +1,298 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import heapq, threading, mdArtifactCache, mdCommands, mdHistory, mdResources, mdStrings, mdTarget
+
+from mdLogger import *
+
+#The build plan is a graph of (target, step) nodes. A target's steps run in order, and
+# only the first step after its source steps waits for its dependancies' installs.
+sourceSteps = ["fetch", "unpack", "patch", "preconfig"]
+#Source steps mostly waiting on the network or disk, they get their own slots
+fetchSteps = ["fetch", "unpack"]
+#Steps whose make may run up to -j jobs at once
+makeSteps = ["build", "install", "clean"]
+
+def getTargetSteps(options):
+    if options.cleanTargets:
+        return ["clean"]
+    steps = mdCommands.getBuildStepList()
+    steps.remove("clean")
+    return steps
+
+def buildStep(stepName, target, options, runStep=mdCommands.buildStepActor):
+    artifactCache = options.artifactCache
+    if artifactCache != None:
+        if target.artifactRestored:
+            return True
+        if stepName == "config":
+            #Dependancies are installed by now, so their fingerprints are known
+            target.artifactFingerprint = mdArtifactCache.getArtifactFingerprint(target, options)
+            if artifactCache.restore(target, options):
+                target.artifactRestored = True
+                return True
+        if stepName == "install" and target.artifactFingerprint != "":
+            return artifactCache.install(target, options, runStep)
+    return runStep(stepName, target, options)
+
+def loadExcludedFingerprints(project, options):
+    #Targets left out of the build are not fingerprinted while it runs, their dependents
+    # get what an earlier build recorded so their own fingerprints stay the same
+    #Dependents come first in project order, their fingerprints need their dependancies'
+    for target in reversed(project.excludedTargets):
+        if options.stateDatabase != None:
+            record = options.stateDatabase.getRecord(target.name, "install")
+            if record != None:
+                target.stepFingerprints["install"] = str(record["fingerprint"])
+        if options.artifactCache != None:
+            #Content based, the same as when the target was built
+            target.artifactFingerprint = mdArtifactCache.getArtifactFingerprint(target, options)
+
+class Scheduler:
+    def __init__(self, project, options, stepActor=buildStep):
+        self.project = project
+        self.options = options
+        self.stepActor = stepActor
+        self.steps = getTargetSteps(options)
+        self.jobSlots = max(1, options.targetJobSlots)
+        self.fetchJobSlots = options.fetchJobSlots
+        self.admissionControl = mdResources.createAdmissionControl(options)
+        makeJobSlots = options.getDefine(mdStrings.mdDefineJobSlots)
+        if makeJobSlots.isdigit() and int(makeJobSlots) > 0:
+            self.makeJobSlots = int(makeJobSlots)
+        else:
+            self.makeJobSlots = 1
+        self.keepGoing = options.keepGoing
+        self.succeeded = True
+        self.failedTargets = []
+        self.blockedTargets = dict()
+        self.priorities = dict()
+        self.__condition = threading.Condition()
+        self.__ready = []
+        self.__readyFetches = []
+        self.__readyCount = 0
+        self.__running = 0
+        self.__runningFetches = 0
+        self.__finished = 0
+        self.__nextStep = dict()
+        self.__remainingDependancies = dict()
+        self.__dependents = dict()
+        self.__waitingForDependancies = set()
+
+    def __buildGraph(self):
+        #Clean mode does not need dependancies to be installed, every target is ready
+        for target in reversed(self.project.targets):
+            name = mdTarget.normalizeName(target.name)
+            self.__nextStep[name] = 0
+            self.__remainingDependancies[name] = set()
+            self.__dependents.setdefault(name, [])
+            if self.options.cleanTargets:
+                continue
+            for dependancy in self.project.getDependancies(target):
+                dependancyName = mdTarget.normalizeName(dependancy.name)
+                self.__remainingDependancies[name].add(dependancyName)
+                self.__dependents.setdefault(dependancyName, []).append(target)
+        self.__assignPriorities()
+        #Every target's source steps can start right away
+        for target in reversed(self.project.targets):
+            self.__pushNextStep(target)
+
+    def __assignPriorities(self):
+        #A target's priority is the longest chain of recorded build time from it through its
+        # dependents, so the start of the critical path is launched first
+        history = self.options.buildHistory
+        pendingDependents = dict()
+        queue = []
+        for target in self.project.targets:
+            name = mdTarget.normalizeName(target.name)
+            pendingDependents[name] = len(self.__dependents[name])
+            if pendingDependents[name] == 0:
+                queue.append(target)
+        while len(queue) != 0:
+            target = queue.pop()
+            name = mdTarget.normalizeName(target.name)
+            if history != None:
+                duration = history.getTargetDuration(target.name)
+            else:
+                duration = mdHistory.defaultTargetDuration
+            downstream = 0
+            for dependent in self.__dependents[name]:
+                downstream = max(downstream, self.priorities[mdTarget.normalizeName(dependent.name)])
+            self.priorities[name] = duration + downstream
+            for dependancyName in self.__remainingDependancies[name]:
+                pendingDependents[dependancyName] -= 1
+                if pendingDependents[dependancyName] == 0:
+                    queue.append(self.project.getTarget(dependancyName))
+
+    def __pushNextStep(self, target):
+        name = mdTarget.normalizeName(target.name)
+        stepIndex = self.__nextStep[name]
+        if stepIndex == len(self.steps):
+            self.__finishTarget(target)
+            return
+        if name in self.blockedTargets:
+            return
+        stepName = self.steps[stepIndex]
+        if not stepName in sourceSteps and len(self.__remainingDependancies[name]) != 0:
+            self.__waitingForDependancies.add(name)
+            return
+        #Ties keep the order steps became ready in, deepest targets first initially
+        entry = (-self.priorities[name], self.__readyCount, target, stepName)
+        self.__readyCount += 1
+        if stepName in fetchSteps and self.fetchJobSlots > 0:
+            heapq.heappush(self.__readyFetches, entry)
+        else:
+            heapq.heappush(self.__ready, entry)
+
+    def __finishTarget(self, target):
+        self.__finished += 1
+        name = mdTarget.normalizeName(target.name)
+        for dependent in self.__dependents[name]:
+            dependentName = mdTarget.normalizeName(dependent.name)
+            remaining = self.__remainingDependancies[dependentName]
+            remaining.discard(name)
+            if len(remaining) == 0 and dependentName in self.__waitingForDependancies:
+                self.__waitingForDependancies.remove(dependentName)
+                self.__pushNextStep(dependent)
+
+    def __getReservation(self, target, stepName):
+        #A step is expected to need as much memory as its peak in the last run
+        history = self.options.buildHistory
+        if history == None:
+            return 0
+        peakMemory = history.getStepPeakMemory(target.name, stepName)
+        if peakMemory == None:
+            return 0
+        #The recorded peak is that of the largest single process, such as one compiler
+        if stepName in makeSteps:
+            return peakMemory * self.makeJobSlots
+        return peakMemory
+
+    def __blockDependents(self, failedTarget):
+        #Steps of blocked targets already queued are dropped when they come up
+        failedName = mdTarget.normalizeName(failedTarget.name)
+        self.failedTargets.append(failedTarget.name)
+        #A blocked target whose source steps failed on their own is reported as failed
+        self.blockedTargets.pop(failedName, None)
+        pending = list(self.__dependents[failedName])
+        while len(pending) != 0:
+            dependent = pending.pop()
+            dependentName = mdTarget.normalizeName(dependent.name)
+            if dependentName in self.blockedTargets or dependent.name in self.failedTargets:
+                continue
+            self.blockedTargets[dependentName] = failedTarget.name
+            pending.extend(self.__dependents[dependentName])
+
+    def __dropBlockedSteps(self, readyQueue):
+        while len(readyQueue) > 0 and mdTarget.normalizeName(readyQueue[0][2].name) in self.blockedTargets:
+            heapq.heappop(readyQueue)
+
+    def __canLaunch(self):
+        #Fail fast unless asked to keep going with everything the failure does not block
+        return self.succeeded or self.keepGoing
+
+    def __runStep(self, target, stepName, reservation):
+        isFetch = stepName in fetchSteps and self.fetchJobSlots > 0
+        #The token held here is the implicit job slot of the step's make
+        jobServer = self.options.jobServer
+        if jobServer != None and not isFetch:
+            token = jobServer.acquire()
+        try:
+            try:
+                succeeded = self.stepActor(stepName, target, self.options)
+            except:
+                succeeded = False
+                Logger().writeError("Unexpected exception while running step", target.name, stepName)
+        finally:
+            if jobServer != None and not isFetch:
+                jobServer.release(token)
+        self.__condition.acquire()
+        try:
+            if isFetch:
+                self.__runningFetches -= 1
+            else:
+                self.__running -= 1
+                self.admissionControl.release(reservation)
+            if not succeeded:
+                self.succeeded = False
+                if self.keepGoing:
+                    self.__blockDependents(target)
+            else:
+                self.__nextStep[mdTarget.normalizeName(target.name)] += 1
+                self.__pushNextStep(target)
+            self.__condition.notify()
+        finally:
+            self.__condition.release()
+
+    def __startStep(self, readyQueue, reservation=0):
+        priority, readyCount, target, stepName = heapq.heappop(readyQueue)
+        thread = threading.Thread(target=self.__runStep, args=(target, stepName, reservation))
+        thread.daemon = True
+        thread.start()
+
+    def run(self):
+        self.__condition.acquire()
+        try:
+            if not self.options.cleanTargets:
+                loadExcludedFingerprints(self.project, self.options)
+            self.__buildGraph()
+            while True:
+                self.__dropBlockedSteps(self.__readyFetches)
+                while self.__canLaunch() and len(self.__readyFetches) > 0 and self.__runningFetches < self.fetchJobSlots:
+                    self.__runningFetches += 1
+                    self.__startStep(self.__readyFetches)
+                    self.__dropBlockedSteps(self.__readyFetches)
+                self.__dropBlockedSteps(self.__ready)
+                while self.__canLaunch() and len(self.__ready) > 0 and self.__running < self.jobSlots:
+                    #Steps are admitted in priority order, a step that does not fit holds back the rest
+                    target, stepName = self.__ready[0][2:]
+                    reservation = self.__getReservation(target, stepName)
+                    if not self.admissionControl.canAdmit(reservation, self.__running):
+                        break
+                    self.admissionControl.reserve(reservation)
+                    self.__running += 1
+                    self.__startStep(self.__ready, reservation)
+                    self.__dropBlockedSteps(self.__ready)
+                if self.__running == 0 and self.__runningFetches == 0:
+                    break
+                #Timeout keeps the main thread responsive to KeyboardInterrupt and rechecks the load
+                self.__condition.wait(1.0)
+        finally:
+            self.__condition.release()
+
+        if self.__finished + len(self.failedTargets) + len(self.blockedTargets) != len(self.project.targets) and\
+           (self.succeeded or self.keepGoing):
+            Logger().writeError("Not all targets could be scheduled, check the project for dependancy cycles")
+            self.succeeded = False
+        return self.succeeded
+
+    def writeSummary(self):
+        if len(self.failedTargets) == 0:
+            return
+        message = "Failed targets: " + ", ".join(self.failedTargets)
+        if len(self.blockedTargets) != 0:
+            message += "\nBlocked targets:"
+            for target in self.project.targets:
+                name = mdTarget.normalizeName(target.name)
+                if name in self.blockedTargets:
+                    message += "\n  " + target.name + " (by " + self.blockedTargets[name] + ")"
+        Logger().writeMessage(message)
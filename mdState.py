@@ -0,0 +1,152 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import hashlib, json, os, threading, mdTarget
+
+stateFileName = "mdState.json"
+
+#Steps skipped when their fingerprint is current. Build always runs again, make and the
+# like decide for themselves what is out of date in a kept build tree. Install is only
+# current while the tree is as the last install left it, so a rebuild installs again.
+reusableSteps = ["fetch", "unpack", "patch", "preconfig", "config", "install"]
+treeCheckedSteps = ["install"]
+
+def __pathSignature(path):
+    #Local sources are identified by size and modification time, remote ones by location only
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return "file:" + str(stat.st_size) + ":" + str(int(stat.st_mtime))
+    elif os.path.isdir(path):
+        return "dir:" + str(int(os.stat(path).st_mtime))
+    return "location:" + path
+
+def getTreeSignature(path):
+    #Newest modification time in the tree, anything the build writes or removes changes it
+    newest = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                newest = max(newest, os.lstat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                pass
+    return repr(newest)
+
+def getStepFingerprint(stepName, target, command):
+    fingerprint = hashlib.sha1()
+    fingerprint.update(stepName + "\0" + command + "\0")
+    fingerprint.update(target.path + "\0" + target.outputPath + "\0")
+    previousStep = target.lastFingerprintedStep
+    if previousStep == "":
+        fingerprint.update(__pathSignature(target.origPath or target.path) + "\0" + target.checksum + "\0")
+    else:
+        fingerprint.update(target.stepFingerprints[previousStep] + "\0")
+    #Only configuring sees what the dependancies installed
+    if stepName == "config":
+        for dependancyTarget in target.dependancyTargets:
+            fingerprint.update(dependancyTarget.stepFingerprints.get("install", "") + "\0")
+    return fingerprint.hexdigest()
+
+class StateDatabase:
+    def __init__(self, path):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__records = dict()
+        self.read()
+
+    def read(self):
+        if not os.path.isfile(self.path):
+            return
+        stateFile = open(self.path, "r")
+        try:
+            try:
+                self.__records = json.load(stateFile)
+            except ValueError:
+                #A corrupt state file only costs a rebuild
+                self.__records = dict()
+        finally:
+            stateFile.close()
+
+    def write(self):
+        directory = os.path.dirname(self.path)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tempPath = self.path + ".tmp"
+        stateFile = open(tempPath, "w")
+        try:
+            json.dump(self.__records, stateFile, indent=1, sort_keys=True)
+        finally:
+            stateFile.close()
+        os.rename(tempPath, self.path)
+
+    def hasTarget(self, targetName):
+        return mdTarget.normalizeName(targetName) in self.__records
+
+    def getRecord(self, targetName, stepName):
+        return self.__records.get(mdTarget.normalizeName(targetName), dict()).get(stepName)
+
+    def isStepCurrent(self, targetName, stepName, fingerprint):
+        record = self.getRecord(targetName, stepName)
+        if record == None or record["fingerprint"] != fingerprint:
+            return False
+        if not os.path.exists(record["path"]):
+            return False
+        if stepName in treeCheckedSteps:
+            return record.get("tree") == getTreeSignature(record["path"])
+        return True
+
+    def setRecord(self, targetName, stepName, fingerprint, path):
+        record = {"fingerprint": fingerprint, "path": path}
+        if stepName in treeCheckedSteps:
+            #Taken after the step, so what it wrote into the tree itself does not count as a change
+            record["tree"] = getTreeSignature(path)
+        self.__lock.acquire()
+        try:
+            targetRecords = self.__records.setdefault(mdTarget.normalizeName(targetName), dict())
+            targetRecords[stepName] = record
+            self.write()
+        finally:
+            self.__lock.release()
+
+    def removeRecord(self, targetName, stepName):
+        self.__lock.acquire()
+        try:
+            targetRecords = self.__records.get(mdTarget.normalizeName(targetName), dict())
+            if stepName in targetRecords:
+                del targetRecords[stepName]
+                self.write()
+        finally:
+            self.__lock.release()
+
+    def removeTarget(self, targetName, keptSteps=[]):
+        self.__lock.acquire()
+        try:
+            normalizedName = mdTarget.normalizeName(targetName)
+            targetRecords = self.__records.get(normalizedName)
+            if targetRecords != None:
+                for stepName in targetRecords.keys():
+                    if not stepName in keptSteps:
+                        del targetRecords[stepName]
+                if len(targetRecords) == 0:
+                    del self.__records[normalizedName]
+                self.write()
+        finally:
+            self.__lock.release()
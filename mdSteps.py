@@ -20,52 +20,88 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, tarfile, urllib, mdGit, mdHg, mdSvn, utilityFunctions
+import distutils.dir_util, os, tarfile, mdCompression, mdGit, mdHg, mdPath, mdSvn, utilityFunctions
 
 from mdLogger import *
 
 def fetch(pythonCallInfo):
-    if mdGit.isGitRepo(pythonCallInfo.currentPath):
+    pathType = mdPath.classify(pythonCallInfo.currentPath)
+    if pathType == mdPath.pathTypeGit:
         if not mdGit.gitCheckout(pythonCallInfo.currentPath, pythonCallInfo.outputPath):
             pythonCallInfo.logger.writeError("Given Git repo '" + pythonCallInfo.currentPath +"' was unable to be checked out")
         else:
             pythonCallInfo.currentPath = pythonCallInfo.outputPath
             pythonCallInfo.success = True
-    elif mdHg.isHgRepo(pythonCallInfo.currentPath):
+    elif pathType == mdPath.pathTypeHg:
         if not mdHg.hgCheckout(pythonCallInfo.currentPath, pythonCallInfo.outputPath):
             pythonCallInfo.logger.writeError("Given Hg repo '" + pythonCallInfo.currentPath +"' was unable to be checked out")
         else:
             pythonCallInfo.currentPath = pythonCallInfo.outputPath
             pythonCallInfo.success = True
-    elif mdSvn.isSvnRepo(pythonCallInfo.currentPath):
+    elif pathType == mdPath.pathTypeSvn:
         if not mdSvn.svnCheckout(pythonCallInfo.currentPath, pythonCallInfo.outputPath):
             pythonCallInfo.logger.writeError("Given Svn repo '" + pythonCallInfo.currentPath +"' was unable to be checked out")
         else:
             pythonCallInfo.currentPath = pythonCallInfo.outputPath
             pythonCallInfo.success = True
-    elif utilityFunctions.isURL(pythonCallInfo.currentPath):
+    elif pathType == mdPath.pathTypeURL:
         filenamePath = pythonCallInfo.downloadDir + utilityFunctions.URLToFilename(pythonCallInfo.currentPath)
         if not os.path.exists(pythonCallInfo.downloadDir):
-            os.mkdir(pythonCallInfo.downloadDir)
-        urllib.urlretrieve(pythonCallInfo.currentPath, filenamePath)
-        pythonCallInfo.currentPath = filenamePath
-        pythonCallInfo.success = True
-    elif os.path.isdir(pythonCallInfo.currentPath):
-        if pythonCallInfo.outputSpecified:
+            #Another target's fetch may create it concurrently
+            try:
+                os.mkdir(pythonCallInfo.downloadDir)
+            except OSError:
+                if not os.path.isdir(pythonCallInfo.downloadDir):
+                    raise
+        try:
+            downloadCache = pythonCallInfo.downloadCache
+            if pythonCallInfo.streamDownloads and pythonCallInfo.currentPath.lower().endswith(mdPath.tarExtensions) and\
+               downloadCache.lookup(pythonCallInfo.currentPath, pythonCallInfo.checksum) == "":
+                __streamUnpack(pythonCallInfo)
+                downloadCache.fetch(pythonCallInfo.currentPath, filenamePath, pythonCallInfo.checksum)
+                #Already unpacked, the unpack step has nothing left to do
+                pythonCallInfo.currentPath = pythonCallInfo.outputPath
+            else:
+                downloadCache.fetch(pythonCallInfo.currentPath, filenamePath, pythonCallInfo.checksum)
+                pythonCallInfo.currentPath = filenamePath
+            pythonCallInfo.success = True
+        except (IOError, OSError, ValueError, tarfile.TarError), e:
+            pythonCallInfo.logger.writeError("Given URL '" + pythonCallInfo.currentPath + "' was unable to be downloaded: " + str(e))
+    elif pathType == mdPath.pathTypeDirectory:
+        if pythonCallInfo.outputPathSpecified:
             distutils.dir_util.copy_tree(pythonCallInfo.currentPath, pythonCallInfo.outputPath)
-            pythonCallInfo.currentPath = self.pythonCallInfo.outputPath
+            pythonCallInfo.currentPath = pythonCallInfo.outputPath
         pythonCallInfo.success = True
-    elif os.path.isfile(pythonCallInfo.currentPath):
+    elif pathType == mdPath.pathTypeFile:
         pythonCallInfo.success = True
 
     return pythonCallInfo
 
+def __streamUnpack(pythonCallInfo):
+    #The tarball is extracted as it arrives while the download cache stores it
+    def extract(stream):
+        tar = tarfile.open(fileobj=stream, mode="r|*")
+        try:
+            utilityFunctions.untarStream(tar, pythonCallInfo.outputPath, True)
+        finally:
+            tar.close()
+    try:
+        pythonCallInfo.downloadCache.download(pythonCallInfo.currentPath, pythonCallInfo.checksum, extract)
+    except:
+        #Includes a checksum mismatch found after extracting, nothing unverified is kept
+        if os.path.isdir(pythonCallInfo.outputPath):
+            utilityFunctions.removeDir(pythonCallInfo.outputPath)
+        raise
+
 def unpack(pythonCallInfo):
     if os.path.isfile(pythonCallInfo.currentPath):
-        if tarfile.is_tarfile(pythonCallInfo.currentPath):
-            utilityFunctions.untar(pythonCallInfo.currentPath, pythonCallInfo.outputPath, True)
-            pythonCallInfo.currentPath = pythonCallInfo.outputPath
-            pythonCallInfo.success = True
+        if mdCompression.isTarFile(pythonCallInfo.currentPath):
+            try:
+                utilityFunctions.untar(pythonCallInfo.currentPath, pythonCallInfo.outputPath, True)
+                pythonCallInfo.currentPath = pythonCallInfo.outputPath
+                pythonCallInfo.success = True
+            except (tarfile.TarError, IOError, OSError), e:
+                pythonCallInfo.logger.writeError("Given tar file '" + pythonCallInfo.currentPath + "' could not be extracted: " + str(e))
         else:
             if pythonCallInfo.currentPath.endswith(".tar.gz") or pythonCallInfo.currentPath.endswith(".tar.bz2")\
                or pythonCallInfo.currentPath.endswith(".tar") or pythonCallInfo.currentPath.endswith(".tgz")\
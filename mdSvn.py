@@ -20,21 +20,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, mdLogger, utilityFunctions
+import os, mdLogger, mdTools, utilityFunctions
 
 _isSvnInstalled = None
 
 def isSvnInstalled():
     global _isSvnInstalled
     if _isSvnInstalled == None:
-        outFile = open(os.devnull, "w")
-        try:
-            returnCode = utilityFunctions.executeSubProcess("svn --help", outFileHandle = outFile)
-        except:
-            #Assume any exceptions means Svn is not installed
-            returnCode = 1
-        outFile.close()
-        if returnCode == 0:
+        if mdTools.isToolInstalled("svn", "svn --help"):
             _isSvnInstalled = True
         else:
             mdLogger.Logger().writeMessage("Svn is not installed, svn repositories will fail to be checked out")
@@ -21,7 +21,7 @@
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
 import os, re, tarfile
-import mdAutoTools, mdCMake, mdCommands, mdGit, mdHg, mdOptions, mdPython, mdSvn, utilityFunctions
+import mdAutoTools, mdCMake, mdCommands, mdOptions, mdPath, mdPython, utilityFunctions
 
 from mdLogger import *
 
@@ -32,28 +32,32 @@ def targetPathToName(path, exitOnFailure=True):
     name = ""
     path = path.strip()
 
-    if mdGit.isGitRepo(path):
+    pathType = mdPath.classify(path)
+
+    if pathType == mdPath.pathTypeGit:
         if os.path.isdir(path):
-            name = os.path.basename(path)
-        elif utilityFunctions.isURL(path):
-            name = utilityFunctions.URLToFilename(path)
+            name = os.path.basename(utilityFunctions.stripTrailingPathDelimiter(path))
+        else:
+            name = utilityFunctions.URLToFilename(utilityFunctions.stripTrailingPathDelimiter(path))
             if name.endswith(".git"):
                 name = name[:-4]
-    elif mdSvn.isSvnRepo(path):
+    elif pathType == mdPath.pathTypeSvn:
         if path.endswith("/"):
             path = path[:-1]
         if path.endswith("/trunk"):
             path = path[:-6]
         if os.path.isdir(path):
             name = os.path.basename(path)
-        elif utilityFunctions.isURL(path):
+        else:
             name = utilityFunctions.URLToFilename(path)
-    elif utilityFunctions.isURL(path):
+    elif pathType == mdPath.pathTypeHg:
+        name = os.path.basename(utilityFunctions.stripTrailingPathDelimiter(path))
+    elif pathType == mdPath.pathTypeURL:
         name = utilityFunctions.URLToFilename(path)
         name = utilityFunctions.splitFileName(name)[0]
-    elif os.path.isfile(path) and tarfile.is_tarfile(path):
+    elif pathType == mdPath.pathTypeFile and tarfile.is_tarfile(path):
         name = utilityFunctions.splitFileName(path)[0]
-    elif os.path.isdir(path):
+    elif pathType == mdPath.pathTypeDirectory:
         name = os.path.basename(path)
     else:
         Logger().writeError("Could not convert given target path to name: " + path, exitProgram=exitOnFailure)
@@ -69,7 +73,14 @@ class Target:
         self.outputPathSpecified = False
         self.dependancyDepth = 0
         self.dependsOn = []
+        self.dependancyTargets = []
+        self.stepFingerprints = dict()
+        self.lastFingerprintedStep = ""
+        self.artifactRestored = False
+        self.artifactFingerprint = ""
+        self.installManifest = None
         self.skipSteps = []
+        self.checksum = ""
         self.pythonCallInfo = mdPython.PythonCallInfo()
         self.commands = dict()
         for step in mdCommands.getBuildStepList():
@@ -134,6 +145,8 @@ class Target:
             retStr += "Path: " + self.path + "\n"
         if len(self.aliases) != 0:
             retStr += "Aliases: " + ",".join(self.aliases) + "\n"
+        if self.checksum != "":
+            retStr += "Checksum: " + self.checksum + "\n"
         if self.outputPathSpecified:
             retStr += "Output: " + self.outputPath + "\n"
         if len(self.dependsOn) != 0:
@@ -0,0 +1,102 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import json, os, threading, utilityFunctions
+
+toolCacheFileName = "tools.json"
+
+__stateDir = ""
+__lock = threading.Lock()
+
+def setStateDir(stateDir):
+    global __stateDir
+    __stateDir = stateDir
+
+def getToolCachePath():
+    stateDir = __stateDir
+    if stateDir == "":
+        stateDir = utilityFunctions.getStateDir()
+    return utilityFunctions.includeTrailingPathDelimiter(stateDir) + toolCacheFileName
+
+def findExecutable(name):
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return os.path.realpath(candidate)
+    return ""
+
+def __readToolCache(path):
+    try:
+        cacheFile = open(path, "r")
+        try:
+            return json.load(cacheFile)
+        finally:
+            cacheFile.close()
+    except (IOError, ValueError):
+        return dict()
+
+def __writeToolCache(path, cache):
+    try:
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        tempPath = path + "." + str(os.getpid()) + ".tmp"
+        cacheFile = open(tempPath, "w")
+        try:
+            json.dump(cache, cacheFile, indent=1, sort_keys=True)
+        finally:
+            cacheFile.close()
+        os.rename(tempPath, path)
+    except (IOError, OSError):
+        #Not being able to cache only costs a probe next run
+        pass
+
+def isToolInstalled(name, probeCommand):
+    #The probe result is cached across runs, keyed on PATH and the binary's modification time
+    executable = findExecutable(name)
+    if executable == "":
+        return False
+    mtime = int(os.stat(executable).st_mtime)
+    searchPath = os.environ.get("PATH", "")
+
+    __lock.acquire()
+    try:
+        cachePath = getToolCachePath()
+        cache = __readToolCache(cachePath)
+        if cache.get("path") != searchPath:
+            cache = {"path": searchPath, "tools": dict()}
+        entry = cache["tools"].get(name)
+        if entry != None and entry["executable"] == executable and entry["mtime"] == mtime:
+            return entry["installed"]
+
+        outFile = open(os.devnull, "w")
+        try:
+            returnCode = utilityFunctions.executeSubProcess(probeCommand, outFileHandle = outFile)
+        except:
+            returnCode = 1
+        outFile.close()
+        installed = returnCode == 0
+        cache["tools"][name] = {"executable": executable, "mtime": mtime, "installed": installed}
+        __writeToolCache(cachePath, cache)
+        return installed
+    finally:
+        __lock.release()
@@ -23,7 +23,7 @@
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
 import sys, unittest
-import test_mdAutoTools, test_mdCMake, test_mdCvs, test_mdGit, test_mdHg, test_mdSvn, test_mdProject, test_mdTarget
+import test_mdArtifactCache, test_mdAutoTools, test_mdCMake, test_mdCompression, test_mdCvs, test_mdDistributed, test_mdDownloadCache, test_mdGit, test_mdHg, test_mdHistory, test_mdInstall, test_mdJobServer, test_mdLayout, test_mdOptions, test_mdPath, test_mdPython, test_mdSvn, test_mdProject, test_mdResources, test_mdScheduler, test_mdState, test_mdTarget, test_mdTools, test_utilityFunctions
 
 if not ".." in sys.path:
     sys.path.append("..")
@@ -32,15 +32,31 @@ import mdLogger
 def main():
     suite = unittest.TestSuite()
 
+    suite.addTest(test_mdArtifactCache.suite())
     suite.addTest(test_mdAutoTools.suite())
     suite.addTest(test_mdCMake.suite())
+    suite.addTest(test_mdCompression.suite())
     #suite.addTest(test_mdCvs.suite())
+    suite.addTest(test_mdDistributed.suite())
+    suite.addTest(test_mdDownloadCache.suite())
     suite.addTest(test_mdGit.suite())
     suite.addTest(test_mdHg.suite())
+    suite.addTest(test_mdHistory.suite())
+    suite.addTest(test_mdInstall.suite())
+    suite.addTest(test_mdJobServer.suite())
+    suite.addTest(test_mdLayout.suite())
+    suite.addTest(test_mdOptions.suite())
+    suite.addTest(test_mdPath.suite())
+    suite.addTest(test_mdPython.suite())
     #suite.addTest(test_mdSteps.suite())
     suite.addTest(test_mdSvn.suite())
     suite.addTest(test_mdProject.suite())
+    suite.addTest(test_mdResources.suite())
+    suite.addTest(test_mdScheduler.suite())
+    suite.addTest(test_mdState.suite())
     suite.addTest(test_mdTarget.suite())
+    suite.addTest(test_mdTools.suite())
+    suite.addTest(test_utilityFunctions.suite())
 
     unittest.TextTestRunner(verbosity=2).run(suite)
 
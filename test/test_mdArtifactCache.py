@@ -0,0 +1,186 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, tarfile, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdArtifactCache, mdInstall, mdLogger, mdOptions, mdProject, mdScheduler, mdState, mdStrings, mdTarget, utilityFunctions
+
+class Test_mdArtifactCache(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.prefix = self.testDir + "prefix/"
+        os.mkdir(self.prefix)
+        self.options = mdOptions.Options()
+        self.options.setDefine(mdStrings.mdDefinePrefix, self.prefix)
+        self.options.stateDir = self.testDir + "state/"
+        self.options.buildDir = self.testDir + "mdBuild/"
+        self.options.stagedInstall = True
+        self.cache = mdArtifactCache.ArtifactCache(self.testDir + "artifacts")
+
+    def tearDown(self):
+        utilityFunctions.removeDir(self.testDir)
+
+    def createTarget(self, name, contents="source"):
+        sourcePath = self.testDir + name + ".tar.gz"
+        f = open(sourcePath, "w")
+        f.write(contents)
+        f.close()
+        os.mkdir(self.testDir + name)
+        target = mdTarget.Target(name, self.testDir + name)
+        target.origPath = sourcePath
+        target.outputPath = target.path
+        self.setInstallScript(target, "mkdir -p $DESTDIR" + self.prefix + "lib && touch $DESTDIR" + self.prefix + "lib/" + name)
+        return target
+
+    def setInstallScript(self, target, script):
+        scriptFile = open(target.path + "/install.sh", "w")
+        scriptFile.write(script + "\n")
+        scriptFile.close()
+        target.commands["install"] = "sh install.sh"
+
+    def createProject(self):
+        #app depends on lib, each call gives fresh targets for the same sources
+        targets = []
+        for name, dependsOn in (("app", ["lib"]), ("lib", [])):
+            if not os.path.isdir(self.testDir + name):
+                self.createTarget(name)
+            target = mdTarget.Target(name, self.testDir + name)
+            target.origPath = self.testDir + name + ".tar.gz"
+            target.outputPath = target.path
+            target.skipSteps = ["fetch", "unpack", "patch", "preconfig", "build"]
+            target.commands["config"] = "true"
+            target.commands["install"] = "sh install.sh"
+            target.dependsOn = dependsOn
+            targets.append(target)
+        project = mdProject.Project("narrowed.md", targets)
+        for target in targets:
+            target.dependancyTargets = project.getDependancies(target)
+        return project
+
+    def buildProject(self, selectedTargets=[]):
+        #Every build reads the state left by the previous one
+        self.options.stateDatabase = mdState.StateDatabase(self.options.buildDir + mdState.stateFileName)
+        project = self.createProject()
+        if len(selectedTargets) != 0:
+            self.assertTrue(project.selectTargets(selectedTargets, True), "Targets could not be selected")
+        self.assertTrue(mdScheduler.Scheduler(project, self.options).run(), "Build failed")
+        return project.getTarget("app")
+
+    def test_narrowedProject(self):
+        self.options.artifactCache = self.cache
+        fingerprint = self.buildProject().artifactFingerprint
+        self.assertNotEquals(fingerprint, "", "Built target should be cacheable")
+        utilityFunctions.removeDir(self.prefix)
+        os.mkdir(self.prefix)
+        app = self.buildProject(["app"])
+        self.assertEquals(app.artifactFingerprint, fingerprint, "Left out dependancy changed the fingerprint")
+        self.assertTrue(app.artifactRestored, "Target was not restored with its dependancy left out")
+        self.assertTrue(os.path.isfile(self.prefix + "lib/app"), "Restored files are missing")
+
+    def test_narrowedProjectState(self):
+        fingerprint = self.buildProject().stepFingerprints["config"]
+        app = self.buildProject(["app"])
+        self.assertEquals(app.stepFingerprints["config"], fingerprint, "Left out dependancy changed the config fingerprint")
+
+    def test_getInstalledFiles(self):
+        target = self.createTarget("foo")
+        target.installManifest = {self.prefix + "lib/foo": {}, self.prefix + "bin/foo": {}}
+        expected = sorted(["bin/foo", "lib/foo", mdInstall.manifestDirName + "foo.json"])
+        self.assertEquals(mdArtifactCache.getInstalledFiles(target, self.prefix), expected, "Wrong installed files found")
+        target.installManifest = {"/etc/foo": {}}
+        self.assertEquals(mdArtifactCache.getInstalledFiles(target, self.prefix), None, "Files outside the prefix should not be stored")
+        target.installManifest = dict()
+        self.assertEquals(mdArtifactCache.getInstalledFiles(target, self.prefix), None, "Install without DESTDIR should not be stored")
+
+    def test_fingerprint(self):
+        target = self.createTarget("foo")
+        fingerprint = mdArtifactCache.getArtifactFingerprint(target, self.options)
+        self.assertNotEquals(fingerprint, "", "Local tarball should give a fingerprint")
+        self.assertEquals(mdArtifactCache.getArtifactFingerprint(target, self.options), fingerprint, "Fingerprint is not stable")
+        target.commands["install"] = "touch " + self.prefix + "other"
+        self.assertNotEquals(mdArtifactCache.getArtifactFingerprint(target, self.options), fingerprint, "Fingerprint did not change with the install command")
+
+    def test_fingerprintFollowsDependancies(self):
+        dependancy = self.createTarget("bar")
+        target = self.createTarget("foo")
+        target.dependancyTargets = [dependancy]
+        self.assertEquals(mdArtifactCache.getArtifactFingerprint(target, self.options), "", "Dependancy without a fingerprint should make the target uncacheable")
+        dependancy.artifactFingerprint = "abc"
+        fingerprint = mdArtifactCache.getArtifactFingerprint(target, self.options)
+        dependancy.artifactFingerprint = "abd"
+        self.assertNotEquals(mdArtifactCache.getArtifactFingerprint(target, self.options), fingerprint, "Fingerprint did not change with the dependancy's")
+
+    def test_directoryIsNotCacheable(self):
+        target = self.createTarget("foo")
+        target.origPath = target.path
+        self.assertEquals(mdArtifactCache.getArtifactFingerprint(target, self.options), "", "Directory sources cannot be hashed cheaply")
+
+    def test_installThenRestore(self):
+        target = self.createTarget("foo")
+        target.artifactFingerprint = mdArtifactCache.getArtifactFingerprint(target, self.options)
+        self.assertTrue(self.cache.install(target, self.options), "Install failed")
+        self.assertTrue(self.cache.hasEntry(target.artifactFingerprint), "Installed files were not stored")
+
+        utilityFunctions.removeDir(self.prefix)
+        os.mkdir(self.prefix)
+        restored = self.createTarget("restored")
+        restored.artifactFingerprint = target.artifactFingerprint
+        self.assertTrue(self.cache.restore(restored, self.options), "Artifact was not restored")
+        self.assertTrue(os.path.isfile(self.prefix + "lib/foo"), "Installed file was not restored into the prefix")
+        self.assertTrue(os.path.isfile(mdInstall.getManifestPath("foo", self.prefix)), "Install manifest was not restored")
+        self.assertEquals(restored.stepFingerprints["install"], "artifact:" + target.artifactFingerprint, "Restored install has no fingerprint")
+
+    def test_otherFilesNotStored(self):
+        #Written to the prefix while foo installs, for example by another target
+        mdTestUtilities.createBlankFile(self.prefix + "unrelated")
+        target = self.createTarget("foo")
+        self.setInstallScript(target, "touch " + self.prefix + "other && mkdir -p $DESTDIR" + self.prefix + " && touch $DESTDIR" + self.prefix + "foo")
+        target.artifactFingerprint = mdArtifactCache.getArtifactFingerprint(target, self.options)
+        self.assertTrue(self.cache.install(target, self.options), "Install failed")
+        tar = tarfile.open(self.cache.getEntryPath(target.artifactFingerprint))
+        try:
+            self.assertEquals(sorted(tar.getnames()), sorted(["foo", mdInstall.manifestDirName + "foo.json"]), "Entry holds files foo did not install")
+        finally:
+            tar.close()
+
+    def test_installWithoutDestDirNotStored(self):
+        target = self.createTarget("foo")
+        self.setInstallScript(target, "touch " + self.prefix + "foo")
+        target.artifactFingerprint = mdArtifactCache.getArtifactFingerprint(target, self.options)
+        self.assertTrue(self.cache.install(target, self.options), "Install failed")
+        self.assertFalse(self.cache.hasEntry(target.artifactFingerprint), "Install of unknown files was stored")
+
+    def test_restoreMiss(self):
+        target = self.createTarget("foo")
+        target.artifactFingerprint = mdArtifactCache.getArtifactFingerprint(target, self.options)
+        self.assertFalse(self.cache.restore(target, self.options), "Restored an entry that was never stored")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdArtifactCache))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -0,0 +1,95 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, tarfile, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdCompression, mdLogger, utilityFunctions
+
+class Test_mdCompression(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.decompressors = mdCompression.decompressors
+        os.mkdir(self.testDir + "test")
+        mdTestUtilities.createBlankFile(self.testDir + "test/" + mdTestUtilities.testFileName)
+
+    def tearDown(self):
+        mdCompression.decompressors = self.decompressors
+        utilityFunctions.removeDir(self.testDir)
+
+    def createTar(self, name, tarFlags):
+        utilityFunctions.executeSubProcess("tar -c" + tarFlags + "f " + name + " test", self.testDir)
+        return self.testDir + name
+
+    def untar(self, tarPath):
+        outPath = self.testDir + "out/"
+        utilityFunctions.untar(tarPath, outPath, True)
+        return os.path.isfile(outPath + mdTestUtilities.testFileName)
+
+    def test_getCompression(self):
+        self.assertEquals(mdCompression.getCompression(self.createTar("test.tgz", "z")), "gz", "Gzip tarball not detected")
+        self.assertEquals(mdCompression.getCompression(self.createTar("test.tar.bz2", "j")), "bz2", "Bzip2 tarball not detected")
+        self.assertEquals(mdCompression.getCompression(self.createTar("test.tar", "")), "", "Uncompressed tarball detected as compressed")
+
+    def test_getDecompressCommand(self):
+        mdCompression.decompressors = {"gz": [["mixdown-missing-tool", "-d"], ["gzip", "-d", "-c"]]}
+        command = mdCompression.getDecompressCommand("gz")
+        self.assertEquals(os.path.basename(command[0]), "gzip", "Installed decompressor was not found")
+        self.assertEquals(command[1:], ["-d", "-c"], "Decompressor arguments were lost")
+        self.assertEquals(mdCompression.getDecompressCommand("bz2"), [], "No decompressor should have been found")
+
+    def test_untarWithDecompressor(self):
+        #gzip stands in for pigz, the archive is read from its output pipe
+        mdCompression.decompressors = {"gz": [["gzip", "-d", "-c"]]}
+        self.assertTrue(self.untar(self.createTar("test.tgz", "z")), "Tarball was not extracted through the decompressor")
+
+    def test_untarFallback(self):
+        mdCompression.decompressors = dict()
+        self.assertTrue(self.untar(self.createTar("test.tar.bz2", "j")), "Tarball was not extracted by tarfile")
+
+    def test_untarXz(self):
+        if mdCompression.getDecompressCommand("xz") == []:
+            self.fail("xz is not installed on your system.  Xz tarballs can not be unpacked.")
+        tarPath = self.createTar("test.tar", "")
+        utilityFunctions.executeSubProcess("xz test.tar", self.testDir)
+        tarPath += ".xz"
+        self.assertTrue(mdCompression.isTarFile(tarPath), "Xz tarball was not recognized")
+        self.assertTrue(self.untar(tarPath), "Xz tarball was not extracted")
+
+    def test_corruptTarball(self):
+        mdCompression.decompressors = {"gz": [["gzip", "-d", "-c"]]}
+        tarPath = self.createTar("test.tgz", "z")
+        f = open(tarPath, "r+b")
+        f.seek(20)
+        f.write("corrupt" * 10)
+        f.close()
+        self.assertRaises(tarfile.TarError, self.untar, tarPath)
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdCompression))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
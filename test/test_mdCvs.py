@@ -24,9 +24,18 @@ import os, sys, unittest, mdTestUtilities
 
 if not ".." in sys.path:
     sys.path.append("..")
-import mdCvs, mdLogger, utilityFunctions
+import mdCvs, mdLogger, mdTools, utilityFunctions
 
 class Test_mdCvs(unittest.TestCase):
+    def setUp(self):
+        #Tool probes are cached in the state directory, not the developer's
+        self.stateDir = mdTestUtilities.makeTempDir()
+        mdTools.setStateDir(self.stateDir)
+
+    def tearDown(self):
+        mdTools.setStateDir("")
+        utilityFunctions.removeDir(self.stateDir)
+
     def test_isCvsInstalled(self):
         returnValue = mdCvs.isCvsInstalled()
         self.assertEqual(returnValue, True, "Cvs is not installed on your system.  All Cvs tests will fail.")
@@ -0,0 +1,232 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, socket, subprocess, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdArtifactCache, mdDistributed, mdLogger, mdOptions, mdProject, mdScheduler, mdStrings, mdTarget, utilityFunctions
+
+mixDownDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+workerScript = "import sys; sys.path.insert(0, %r); import mdDistributed, mdLogger; mdLogger.SetLogger('Console'); mdDistributed.runWorker(('127.0.0.1', 0), %d)"
+
+def startWorker(jobSlots=1):
+    #Returns the worker process and the address it reported, port 0 lets it pick a free one
+    process = subprocess.Popen([sys.executable, "-c", workerScript % (mixDownDir, jobSlots)], stdout=subprocess.PIPE)
+    address = process.stdout.readline().strip().split(" ")[-1]
+    return process, address
+
+def stopWorker(process):
+    if process.poll() == None:
+        process.kill()
+    process.wait()
+
+def createTarget(name, path, buildCommand="touch built", dependsOn=[]):
+    target = mdTarget.Target(name, path)
+    target.skipSteps = ["fetch", "unpack", "patch", "preconfig", "config"]
+    target.commands["build"] = buildCommand
+    target.commands["install"] = "touch installed"
+    target.dependsOn = dependsOn
+    return target
+
+class Test_mdDistributed(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.workers = []
+        self.coordinator = None
+        #Workers started by the tests inherit it
+        os.environ[mdDistributed.secretVariable] = "testSecret"
+
+    def tearDown(self):
+        if self.coordinator != None:
+            self.coordinator.close()
+        for process in self.workers:
+            stopWorker(process)
+        del os.environ[mdDistributed.secretVariable]
+        utilityFunctions.removeDir(self.testDir)
+
+    def startWorkers(self, count, jobSlots=1):
+        addresses = []
+        for i in range(count):
+            process, address = startWorker(jobSlots)
+            self.workers.append(process)
+            addresses.append(address)
+        return addresses
+
+    def createTargetDir(self, name):
+        path = self.testDir + name + "/"
+        os.mkdir(path)
+        return path
+
+    def test_parseAddress(self):
+        self.assertEquals(mdDistributed.parseAddress("node1:7390"), ("node1", 7390), "Address not parsed")
+        self.assertEquals(mdDistributed.parseAddress(":7390"), ("127.0.0.1", 7390), "Missing host should be the loopback address")
+        self.assertEquals(mdDistributed.parseAddress("7390"), ("127.0.0.1", 7390), "Missing host should be the loopback address")
+        self.assertRaises(ValueError, mdDistributed.parseAddress, "node1")
+
+    def test_packTarget(self):
+        target = createTarget("foo", "/tmp/foo/")
+        target.outputPath = "/tmp/build/foo/"
+        unpacked = mdDistributed.unpackTarget(mdDistributed.packTarget(target))
+        for field in mdDistributed.targetFields:
+            self.assertEquals(getattr(unpacked, field), getattr(target, field), field + " was not sent with the target")
+
+    def test_packOptions(self):
+        options = mdOptions.Options()
+        options.buildDir = "/tmp/mdBuild/"
+        options.setDefine("foo", "$(bar)/baz")
+        options.setDefine("bar", "/opt")
+        unpacked = mdDistributed.unpackOptions(mdDistributed.packOptions(options))
+        self.assertEquals(unpacked.buildDir, "/tmp/mdBuild/", "Build directory was not sent with the options")
+        self.assertEquals(unpacked.expandDefines("$(foo)"), "/opt/baz", "Defines were not sent with the options")
+
+    def test_buildOnSeveralWorkers(self):
+        addresses = self.startWorkers(2)
+        targets = []
+        for name in ["a", "b", "c", "d"]:
+            targets.append(createTarget(name, self.createTargetDir(name)))
+        targets[0].dependsOn = ["b", "c", "d"]
+        project = mdProject.Project("remote.md", targets)
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to workers")
+        self.assertEquals(self.coordinator.jobSlots, 2, "Wrong number of job slots reported by workers")
+        options = mdOptions.Options()
+        options.targetJobSlots = self.coordinator.jobSlots
+        self.assertTrue(mdScheduler.Scheduler(project, options, self.coordinator.buildStep).run(), "Remote build failed")
+        for target in targets:
+            self.assertTrue(os.path.exists(target.path + "built"), target.name + " was not built")
+            self.assertTrue(os.path.exists(target.path + "installed"), target.name + " was not installed")
+        for address in addresses:
+            self.assertTrue(self.coordinator.stepsRun[address] > 0, "Worker " + address + " did not run any step")
+
+    def test_stepsOnSeveralWorkers(self):
+        #preconfig finds nothing to run, config writes the Makefile on the other worker
+        addresses = self.startWorkers(2)
+        target = mdTarget.Target("a", self.createTargetDir("a"))
+        scriptFile = open(target.path + "Configure", "w")
+        scriptFile.write("#!/bin/sh\nprintf 'all:\\n\\ttouch built\\ninstall:\\n\\ttouch installed\\n' > Makefile\n")
+        scriptFile.close()
+        os.chmod(target.path + "Configure", 0755)
+        options = mdOptions.Options()
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to workers")
+        for stepName in ["preconfig", "config", "build", "install"]:
+            self.assertTrue(self.coordinator.runStep(stepName, target, options), stepName + " failed")
+        for address in addresses:
+            self.assertEquals(self.coordinator.stepsRun[address], 2, "Steps were not spread over both workers")
+        self.assertTrue(os.path.exists(target.path + "built"), "Build did not see the Makefile written on the other worker")
+        self.assertTrue(os.path.exists(target.path + "installed"), "Install did not see the Makefile written on the other worker")
+
+    def test_workerJobSlots(self):
+        addresses = self.startWorkers(1, 3)
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to worker")
+        self.assertEquals(self.coordinator.jobSlots, 3, "Worker should get a connection per job slot")
+
+    def test_artifactCacheInstallOnWorker(self):
+        addresses = self.startWorkers(1)
+        prefix = self.testDir + "prefix/"
+        target = createTarget("a", self.createTargetDir("a"))
+        scriptFile = open(target.path + "install.sh", "w")
+        scriptFile.write("mkdir -p $DESTDIR" + prefix + " && touch $DESTDIR" + prefix + "a\n")
+        scriptFile.close()
+        target.commands["install"] = "sh install.sh"
+        target.artifactFingerprint = "0123456789abcdef"
+        options = mdOptions.Options()
+        options.setDefine(mdStrings.mdDefinePrefix, prefix)
+        options.buildDir = self.testDir + "mdBuild/"
+        options.stagedInstall = True
+        cache = mdArtifactCache.ArtifactCache(self.testDir + "artifacts")
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to worker")
+        self.assertTrue(cache.install(target, options, self.coordinator.runStep), "Install on the worker failed")
+        self.assertEquals(self.coordinator.stepsRun[addresses[0]], 1, "Install did not run on the worker")
+        self.assertTrue(os.path.isfile(prefix + "a"), "Staged install was not merged into the prefix")
+        self.assertTrue(cache.hasEntry(target.artifactFingerprint), "Worker's install was not stored from its manifest")
+
+    def test_remoteFailure(self):
+        addresses = self.startWorkers(1)
+        target = createTarget("a", self.createTargetDir("a"), "false")
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to worker")
+        self.assertFalse(self.coordinator.runStep("build", target, mdOptions.Options()), "Failed step reported success")
+        self.assertTrue(self.coordinator.runStep("install", target, mdOptions.Options()), "Worker unusable after a failed step")
+
+    def test_lostWorker(self):
+        addresses = self.startWorkers(1)
+        target = createTarget("a", self.createTargetDir("a"))
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to worker")
+        stopWorker(self.workers[0])
+        self.assertFalse(self.coordinator.runStep("build", target, mdOptions.Options()), "Step on a lost worker reported success")
+        #Without a worker to reconnect to, later steps fail instead of waiting forever
+        self.assertFalse(self.coordinator.runStep("install", target, mdOptions.Options()), "Step without workers reported success")
+
+    def test_reconnectToWorker(self):
+        addresses = self.startWorkers(1)
+        target = createTarget("a", self.createTargetDir("a"))
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertTrue(self.coordinator.connect(), "Could not connect to worker")
+        #The connection breaks while the worker keeps listening
+        for connection in self.coordinator._Coordinator__openConnections:
+            connection.socket.shutdown(socket.SHUT_RDWR)
+        self.assertFalse(self.coordinator.runStep("build", target, mdOptions.Options()), "Step on a lost connection reported success")
+        self.assertTrue(self.coordinator.runStep("build", target, mdOptions.Options()), "Coordinator did not reconnect to the worker")
+
+    def test_wrongSecret(self):
+        addresses = self.startWorkers(1)
+        os.environ[mdDistributed.secretVariable] = "wrongSecret"
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertFalse(self.coordinator.connect(), "Worker accepted the wrong secret")
+
+    def test_missingSecret(self):
+        addresses = self.startWorkers(1)
+        os.environ[mdDistributed.secretVariable] = ""
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertFalse(self.coordinator.connect(), "Coordinator connected without a secret")
+
+    def test_stepBeforeHello(self):
+        addresses = self.startWorkers(1)
+        target = createTarget("a", self.createTargetDir("a"))
+        connection = mdDistributed.WorkerConnection(addresses[0])
+        try:
+            response = connection.request({"type": "step", "step": "build", "target": mdDistributed.packTarget(target),
+                                           "options": mdDistributed.packOptions(mdOptions.Options())})
+        finally:
+            connection.close()
+        self.assertEquals(response["type"], "error", "Worker ran a step without a hello")
+        self.assertFalse(os.path.exists(target.path + "built"), "Worker ran a step without a hello")
+
+    def test_connectFailure(self):
+        addresses = self.startWorkers(1)
+        stopWorker(self.workers[0])
+        self.coordinator = mdDistributed.Coordinator(addresses)
+        self.assertFalse(self.coordinator.connect(), "Connected to a stopped worker")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdDistributed))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -0,0 +1,146 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import hashlib, os, sys, tarfile, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdDownloadCache, mdLogger, mdPython, mdSteps, utilityFunctions
+
+class Test_mdDownloadCache(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.cache = mdDownloadCache.DownloadCache(self.testDir + "cache")
+
+    def tearDown(self):
+        utilityFunctions.removeDir(self.testDir)
+
+    def createSource(self, name, contents):
+        path = self.testDir + name
+        f = open(path, "w")
+        f.write(contents)
+        f.close()
+        return "file://" + path
+
+    def createTarSource(self):
+        #Returns the location of a gzipped tarball holding foo-1.0/testFile
+        os.mkdir(self.testDir + "foo-1.0")
+        mdTestUtilities.createBlankFile(self.testDir + "foo-1.0/" + mdTestUtilities.testFileName)
+        tar = tarfile.open(self.testDir + "foo-1.0.tar.gz", "w:gz")
+        tar.add(self.testDir + "foo-1.0", "foo-1.0")
+        tar.close()
+        utilityFunctions.removeDir(self.testDir + "foo-1.0")
+        return "file://" + self.testDir + "foo-1.0.tar.gz"
+
+    def createStreamingCallInfo(self, url, checksum=""):
+        pythonCallInfo = mdPython.PythonCallInfo()
+        pythonCallInfo.currentPath = url
+        pythonCallInfo.outputPath = self.testDir + "build/foo/"
+        pythonCallInfo.downloadDir = self.testDir + "download/"
+        pythonCallInfo.downloadCache = self.cache
+        pythonCallInfo.checksum = checksum
+        pythonCallInfo.streamDownloads = True
+        return pythonCallInfo
+
+    def readFile(self, path):
+        f = open(path, "r")
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def test_parseChecksum(self):
+        sha1 = hashlib.sha1("foo").hexdigest()
+        self.assertEquals(mdDownloadCache.parseChecksum("sha1:" + sha1), ("sha1", sha1), "Failed to parse checksum with algorithm")
+        self.assertEquals(mdDownloadCache.parseChecksum(sha1.upper()), ("sha1", sha1), "Failed to detect algorithm from digest length")
+        self.assertEquals(mdDownloadCache.parseChecksum(""), ("", ""), "Empty checksum should not require verification")
+        self.assertRaises(ValueError, mdDownloadCache.parseChecksum, "md5:" + sha1)
+        self.assertRaises(ValueError, mdDownloadCache.parseChecksum, "crc:1234")
+
+    def test_fetchUsesCache(self):
+        url = self.createSource("foo-1.0.tar.gz", "contents")
+        self.cache.fetch(url, self.testDir + "first")
+        os.remove(url[len("file://"):])
+        self.cache.fetch(url, self.testDir + "second")
+        self.assertEquals(self.readFile(self.testDir + "second"), "contents", "Cached download returned wrong contents")
+        self.assertTrue(os.path.isfile(self.cache.objectsDir + hashlib.sha256("contents").hexdigest()), "Download was not stored by its hash")
+
+    def test_fetchVerifiesChecksum(self):
+        url = self.createSource("foo-1.0.tar.gz", "contents")
+        goodChecksum = "md5:" + hashlib.md5("contents").hexdigest()
+        badChecksum = "md5:" + hashlib.md5("other").hexdigest()
+        self.assertRaises(IOError, self.cache.fetch, url, self.testDir + "bad", badChecksum)
+        self.assertFalse(os.path.exists(self.testDir + "bad"), "Download with wrong checksum was kept")
+        self.assertEquals(os.listdir(self.cache.objectsDir), [], "Download with wrong checksum was added to the cache")
+        self.cache.fetch(url, self.testDir + "good", goodChecksum)
+        self.assertEquals(self.readFile(self.testDir + "good"), "contents", "Download with correct checksum failed")
+
+    def test_checksumHitAcrossLocations(self):
+        url = self.createSource("foo-1.0.tar.gz", "contents")
+        self.cache.fetch(url, self.testDir + "first")
+        checksum = "sha256:" + hashlib.sha256("contents").hexdigest()
+        self.cache.fetch("http://mirror.invalid/foo-1.0.tar.gz", self.testDir + "mirror", checksum)
+        self.assertEquals(self.readFile(self.testDir + "mirror"), "contents", "Checksum did not find identical cached download")
+
+    def test_evictLeastRecentlyUsed(self):
+        self.cache.maxSize = 10
+        oldUrl = self.createSource("old.tar.gz", "123456")
+        newUrl = self.createSource("new.tar.gz", "abcdef")
+        oldObject = self.cache.download(oldUrl)
+        os.utime(oldObject, (1, 1))
+        newObject = self.cache.download(newUrl)
+        self.assertFalse(os.path.exists(oldObject), "Least recently used download was not evicted")
+        self.assertTrue(os.path.exists(newObject), "Newest download was evicted")
+        self.assertEquals(self.cache.lookup(oldUrl), "", "Evicted download was still found")
+
+    def test_downloadWithConsumer(self):
+        url = self.createSource("foo-1.0.tar.gz", "0123456789")
+        consumed = []
+        objectPath = self.cache.download(url, "", lambda stream: consumed.append(stream.read(4)))
+        self.assertEquals(consumed, ["0123"], "Consumer did not read the start of the download")
+        self.assertEquals(self.readFile(objectPath), "0123456789", "Bytes left unread by the consumer were not cached")
+
+    def test_streamingFetch(self):
+        url = self.createTarSource()
+        checksum = "sha256:" + mdDownloadCache.hashFile(url[len("file://"):], "sha256")
+        pythonCallInfo = mdSteps.fetch(self.createStreamingCallInfo(url, checksum))
+        self.assertTrue(pythonCallInfo.success, "Streaming fetch failed")
+        self.assertEquals(pythonCallInfo.currentPath, self.testDir + "build/foo/", "Streaming fetch did not unpack into the output path")
+        self.assertTrue(os.path.isfile(self.testDir + "build/foo/" + mdTestUtilities.testFileName), "Tarball was not extracted while downloading")
+        self.assertTrue(os.path.isfile(self.testDir + "download/foo-1.0.tar.gz"), "Tarball was not placed in the download directory")
+        self.assertNotEquals(self.cache.lookup(url, checksum), "", "Streamed download was not cached")
+
+    def test_streamingFetchBadChecksum(self):
+        url = self.createTarSource()
+        pythonCallInfo = mdSteps.fetch(self.createStreamingCallInfo(url, "md5:" + hashlib.md5("other").hexdigest()))
+        self.assertFalse(pythonCallInfo.success, "Streaming fetch with wrong checksum should have failed")
+        self.assertFalse(os.path.exists(self.testDir + "build/foo/"), "Extracted files with wrong checksum were kept")
+        self.assertEquals(os.listdir(self.cache.objectsDir), [], "Download with wrong checksum was added to the cache")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdDownloadCache))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -24,9 +24,18 @@ import os, sys, unittest, mdTestUtilities
 
 if not ".." in sys.path:
     sys.path.append("..")
-import mdGit, mdLogger, utilityFunctions
+import mdGit, mdLogger, mdTools, utilityFunctions
 
 class Test_mdGit(unittest.TestCase):
+    def setUp(self):
+        #Tool probes are cached in the state directory, not the developer's
+        self.stateDir = mdTestUtilities.makeTempDir()
+        mdTools.setStateDir(self.stateDir)
+
+    def tearDown(self):
+        mdTools.setStateDir("")
+        utilityFunctions.removeDir(self.stateDir)
+
     def test_isGitInstalled(self):
         returnValue = mdGit.isGitInstalled()
         self.assertEqual(returnValue, True, "Git is not installed on your system.  All Git tests will fail.")
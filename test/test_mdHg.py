@@ -24,9 +24,18 @@ import os, sys, unittest, mdTestUtilities
 
 if not ".." in sys.path:
     sys.path.append("..")
-import mdHg, mdLogger, utilityFunctions
+import mdHg, mdLogger, mdTools, utilityFunctions
 
 class Test_mdHg(unittest.TestCase):
+    def setUp(self):
+        #Tool probes are cached in the state directory, not the developer's
+        self.stateDir = mdTestUtilities.makeTempDir()
+        mdTools.setStateDir(self.stateDir)
+
+    def tearDown(self):
+        mdTools.setStateDir("")
+        utilityFunctions.removeDir(self.stateDir)
+
     def test_isHgInstalled(self):
         returnValue = mdHg.isHgInstalled()
         self.assertEqual(returnValue, True, "Hg is not installed on your system.  All Hg tests will fail.")
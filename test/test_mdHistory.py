@@ -0,0 +1,97 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdHistory, mdLogger, utilityFunctions
+
+class Test_mdHistory(unittest.TestCase):
+    def test_recordAndRead(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            history = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            history.recordStep("Foo", "build", 30.0)
+            history.recordStep("foo", "install", 5.0)
+            history.recordStep("foo", "build", 20.0)
+            history.write()
+            reread = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            self.assertEquals(reread.getStepDuration("FOO", "build"), 20.0, "Latest step duration was not kept")
+            self.assertEquals(reread.getTargetDuration("foo"), 25.0, "Target duration should be the sum of its steps")
+            self.assertEquals(reread.getTargetDuration("bar"), mdHistory.defaultTargetDuration, "Unknown target should use the default duration")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_peakMemory(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            history = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            history.recordStep("foo", "build", 30.0)
+            history.recordPeakMemory("Foo", "build", 2048.0)
+            history.write()
+            reread = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            self.assertEquals(reread.getStepPeakMemory("foo", "build"), 2048.0, "Peak memory was not kept")
+            self.assertEquals(reread.getStepPeakMemory("foo", "install"), None, "Unknown step should have no peak memory")
+            self.assertEquals(reread.getTargetDuration("foo"), 30.0, "Peak memory should not count as duration")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_projectsKeptApart(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            historyPath = tempDir + mdHistory.historyFileName
+            first = mdHistory.BuildHistory(historyPath, tempDir + "first.md")
+            second = mdHistory.BuildHistory(historyPath, tempDir + "second.md")
+            first.recordStep("zlib", "build", 10.0)
+            first.recordPeakMemory("zlib", "build", 100.0)
+            second.recordStep("zlib", "build", 50.0)
+            first.write()
+            second.write()
+            reread = mdHistory.BuildHistory(historyPath, tempDir + "first.md")
+            self.assertEquals(reread.getStepDuration("zlib", "build"), 10.0, "Project's history was overwritten by another project")
+            self.assertEquals(reread.getStepPeakMemory("zlib", "build"), 100.0, "Project's peak memory was lost")
+            reread = mdHistory.BuildHistory(historyPath, tempDir + "second.md")
+            self.assertEquals(reread.getStepDuration("zlib", "build"), 50.0, "Second project's history was not kept")
+            self.assertEquals(reread.getStepPeakMemory("zlib", "build"), None, "Peak memory leaked between projects")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_olderHistoryIgnored(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            historyFile = open(tempDir + mdHistory.historyFileName, "w")
+            historyFile.write('{"foo": {"build": 12.0}}')
+            historyFile.close()
+            history = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName, tempDir + "foo.md")
+            self.assertEquals(history.getStepDuration("foo", "build"), None, "History not kept per project should not be used")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdHistory))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
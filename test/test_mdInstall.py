@@ -0,0 +1,118 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdCommands, mdInstall, mdLogger, mdOptions, mdStrings, mdTarget, utilityFunctions
+
+class Test_mdInstall(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.prefix = self.testDir + "prefix/"
+        os.mkdir(self.prefix)
+        self.options = mdOptions.Options()
+        self.options.buildDir = self.testDir + "mdBuild/"
+        self.options.stagedInstall = True
+        self.options.setDefine(mdStrings.mdDefinePrefix, self.prefix)
+
+    def tearDown(self):
+        utilityFunctions.removeDir(self.testDir)
+
+    def createTarget(self, name, installScript):
+        os.mkdir(self.testDir + name)
+        scriptFile = open(self.testDir + name + "/install.sh", "w")
+        scriptFile.write(installScript)
+        scriptFile.close()
+        target = mdTarget.Target(name, self.testDir + name)
+        target.outputPath = target.path
+        target.commands["install"] = "sh install.sh"
+        return target
+
+    def installFoo(self):
+        #Installs lib/libfoo.a, include/foo.h and a symlink the way make install DESTDIR=... would
+        target = self.createTarget("foo", "mkdir -p $DESTDIR" + self.prefix + "lib $DESTDIR" + self.prefix + "include\n" +
+                                          "echo foo > $DESTDIR" + self.prefix + "lib/libfoo.a\n" +
+                                          "echo foo > $DESTDIR" + self.prefix + "include/foo.h\n" +
+                                          "ln -s libfoo.a $DESTDIR" + self.prefix + "lib/libfoo.so\n")
+        self.assertTrue(mdCommands.buildStepActor("install", target, self.options), "Staged install failed")
+        return target
+
+    def test_stagedInstallRecordsManifest(self):
+        target = self.installFoo()
+        self.assertTrue(os.path.isfile(self.prefix + "lib/libfoo.a"), "Staged file was not merged into the prefix")
+        self.assertEquals(os.readlink(self.prefix + "lib/libfoo.so"), "libfoo.a", "Staged symlink was not merged into the prefix")
+        self.assertFalse(os.path.exists(mdInstall.getStageDir(target, self.options)), "Stage directory was not removed")
+        manifest = mdInstall.readManifest(mdInstall.getManifestPath("foo", self.prefix))
+        self.assertEquals(sorted(manifest.keys()), [self.prefix + "include/foo.h", self.prefix + "lib/libfoo.a", self.prefix + "lib/libfoo.so"],
+                          "Manifest does not list exactly the installed files")
+        self.assertEquals(len(manifest[self.prefix + "lib/libfoo.a"]["sha256"]), 64, "Manifest is missing the file hash")
+        self.assertEquals(manifest[self.prefix + "lib/libfoo.so"]["link"], "libfoo.a", "Manifest is missing the symlink target")
+
+    def test_reinstallKeepsIdenticalFiles(self):
+        #Dependents' kept build trees compare timestamps, unchanged files must not look new
+        target = self.installFoo()
+        installed = os.stat(self.prefix + "lib/libfoo.a")
+        self.assertTrue(mdCommands.buildStepActor("install", target, self.options), "Second staged install failed")
+        reinstalled = os.stat(self.prefix + "lib/libfoo.a")
+        self.assertEquals((reinstalled.st_ino, reinstalled.st_mtime), (installed.st_ino, installed.st_mtime), "Identical file was replaced")
+
+    def test_installWithoutDestDir(self):
+        target = self.createTarget("bar", "touch " + self.prefix + "bar\n")
+        self.assertTrue(mdCommands.buildStepActor("install", target, self.options), "Install ignoring DESTDIR should still succeed")
+        self.assertTrue(os.path.isfile(self.prefix + "bar"), "File was not installed")
+        self.assertFalse(os.path.exists(mdInstall.getManifestPath("bar", self.prefix)), "Manifest recorded for an install that ignored DESTDIR")
+
+    def test_uninstall(self):
+        self.installFoo()
+        mdTestUtilities.createBlankFile(self.prefix + "lib/other")
+        self.assertTrue(mdInstall.uninstall("Foo", self.prefix), "Uninstall failed")
+        self.assertEquals(os.listdir(self.prefix + "lib"), ["other"], "Uninstall did not remove exactly the installed files")
+        self.assertFalse(os.path.exists(self.prefix + "include"), "Directory left empty was not removed")
+        self.assertTrue(os.path.isdir(self.prefix), "Prefix was removed")
+        self.assertFalse(os.path.exists(mdInstall.getManifestPath("foo", self.prefix)), "Manifest was not removed")
+        self.assertFalse(mdInstall.uninstall("foo", self.prefix), "Uninstalling twice should fail")
+
+    def test_uninstallKeepsChangedFiles(self):
+        self.installFoo()
+        changedFile = open(self.prefix + "include/foo.h", "w")
+        changedFile.write("changed")
+        changedFile.close()
+        self.assertTrue(mdInstall.uninstall("foo", self.prefix), "Uninstall failed")
+        self.assertTrue(os.path.isfile(self.prefix + "include/foo.h"), "File changed after install was removed")
+        self.assertFalse(os.path.exists(self.prefix + "lib"), "Unchanged files were not removed")
+
+    def test_uninstallCommandline(self):
+        options = mdOptions.Options()
+        options.processCommandline(["MixDown", "--uninstall", "foo", "bar", "-p" + self.prefix])
+        self.assertEquals(options.uninstallTargets, ["foo", "bar"], "Uninstall targets were not parsed")
+        self.assertEquals(options.getDefine(mdStrings.mdDefinePrefix), os.path.abspath(self.prefix), "Prefix was not parsed in uninstall mode")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdInstall))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, select, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdJobServer, mdLogger, mdOptions, mdStrings, utilityFunctions
+
+class Test_mdJobServer(unittest.TestCase):
+    def tokenAvailable(self, jobServer):
+        readable = select.select([jobServer.readFd], [], [], 0.1)[0]
+        return len(readable) != 0
+
+    def test_acquireAndRelease(self):
+        jobServer = mdJobServer.JobServer(2)
+        try:
+            tokens = [jobServer.acquire(), jobServer.acquire()]
+            self.assertFalse(self.tokenAvailable(jobServer), "Job server handed out more tokens than job slots")
+            jobServer.release(tokens.pop())
+            self.assertTrue(self.tokenAvailable(jobServer), "Released token was not returned to the job server")
+        finally:
+            jobServer.close()
+
+    def test_getEnvironment(self):
+        jobServer = mdJobServer.JobServer(4)
+        try:
+            fds = str(jobServer.readFd) + "," + str(jobServer.writeFd)
+            environment = jobServer.getEnvironment({"PATH": "/bin"})
+            self.assertEquals(environment["PATH"], "/bin", "Job server environment dropped existing variables")
+            self.assertTrue("--jobserver-auth=" + fds in environment["MAKEFLAGS"], "MAKEFLAGS did not point make at the job server")
+            self.assertTrue("--jobserver-fds=" + fds in environment["MAKEFLAGS"], "MAKEFLAGS did not point older make at the job server")
+        finally:
+            jobServer.close()
+
+    def test_startJobServerRemovesMakeJobSlots(self):
+        options = mdOptions.Options()
+        options.processCommandline(["test", "-j4"])
+        self.assertEquals(options.expandDefines("make $(" + mdStrings.mdMakeJobSlotsDefineName + ")"), "make -j4", "-j did not define make's job slots")
+        try:
+            options.startJobServer()
+            self.assertEquals(options.jobServer.jobSlots, 4, "Job server was started with wrong number of job slots")
+            self.assertEquals(options.expandDefines("make $(" + mdStrings.mdMakeJobSlotsDefineName + ")"), "make", "make would start its own job server")
+        finally:
+            options.stopJobServer()
+
+    def test_makeUsesJobServer(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        jobServer = mdJobServer.JobServer(2)
+        try:
+            makefile = open(tempDir + "Makefile", "w")
+            makefile.write("all: a b c\na b c:\n\ttouch $@\n")
+            makefile.close()
+            #MixDown holds the implicit token of the make it launches
+            token = jobServer.acquire()
+            outFile = open(tempDir + "make.log", "w")
+            returnCode = utilityFunctions.executeSubProcess("make", tempDir, outFile.fileno(), environment=jobServer.getEnvironment())
+            outFile.close()
+            jobServer.release(token)
+            self.assertEquals(returnCode, 0, "make failed when run under the job server")
+            self.assertFalse("jobserver unavailable" in open(tempDir + "make.log").read(), "make could not reach the job server")
+            self.assertEquals(jobServer.acquire() + jobServer.acquire(), "++", "make did not return its job server tokens")
+        finally:
+            jobServer.close()
+            utilityFunctions.removeDir(tempDir)
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdJobServer))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
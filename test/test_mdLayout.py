@@ -0,0 +1,75 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdLayout, mdLogger, utilityFunctions
+
+class Test_mdLayout(unittest.TestCase):
+    def setUp(self):
+        mdLayout.invalidate()
+
+    def test_classify(self):
+        self.assertEquals(mdLayout.getLayout("cases/cmake/hello/main").kind, mdLayout.layoutCMake, "Failed to detect CMake project")
+        layout = mdLayout.getLayout("cases/simpleGraphAutoTools/TestCaseA")
+        self.assertEquals(layout.kind, mdLayout.layoutAutoTools, "Failed to detect AutoTools project")
+        self.assertTrue(layout.isMake, "Makefile.am should mark a make project")
+        self.assertEquals(mdLayout.getLayout("cases").kind, mdLayout.layoutUnknown, "False positive on a directory without build files")
+        self.assertEquals(mdLayout.getLayout("doesNotExist").kind, mdLayout.layoutUnknown, "Missing directory should be unknown")
+
+    def test_cachedUntilInvalidated(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            layout = mdLayout.getLayout(tempDir)
+            self.assertEquals(layout.kind, mdLayout.layoutUnknown, "Empty directory should be unknown")
+            mdTestUtilities.createBlankFile(tempDir + "Makefile")
+            self.assertTrue(mdLayout.getLayout(tempDir) is layout, "Layout was probed again before being invalidated")
+            mdLayout.invalidate(utilityFunctions.stripTrailingPathDelimiter(tempDir))
+            self.assertEquals(mdLayout.getLayout(tempDir).kind, mdLayout.layoutMake, "Invalidated layout did not see the new Makefile")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_singleListdir(self):
+        listdirCalls = []
+        originalListdir = os.listdir
+        def countingListdir(path):
+            listdirCalls.append(path)
+            return originalListdir(path)
+        os.listdir = countingListdir
+        try:
+            layout = mdLayout.getLayout("cases/cmake/hello/main")
+            for i in range(3):
+                mdLayout.getLayout("cases/cmake/hello/main/")
+        finally:
+            os.listdir = originalListdir
+        self.assertEquals(len(listdirCalls), 1, "Directory was listed more than once")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdLayout))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
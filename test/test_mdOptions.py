@@ -0,0 +1,120 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, StringIO, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdLogger, mdOptions, mdStrings
+
+class Test_mdOptions(unittest.TestCase):
+    def test_expandDefines(self):
+        options = mdOptions.Options()
+        options.setDefine("Foo", "foo value")
+        self.assertEquals(options.expandDefines("$(foo)"), "foo value", "Define at the start of a string was not expanded")
+        self.assertEquals(options.expandDefines("a $(FOO) b"), "a foo value b", "Define names should not be case sensitive")
+        self.assertEquals(options.expandDefines("$(foo)$(foo)"), "foo valuefoo value", "Adjacent defines were not expanded")
+        self.assertEquals(options.expandDefines("echo $HOME"), "echo $HOME", "Shell variables should be left alone")
+        self.assertEquals(options.expandDefines("a $(undefinedDefine) b"), "a b", "Undefined define should expand to nothing")
+
+    def test_expandNestedDefines(self):
+        options = mdOptions.Options()
+        options.setDefine("a", "$(b)/a")
+        options.setDefine("b", "$(c)/b")
+        options.setDefine("c", "/c")
+        self.assertEquals(options.expandDefines("--prefix=$(a)"), "--prefix=/c/b/a", "Nested defines were not expanded")
+
+    def test_expandEnvironment(self):
+        options = mdOptions.Options()
+        os.environ["MIXDOWN_TEST_DEFINE"] = "fromEnvironment"
+        try:
+            self.assertEquals(options.expandDefines("$(MIXDOWN_TEST_DEFINE)"), "fromEnvironment", "Environment variable was not used")
+        finally:
+            del os.environ["MIXDOWN_TEST_DEFINE"]
+
+    def test_environmentChangesAreSeen(self):
+        options = mdOptions.Options()
+        options.setDefine("libraries", "$(MIXDOWN_TEST_DEFINE):/usr/lib")
+        os.environ["MIXDOWN_TEST_DEFINE"] = "/first"
+        try:
+            self.assertEquals(options.expandDefines("$(libraries)"), "/first:/usr/lib", "Environment variable was not used")
+            os.environ["MIXDOWN_TEST_DEFINE"] = "/second"
+            self.assertEquals(options.expandDefines("$(libraries)"), "/second:/usr/lib", "Expansion from before the environment changed was reused")
+            self.assertEquals(options.expandDefines("$(MIXDOWN_TEST_DEFINE)"), "/second", "Environment variable was not read again")
+        finally:
+            del os.environ["MIXDOWN_TEST_DEFINE"]
+
+    def test_setDefineInvalidatesExpansions(self):
+        options = mdOptions.Options()
+        options.setDefine("a", "$(b)")
+        options.setDefine("b", "first")
+        self.assertEquals(options.expandDefines("$(a)"), "first", "Nested define was not expanded")
+        options.setDefine("b", "second")
+        self.assertEquals(options.expandDefines("$(a)"), "second", "Expansion from before a define changed was reused")
+
+    def test_defineCycle(self):
+        options = mdOptions.Options()
+        options.setDefine("a", "$(b)")
+        options.setDefine("b", "x $(a)")
+        self.assertRaises(SystemExit, options.expandDefines, "$(a)")
+
+    def test_unterminatedDefine(self):
+        options = mdOptions.Options()
+        self.assertRaises(SystemExit, options.expandDefines, "make $(foo")
+
+    def test_conflictingArguments(self):
+        conflicts = [(["--clean", "--full"], "'--full' and '--clean'"), (["--full", "--clean"], "'--full' and '--clean'"),
+                     (["-k", "--full"], "'--full' and '-k'"), (["--full", "-k"], "'--full' and '-k'"),
+                     (["--clean", "-k"], "'--clean' and '-k'"), (["-k", "--clean"], "'--clean' and '-k'")]
+        originalStderr = sys.stderr
+        try:
+            for arguments, expected in conflicts:
+                sys.stderr = StringIO.StringIO()
+                self.assertRaises(SystemExit, mdOptions.Options().processCommandline, ["MixDown"] + arguments)
+                self.assertTrue(expected in sys.stderr.getvalue(), "Wrong error for " + " ".join(arguments) + ": " + sys.stderr.getvalue())
+        finally:
+            sys.stderr = originalStderr
+
+    def test_prefixDefine(self):
+        options = mdOptions.Options()
+        self.assertEquals(options.expandDefines("./configure --prefix=$(" + mdStrings.mdDefinePrefix + ")"), "./configure --prefix=/usr/local",
+                          "Default prefix was not expanded")
+
+    def test_selectedTargets(self):
+        projectFilePath = mdTestUtilities.makeTempFile("", ".md")
+        try:
+            options = mdOptions.Options()
+            options.processCommandline(["MixDown", projectFilePath, "zlib", "boost", "--with-dependents"])
+            self.assertEquals(options.projectFile, projectFilePath, "Project file was not set")
+            self.assertEquals(options.selectedTargets, ["zlib", "boost"], "Target names were not selected")
+            self.assertTrue(options.withDependents, "--with-dependents was not set")
+        finally:
+            os.remove(projectFilePath)
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdOptions))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
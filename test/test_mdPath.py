@@ -0,0 +1,102 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdGit, mdHg, mdLogger, mdPath, mdSvn, mdTarget, utilityFunctions
+
+class Test_mdPath(unittest.TestCase):
+    def setUp(self):
+        mdPath.clearCache()
+        self.probes = []
+        self.originalProbes = mdGit.isGitRepo, mdHg.isHgRepo, mdSvn.isSvnRepo
+        mdGit.isGitRepo = self.recordProbe("git")
+        mdHg.isHgRepo = self.recordProbe("hg")
+        mdSvn.isSvnRepo = self.recordProbe("svn")
+
+    def tearDown(self):
+        mdGit.isGitRepo, mdHg.isHgRepo, mdSvn.isSvnRepo = self.originalProbes
+        mdPath.clearCache()
+
+    def recordProbe(self, kind):
+        def probe(location):
+            self.probes.append((kind, location))
+            return kind == "svn" and location.endswith("/svnrepo")
+        return probe
+
+    def test_isURL(self):
+        self.assertTrue(utilityFunctions.isURL("http://www.example.com/foo-1.0.tar.gz"), "Failed to detect http URL")
+        self.assertTrue(utilityFunctions.isURL("ftp://ftp.example.com/foo.tgz"), "Failed to detect ftp URL")
+        self.assertTrue(utilityFunctions.isURL("file:///tmp/foo.tgz"), "Failed to detect file URL")
+        self.assertFalse(utilityFunctions.isURL("foo-1.0.tar.gz"), "False positive on a relative path")
+        self.assertFalse(utilityFunctions.isURL("/tmp/foo-1.0.tar.gz"), "False positive on an absolute path")
+        self.assertFalse(utilityFunctions.isURL("http:foo"), "False positive on URL without host")
+
+    def test_archiveURLsAreNotProbed(self):
+        for url in ["http://www.example.com/foo-1.0.tar.gz", "https://example.com/bar-2.1.tar.bz2", "ftp://example.com/baz.tgz"]:
+            self.assertEquals(mdPath.classify(url), mdPath.pathTypeURL, url + " was not classified as a download")
+        self.assertEquals(self.probes, [], "Archive URLs should not require network probes")
+
+    def test_repositorySyntax(self):
+        self.assertEquals(mdPath.classify("git://example.com/foo.git"), mdPath.pathTypeGit, "Failed to classify git URL")
+        self.assertEquals(mdPath.classify("https://example.com/foo.git"), mdPath.pathTypeGit, "Failed to classify http git URL")
+        self.assertEquals(mdPath.classify("git@example.com:foo/bar.git"), mdPath.pathTypeGit, "Failed to classify scp-like git location")
+        self.assertEquals(mdPath.classify("svn+ssh://example.com/repo/trunk"), mdPath.pathTypeSvn, "Failed to classify svn URL")
+        self.assertEquals(self.probes, [], "Repository URLs should not require network probes")
+
+    def test_ambiguousURLsAreProbedOnce(self):
+        self.assertEquals(mdPath.classify("http://example.com/svnrepo"), mdPath.pathTypeSvn, "Probed svn repository was misclassified")
+        self.assertEquals(mdPath.classify(" http://example.com/svnrepo "), mdPath.pathTypeSvn, "Cached classification differed")
+        self.assertEquals(mdPath.classify("http://example.com/page"), mdPath.pathTypeURL, "Unknown URL should be downloaded")
+        self.assertEquals(len(self.probes), 6, "Each ambiguous location should be probed once per repository type")
+
+    def test_localPaths(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            os.mkdir(tempDir + "plain")
+            os.makedirs(tempDir + "gitrepo/.git")
+            os.makedirs(tempDir + "hgrepo/.hg")
+            mdTestUtilities.createBlankFile(tempDir + "foo-1.0.tar.gz")
+            self.assertEquals(mdPath.classify(tempDir + "plain"), mdPath.pathTypeDirectory, "Failed to classify directory")
+            self.assertEquals(mdPath.classify(tempDir + "gitrepo"), mdPath.pathTypeGit, "Failed to classify git work tree")
+            self.assertEquals(mdPath.classify(tempDir + "hgrepo"), mdPath.pathTypeHg, "Failed to classify hg work tree")
+            self.assertEquals(mdPath.classify(tempDir + "foo-1.0.tar.gz"), mdPath.pathTypeFile, "Failed to classify file")
+            self.assertEquals(mdPath.classify(tempDir + "missing"), mdPath.pathTypeUnknown, "Missing path was classified")
+            self.assertEquals(self.probes, [], "Local paths should not require probes")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_targetPathToName(self):
+        self.assertEquals(mdTarget.targetPathToName("http://www.example.com/foo-1.0.tar.gz"), "foo", "Wrong name for download")
+        self.assertEquals(mdTarget.targetPathToName("git://example.com/bar.git"), "bar", "Wrong name for git repository")
+        self.assertEquals(self.probes, [], "Naming targets should not require probes")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdPath))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -24,7 +24,7 @@ import os, sys, textwrap, unittest, mdTestUtilities
 
 if not ".." in sys.path:
     sys.path.append("..")
-import mdLogger, mdOptions, mdProject, utilityFunctions
+import mdLogger, mdOptions, mdProject, mdTarget, utilityFunctions
 
 class Test_mdProject(unittest.TestCase):
     def test_readSingleTargetProject(self):
@@ -488,6 +488,63 @@ class Test_mdProject(unittest.TestCase):
         finally:
             os.remove(projectFilePath)
 
+    def test_detectCyclicalProjectCase5(self):
+        #Cycle cannot be reached from the first target
+        projectFileContents = textwrap.dedent("""
+                                            Name: a
+                                            Path: a-1.11.tar.gz
+
+                                            Name: b
+                                            Path: b-2.22.tar.gz
+                                            DependsOn: c
+
+                                            Name: c
+                                            Path: c-3.33.tar.gz
+                                            DependsOn: d
+
+                                            Name: d
+                                            Path: d-4.44.tar.gz
+                                            DependsOn: b
+                                            """)
+        try:
+            projectFilePath = mdTestUtilities.makeTempFile(projectFileContents, ".md")
+            project = mdProject.Project(projectFilePath)
+            options = mdOptions.Options()
+            self.assertTrue(project.read(), "Project file could not be read")
+            self.assertFalse(project.validate(options), "Project validated when it should not have due to cyclical dependancy graph")
+            self.assertFalse(project.examine(options), "Project examined when it should not have due to cyclical dependancy graph")
+            cycleNames = sorted([target.name for target in project.dependancyGraph.cycle])
+            self.assertEquals(cycleNames, ["b", "c", "d"], "Wrong targets reported in dependancy cycle")
+        finally:
+            os.remove(projectFilePath)
+
+    def test_examineDiamondHeavyProject(self):
+        #Every layer doubles the number of dependancy paths, path enumeration would never finish
+        layerCount = 40
+        targets = [mdTarget.Target("top", "top.tar.gz")]
+        targets[0].dependsOn = ["left0", "right0"]
+        for i in range(layerCount):
+            for side in ("left", "right"):
+                target = mdTarget.Target(side + str(i), side + str(i) + ".tar.gz")
+                if i + 1 < layerCount:
+                    target.dependsOn = ["left" + str(i + 1), "right" + str(i + 1)]
+                targets.append(target)
+        targets.reverse()
+        project = mdProject.Project("diamonds.md", targets)
+        options = mdOptions.Options()
+        self.assertTrue(project.validate(options), "Acyclic project failed to validate")
+        self.assertTrue(project.examine(options), "Acyclic project failed to examine")
+        graph = project.dependancyGraph
+        self.assertEquals(graph.cycle, [], "Cycle reported in acyclic project")
+        self.assertEquals(len(graph.levels), layerCount + 1, "Wrong number of depth levels")
+        self.assertEquals([target.name for target in graph.levels[0]], ["top"], "Wrong targets at depth 0")
+        self.assertEquals(project.targets[0].name, "top", "Sorting failed. top should have been the first target.")
+        self.assertEquals(project.getTarget("left39").dependancyDepth, layerCount, "left39 had wrong dependancy depth")
+        position = dict([(target.name, i) for i, target in enumerate(project.targets)])
+        for target in project.targets:
+            for dependancy in target.dependsOn:
+                self.assertTrue(position[target.name] < position[dependancy], target.name + " was sorted after its dependancy " + dependancy)
+
     def test_detectProjectWithNonExistantDependancy(self):
         projectFileContents = textwrap.dedent("""
                                             Name: a
@@ -531,6 +588,101 @@ class Test_mdProject(unittest.TestCase):
         finally:
             os.remove(projectFilePath)
 
+    def test_getTargetByAlias(self):
+        projectFileContents = textwrap.dedent("""
+                                            Name: a
+                                            Path: a-1.11.tar.gz
+                                            Aliases: liba, A-lib
+
+                                            Name: b
+                                            Path: b-2.22.tar.gz
+                                            DependsOn: liba
+                                            """)
+        try:
+            projectFilePath = mdTestUtilities.makeTempFile(projectFileContents, ".md")
+            project = mdProject.Project(projectFilePath)
+            self.assertTrue(project.read(), "Project file could not be read")
+            self.assertEquals(project.getTarget("LibA").name, "a", "Target 'a' could not be found by alias")
+            self.assertEquals(project.getTarget("a-lib ").name, "a", "Target 'a' could not be found by alias")
+            self.assertEquals(project.getTarget("libb"), None, "Alias 'libb' should not have been found in project")
+            project.addAlias(project.getTarget("b"), "libb")
+            self.assertEquals(project.getTarget("libb").name, "b", "Added alias could not be found")
+            self.assertTrue("libb" in project.getTarget("b").aliases, "Added alias was not stored on target")
+            project.targets.append(mdTarget.Target("c", "c-3.33.tar.gz"))
+            self.assertEquals(project.getTarget("c").name, "c", "Appended target could not be found")
+            self.assertTrue(project.validate(mdOptions.Options()), "Dependancy given by alias failed to validate")
+        finally:
+            os.remove(projectFilePath)
+
+    def test_getTargetAfterListChanges(self):
+        targets = [mdTarget.Target("a", "a.tar.gz"), mdTarget.Target("b", "b.tar.gz")]
+        project = mdProject.Project("changes.md", targets)
+        self.assertEquals(project.getTarget("b"), targets[1], "Target could not be found")
+        replacement = mdTarget.Target("c", "c.tar.gz")
+        project.targets[1] = replacement
+        self.assertEquals(project.getTarget("b"), None, "Replaced target was still found")
+        self.assertEquals(project.getTarget("c"), replacement, "Replacing target could not be found")
+        project.targets[0], project.targets[1] = project.targets[1], project.targets[0]
+        self.assertEquals([project.getTarget(name) for name in ["a", "c"]], [targets[0], replacement], "Swapped targets were mixed up")
+        project.targets = [targets[1]]
+        self.assertEquals(project.getTarget("a"), None, "Target of an assigned list was still found")
+        self.assertEquals(project.getTarget("b"), targets[1], "Target of an assigned list could not be found")
+        targets[1].name = "d"
+        self.assertEquals(project.getTarget("b"), None, "Renamed target was found by its old name")
+
+    def test_getDependents(self):
+        targets = [mdTarget.Target("a", "a.tar.gz"), mdTarget.Target("b", "b.tar.gz"), mdTarget.Target("c", "c.tar.gz")]
+        targets[0].dependsOn = ["b", "c"]
+        targets[1].dependsOn = ["c"]
+        project = mdProject.Project("dependents.md", targets)
+        self.assertEquals([target.name for target in project.getDependents(targets[2])], ["a", "b"], "Wrong dependents of c")
+        self.assertEquals(project.getDependents(targets[0]), [], "a should have no dependents")
+        appended = mdTarget.Target("d", "d.tar.gz")
+        appended.dependsOn = ["a"]
+        project.targets.append(appended)
+        self.assertEquals(project.getDependents(targets[0]), [appended], "Appended target was not in the dependent index")
+
+    def test_selectTargets(self):
+        #app depends on lib (aliased libfoo), which depends on base; tool stands alone
+        projectFileContents = textwrap.dedent("""
+                                            Name: app
+                                            Path: app.tar.gz
+                                            DependsOn: libfoo
+
+                                            Name: lib
+                                            Path: lib.tar.gz
+                                            Aliases: libfoo
+                                            DependsOn: base
+
+                                            Name: base
+                                            Path: base.tar.gz
+
+                                            Name: tool
+                                            Path: tool.tar.gz
+                                            """)
+        try:
+            projectFilePath = mdTestUtilities.makeTempFile(projectFileContents, ".md")
+            project = mdProject.Project(projectFilePath)
+            self.assertTrue(project.read(), "Project file could not be read")
+            self.assertTrue(project.selectTargets(["LIBFOO"]), "Target selected by alias was not found")
+            self.assertEquals([target.name for target in project.targets], ["lib", "base"], "Wrong dependancy closure selected")
+            self.assertEquals(project.getTarget("app"), None, "Unselected target was still in the project")
+
+            project = mdProject.Project(projectFilePath)
+            self.assertTrue(project.read(), "Project file could not be read")
+            self.assertTrue(project.selectTargets(["lib"], True), "Target could not be selected with dependents")
+            self.assertEquals([target.name for target in project.targets], ["app", "lib"], "Wrong dependent closure selected")
+            self.assertEquals(project.getDependancies(project.getTarget("lib")), [], "Unselected dependancy should be left out")
+            self.assertEquals([target.name for target in project.excludedTargets], ["base", "tool"], "Wrong targets left out")
+            self.assertEquals([target.name for target in project.getTarget("lib").dependancyTargets], ["base"],
+                              "Left out dependancy should still be fingerprinted")
+
+            project = mdProject.Project(projectFilePath)
+            self.assertTrue(project.read(), "Project file could not be read")
+            self.assertFalse(project.selectTargets(["missing"]), "Unknown target should not be selected")
+        finally:
+            os.remove(projectFilePath)
+
     def test_examineSingleTarget(self):
         projectFileContents = textwrap.dedent("""
                                             Name: TestCaseA
@@ -0,0 +1,107 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import multiprocessing, os, pickle, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdLogger, mdLoggerFile, mdOptions, mdPython, mdTarget, utilityFunctions
+
+class Test_mdPython(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.options = mdOptions.Options()
+        self.options.stateDir = self.testDir + "state/"
+
+    def tearDown(self):
+        self.options.stopPythonWorkers(True)
+        utilityFunctions.removeDir(self.testDir)
+
+    def createTarTarget(self):
+        tarDir, tarName = mdTestUtilities.createGzipFile()
+        self.tarDir = tarDir
+        target = mdTarget.Target("test", tarDir + tarName)
+        target.outputPath = self.testDir + "test/"
+        return target
+
+    def test_parsePythonCommand(self):
+        self.assertEquals(mdPython.parsePythonCommand("mdSteps.fetch(pythonCallInfo)"), (True, "mdSteps", "fetch"), "Python command not parsed")
+        self.assertEquals(mdPython.parsePythonCommand("make install"), (False, "", ""), "Shell command parsed as a python command")
+
+    def test_pickleCallInfo(self):
+        pythonCallInfo = mdPython.PythonCallInfo()
+        pythonCallInfo.currentPath = "foo.tar.gz"
+        unpickled = pickle.loads(pickle.dumps(pythonCallInfo))
+        self.assertEquals(unpickled.currentPath, "foo.tar.gz", "Call info lost its state when pickled")
+        self.assertFalse("logger" in pickle.dumps(pythonCallInfo), "Logger should not be pickled")
+        self.assertNotEquals(unpickled.logger, None, "Unpickled call info has no logger")
+
+    def test_callInWorker(self):
+        target = self.createTarTarget()
+        try:
+            self.options.pythonJobSlots = 2
+            self.options.startPythonWorkers(["mdSteps"])
+            self.assertTrue(mdPython.callPythonCommand("mdSteps", "unpack", target, self.options), "Unpack in a worker process failed")
+        finally:
+            utilityFunctions.removeDir(self.tarDir)
+        self.assertEquals(target.path, self.testDir + "test/", "Target was not updated from the worker's call info")
+        self.assertTrue(os.path.isfile(target.path + mdTestUtilities.testFileName), "Worker did not unpack the tarball")
+
+    def test_workerUsesConfiguredLogger(self):
+        target = self.createTarTarget()
+        try:
+            self.options.logger = "file"
+            self.options.logDir = self.testDir + "logs/"
+            self.options.pythonJobSlots = 1
+            self.options.startPythonWorkers(["mdSteps"])
+            self.assertTrue(mdPython.callPythonCommand("mdSteps", "unpack", target, self.options), "Unpack in a worker process failed")
+            workerLogger = self.options.pythonWorkerPool.apply(mdLogger.Logger)
+        finally:
+            utilityFunctions.removeDir(self.tarDir)
+        self.assertTrue(isinstance(workerLogger, mdLoggerFile.LoggerFile), "Worker did not use the logger given with -l")
+        self.assertEquals(workerLogger.logOutputDir, self.testDir + "logs/", "Worker did not use the log directory")
+
+    def test_callInProcess(self):
+        target = self.createTarTarget()
+        try:
+            self.assertTrue(mdPython.callPythonCommand("mdSteps", "unpack", target, self.options), "Unpack in MixDown's process failed")
+        finally:
+            utilityFunctions.removeDir(self.tarDir)
+        self.assertTrue(os.path.isfile(target.path + mdTestUtilities.testFileName), "Tarball was not unpacked")
+
+    def test_missingFunction(self):
+        target = self.createTarTarget()
+        try:
+            self.options.pythonJobSlots = 1
+            self.options.startPythonWorkers(["mdSteps"])
+            self.assertFalse(mdPython.callPythonCommand("mdSteps", "doesNotExist", target, self.options), "Missing function should fail")
+        finally:
+            utilityFunctions.removeDir(self.tarDir)
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdPython))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
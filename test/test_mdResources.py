@@ -0,0 +1,88 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdLogger, mdResources, utilityFunctions
+
+class FixedValue:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+class Test_mdResources(unittest.TestCase):
+    def test_readMeminfo(self):
+        tempDir = mdTestUtilities.makeTempDir()
+        originalPath = mdResources.meminfoPath
+        try:
+            meminfoPath = tempDir + "meminfo"
+            meminfoFile = open(meminfoPath, "w")
+            meminfoFile.write("MemTotal:       65536000 kB\nMemFree:         1024000 kB\nMemAvailable:   32768000 kB\n")
+            meminfoFile.close()
+            mdResources.meminfoPath = meminfoPath
+            self.assertEquals(mdResources.getTotalMemory(), 64000.0, "Wrong total memory read from meminfo")
+            self.assertEquals(mdResources.getAvailableMemory(), 32000.0, "Wrong available memory read from meminfo")
+            mdResources.meminfoPath = tempDir + "missing"
+            self.assertEquals(mdResources.getAvailableMemory(), None, "Missing meminfo should give no value")
+        finally:
+            mdResources.meminfoPath = originalPath
+            utilityFunctions.removeDir(tempDir)
+
+    def test_loneStepAlwaysAdmitted(self):
+        admission = mdResources.AdmissionControl(4.0, 1000, FixedValue(16.0), FixedValue(100.0))
+        self.assertTrue(admission.canAdmit(5000, 0), "A step should be admitted when nothing else runs")
+        self.assertFalse(admission.canAdmit(0, 1), "Step admitted while the load is above the maximum")
+
+    def test_loadLimit(self):
+        load = FixedValue(3.0)
+        admission = mdResources.AdmissionControl(4.0, 0, load, FixedValue(None))
+        self.assertTrue(admission.canAdmit(0, 1), "Step held back below the maximum load")
+        load.value = 4.5
+        self.assertFalse(admission.canAdmit(0, 1), "Step admitted above the maximum load")
+        admission.maxLoad = 0
+        self.assertTrue(admission.canAdmit(0, 1), "A maximum load of 0 should disable the check")
+
+    def test_memoryReservations(self):
+        admission = mdResources.AdmissionControl(0, 1000, FixedValue(None), FixedValue(None))
+        admission.reserve(600)
+        self.assertFalse(admission.canAdmit(600, 1), "Reservations exceeded the memory limit")
+        self.assertTrue(admission.canAdmit(400, 1), "Step fitting into the memory limit was held back")
+        admission.release(600)
+        self.assertTrue(admission.canAdmit(600, 1), "Released memory was not available again")
+
+    def test_availableMemory(self):
+        admission = mdResources.AdmissionControl(0, 0, FixedValue(None), FixedValue(500.0))
+        self.assertFalse(admission.canAdmit(600, 1), "Step admitted with more memory than available")
+        self.assertTrue(admission.canAdmit(400, 1), "Step fitting into available memory was held back")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdResources))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -0,0 +1,286 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import sys, threading, time, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdHistory, mdLogger, mdOptions, mdProject, mdResources, mdScheduler, mdStrings, mdTarget, utilityFunctions
+
+class RecordingActor:
+    def __init__(self, failingSteps=[], sleepTimes=dict()):
+        #failingSteps and sleepTimes are keyed by (targetName, stepName)
+        self.failingSteps = failingSteps
+        self.sleepTimes = sleepTimes
+        self.started = []
+        self.finished = []
+        self.events = []
+        self.running = 0
+        self.maxRunning = 0
+        self.runningSteps = dict()
+        self.maxRunningSteps = dict()
+        self.lock = threading.Lock()
+
+    def __call__(self, stepName, target, options):
+        step = (target.name, stepName)
+        self.lock.acquire()
+        self.started.append(step)
+        self.events.append(("started", step))
+        self.running += 1
+        self.maxRunning = max(self.maxRunning, self.running)
+        self.runningSteps[stepName] = self.runningSteps.get(stepName, 0) + 1
+        self.maxRunningSteps[stepName] = max(self.maxRunningSteps.get(stepName, 0), self.runningSteps[stepName])
+        self.lock.release()
+        time.sleep(self.sleepTimes.get(step, 0))
+        self.lock.acquire()
+        self.running -= 1
+        self.runningSteps[stepName] -= 1
+        self.finished.append(step)
+        self.events.append(("finished", step))
+        self.lock.release()
+        return not step in self.failingSteps
+
+    def startedTargets(self):
+        targetNames = []
+        for targetName, stepName in self.started:
+            if not targetName in targetNames:
+                targetNames.append(targetName)
+        return targetNames
+
+def createOptions(targetJobSlots, fetchJobSlots=0):
+    options = mdOptions.Options()
+    options.targetJobSlots = targetJobSlots
+    options.fetchJobSlots = fetchJobSlots
+    return options
+
+def createTarget(name, dependsOn=[]):
+    target = mdTarget.Target(name, name + ".tar.gz")
+    target.dependsOn = dependsOn
+    return target
+
+def createDiamondProject():
+    #a depends on b and c, both of which depend on d
+    targets = [createTarget("a", ["b", "c"]), createTarget("b", ["d"]), createTarget("c", ["d"]), createTarget("d")]
+    return mdProject.Project("diamond.md", targets)
+
+class Test_mdScheduler(unittest.TestCase):
+    def test_stepsRunInOrder(self):
+        options = createOptions(4)
+        actor = RecordingActor()
+        project = createDiamondProject()
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        steps = mdScheduler.getTargetSteps(options)
+        self.assertEquals(len(actor.finished), 4 * len(steps), "Not every step was run")
+        for target in project.targets:
+            targetSteps = [stepName for targetName, stepName in actor.finished if targetName == target.name]
+            self.assertEquals(targetSteps, steps, "Steps of " + target.name + " ran out of order")
+
+    def test_configWaitsForDependancyInstalls(self):
+        options = createOptions(4)
+        actor = RecordingActor(sleepTimes={("d", "build"): 0.05})
+        project = createDiamondProject()
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        for target in project.targets:
+            for dependancy in target.dependsOn:
+                self.assertTrue(actor.events.index(("finished", (dependancy, "install"))) < actor.events.index(("started", (target.name, "config"))),
+                                target.name + " configured before its dependancy " + dependancy + " was installed")
+
+    def test_sourceStepsDoNotWaitForDependancies(self):
+        #d's build is slow, but the sources of its dependents are prepared meanwhile
+        options = createOptions(4)
+        actor = RecordingActor(sleepTimes={("d", "build"): 0.3})
+        project = createDiamondProject()
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        for targetName in ["a", "b", "c"]:
+            for stepName in mdScheduler.sourceSteps:
+                self.assertTrue(actor.finished.index((targetName, stepName)) < actor.finished.index(("d", "build")),
+                                stepName + " of " + targetName + " waited on its dependancies")
+
+    def test_independentTargetsBuildConcurrently(self):
+        options = createOptions(2)
+        actor = RecordingActor(sleepTimes={("b", "build"): 0.1, ("c", "build"): 0.1})
+        project = createDiamondProject()
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        self.assertEquals(actor.maxRunning, 2, "Targets b and c should have been built concurrently")
+
+    def test_targetJobSlotsLimit(self):
+        options = createOptions(1)
+        actor = RecordingActor(sleepTimes={("a", "build"): 0.02, ("b", "build"): 0.02, ("c", "build"): 0.02})
+        project = mdProject.Project("flat.md", [createTarget("a"), createTarget("b"), createTarget("c")])
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        self.assertEquals(actor.maxRunning, 1, "Scheduler exceeded its target job slots")
+        self.assertEquals(sorted(actor.startedTargets()), ["a", "b", "c"], "Not every target was built")
+
+    def test_fetchJobSlotsLimit(self):
+        #Fetches get their own slots, so a slow download does not hold up building the others
+        options = createOptions(1, 2)
+        actor = RecordingActor(sleepTimes={("a", "fetch"): 0.3, ("b", "fetch"): 0.05, ("c", "fetch"): 0.05,
+                                           ("b", "patch"): 0.05, ("c", "patch"): 0.05})
+        project = mdProject.Project("flat.md", [createTarget("a"), createTarget("b"), createTarget("c")])
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        self.assertEquals(actor.maxRunningSteps["fetch"], 2, "Scheduler should fill but not exceed its fetch job slots")
+        self.assertEquals(actor.maxRunningSteps["patch"], 1, "Scheduler exceeded its target job slots")
+        self.assertTrue(actor.finished.index(("c", "install")) < actor.finished.index(("a", "fetch")),
+                        "Building c waited on the download of a")
+
+    def test_criticalPathStartsFirst(self):
+        #app depends on the slow chain boost <- trilinos, zlib is quick and has no dependents
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            options = createOptions(1)
+            options.buildHistory = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            options.buildHistory.recordStep("boost", "build", 600.0)
+            options.buildHistory.recordStep("trilinos", "build", 900.0)
+            options.buildHistory.recordStep("zlib", "build", 10.0)
+            options.buildHistory.recordStep("app", "build", 10.0)
+            targets = [createTarget("app", ["trilinos"]), createTarget("trilinos", ["boost"]), createTarget("zlib"), createTarget("boost")]
+            project = mdProject.Project("chain.md", targets)
+            actor = RecordingActor()
+            scheduler = mdScheduler.Scheduler(project, options, actor)
+            self.assertTrue(scheduler.run(), "Scheduler reported failure")
+            self.assertEquals(actor.started[0], ("boost", "fetch"), "Start of the critical path was not launched first")
+            self.assertEquals(scheduler.priorities["boost"], 1510.0, "Wrong critical path length for boost")
+            self.assertEquals(scheduler.priorities["zlib"], 10.0, "Wrong critical path length for zlib")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_memoryAdmission(self):
+        #Both builds peaked at 600MB last time, so only one fits into 1000MB at once
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            options = createOptions(2)
+            options.buildHistory = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            options.buildHistory.recordPeakMemory("a", "build", 600.0)
+            options.buildHistory.recordPeakMemory("b", "build", 600.0)
+            actor = RecordingActor(sleepTimes={("a", "build"): 0.1, ("b", "build"): 0.1})
+            project = mdProject.Project("flat.md", [createTarget("a"), createTarget("b")])
+            scheduler = mdScheduler.Scheduler(project, options, actor)
+            scheduler.admissionControl = mdResources.AdmissionControl(0, 1000, memoryFunction=lambda: None)
+            self.assertTrue(scheduler.run(), "Scheduler reported failure")
+            aBuild = (actor.events.index(("started", ("a", "build"))), actor.events.index(("finished", ("a", "build"))))
+            bBuild = (actor.events.index(("started", ("b", "build"))), actor.events.index(("finished", ("b", "build"))))
+            self.assertTrue(aBuild[1] < bBuild[0] or bBuild[1] < aBuild[0], "Builds of a and b exceeded the memory limit together")
+            self.assertEquals(actor.maxRunning, 2, "Steps without a recorded peak should run next to the builds")
+            self.assertEquals(scheduler.admissionControl.reservedMemory, 0, "Reservations were not released")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_memoryAdmissionScalesWithMakeJobs(self):
+        #300MB per compiler with four jobs each, the builds no longer fit into 1000MB together
+        tempDir = mdTestUtilities.makeTempDir()
+        try:
+            options = createOptions(2)
+            options.setDefine(mdStrings.mdDefineJobSlots, "4")
+            options.buildHistory = mdHistory.BuildHistory(tempDir + mdHistory.historyFileName)
+            options.buildHistory.recordPeakMemory("a", "build", 300.0)
+            options.buildHistory.recordPeakMemory("b", "build", 300.0)
+            actor = RecordingActor(sleepTimes={("a", "build"): 0.1, ("b", "build"): 0.1})
+            project = mdProject.Project("flat.md", [createTarget("a"), createTarget("b")])
+            scheduler = mdScheduler.Scheduler(project, options, actor)
+            scheduler.admissionControl = mdResources.AdmissionControl(0, 1000, memoryFunction=lambda: None)
+            self.assertTrue(scheduler.run(), "Scheduler reported failure")
+            aBuild = (actor.events.index(("started", ("a", "build"))), actor.events.index(("finished", ("a", "build"))))
+            bBuild = (actor.events.index(("started", ("b", "build"))), actor.events.index(("finished", ("b", "build"))))
+            self.assertTrue(aBuild[1] < bBuild[0] or bBuild[1] < aBuild[0], "Builds with several make jobs exceeded the memory limit together")
+        finally:
+            utilityFunctions.removeDir(tempDir)
+
+    def test_failFast(self):
+        options = createOptions(1)
+        actor = RecordingActor(failingSteps=[("d", "fetch")])
+        project = createDiamondProject()
+        self.assertFalse(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler should have reported failure")
+        self.assertEquals(actor.started, [("d", "fetch")], "Steps were started after a failure")
+
+    def test_failedStepStopsTarget(self):
+        options = createOptions(1, 1)
+        actor = RecordingActor(failingSteps=[("b", "unpack")])
+        project = createDiamondProject()
+        self.assertFalse(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler should have reported failure")
+        self.assertFalse(("b", "patch") in actor.started, "b was patched without its sources")
+        self.assertFalse(("a", "config") in actor.started, "a was configured after a failure")
+
+    def test_keepGoing(self):
+        #b fails, so a is blocked, while c and d are unaffected
+        options = createOptions(1)
+        options.keepGoing = True
+        actor = RecordingActor(failingSteps=[("b", "build")])
+        project = createDiamondProject()
+        scheduler = mdScheduler.Scheduler(project, options, actor)
+        self.assertFalse(scheduler.run(), "Scheduler should have reported failure")
+        self.assertEquals(scheduler.failedTargets, ["b"], "Wrong failed targets")
+        self.assertEquals(scheduler.blockedTargets, {"a": "b"}, "Wrong blocked targets")
+        self.assertTrue(("c", "install") in actor.finished, "Independent target c was not built")
+        self.assertFalse(("a", "config") in actor.started, "Blocked target a was configured")
+        self.assertFalse(("b", "install") in actor.started, "Failed target b kept going")
+
+    def test_keepGoingBlocksTransitively(self):
+        #app depends on lib, which depends on base; base failing blocks both, other is built
+        options = createOptions(2)
+        options.keepGoing = True
+        actor = RecordingActor(failingSteps=[("base", "config")])
+        targets = [createTarget("app", ["lib"]), createTarget("lib", ["base"]), createTarget("base"), createTarget("other")]
+        project = mdProject.Project("chain.md", targets)
+        scheduler = mdScheduler.Scheduler(project, options, actor)
+        self.assertFalse(scheduler.run(), "Scheduler should have reported failure")
+        self.assertEquals(scheduler.blockedTargets, {"app": "base", "lib": "base"}, "Dependents were not blocked transitively")
+        self.assertTrue(("other", "install") in actor.finished, "Independent target was not built")
+
+    def test_keepGoingSourceFailure(self):
+        #a's own fetch fails before d fails, a stays reported as failed rather than blocked
+        options = createOptions(1, 1)
+        options.keepGoing = True
+        actor = RecordingActor(failingSteps=[("d", "build"), ("a", "fetch")], sleepTimes={("d", "build"): 0.2})
+        project = createDiamondProject()
+        scheduler = mdScheduler.Scheduler(project, options, actor)
+        self.assertFalse(scheduler.run(), "Scheduler should have reported failure")
+        self.assertEquals(sorted(scheduler.failedTargets), ["a", "d"], "Wrong failed targets")
+        self.assertEquals(sorted(scheduler.blockedTargets.keys()), ["b", "c"], "Wrong blocked targets")
+
+    def test_selectedTargets(self):
+        #With dependents of b selected, d is left out and taken as already installed
+        options = createOptions(2)
+        actor = RecordingActor()
+        project = createDiamondProject()
+        self.assertTrue(project.selectTargets(["b"], True), "Target could not be selected")
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        self.assertEquals(sorted(actor.startedTargets()), ["a", "b"], "Wrong targets were built")
+        self.assertTrue(actor.events.index(("finished", ("b", "install"))) < actor.events.index(("started", ("a", "config"))),
+                        "a configured before its selected dependancy b was installed")
+
+    def test_cleanModeOnlyCleans(self):
+        options = createOptions(2, 2)
+        options.cleanTargets = True
+        actor = RecordingActor()
+        project = createDiamondProject()
+        self.assertTrue(mdScheduler.Scheduler(project, options, actor).run(), "Scheduler reported failure")
+        self.assertEquals(sorted(actor.finished), [("a", "clean"), ("b", "clean"), ("c", "clean"), ("d", "clean")],
+                          "Clean mode should only run the clean step")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdScheduler))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
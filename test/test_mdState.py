@@ -0,0 +1,142 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdCommands, mdLogger, mdOptions, mdState, mdTarget, utilityFunctions
+
+class Test_mdState(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.options = mdOptions.Options()
+        self.options.stateDatabase = mdState.StateDatabase(self.testDir + mdState.stateFileName)
+
+    def tearDown(self):
+        utilityFunctions.removeDir(self.testDir)
+
+    def createTarget(self, name, buildCommand):
+        os.mkdir(self.testDir + name)
+        target = mdTarget.Target(name, self.testDir + name)
+        target.outputPath = target.path
+        target.commands["build"] = buildCommand
+        return target
+
+    def test_recordsPersist(self):
+        database = self.options.stateDatabase
+        database.setRecord("Foo", "build", "abc", self.testDir)
+        reread = mdState.StateDatabase(self.testDir + mdState.stateFileName)
+        self.assertTrue(reread.isStepCurrent("foo", "build", "abc"), "Recorded step was not current after rereading state")
+        self.assertFalse(reread.isStepCurrent("foo", "build", "abd"), "Step with changed fingerprint was considered current")
+        reread.removeTarget("foo")
+        self.assertFalse(reread.hasTarget("foo"), "Target records were not removed")
+
+    def test_recordWithMissingPathIsNotCurrent(self):
+        database = self.options.stateDatabase
+        database.setRecord("foo", "unpack", "abc", self.testDir + "doesNotExist")
+        self.assertFalse(database.isStepCurrent("foo", "unpack", "abc"), "Step whose output no longer exists was considered current")
+
+    def test_fingerprintChangesWithCommand(self):
+        target = self.createTarget("foo", "touch built")
+        first = mdState.getStepFingerprint("build", target, "touch built")
+        second = mdState.getStepFingerprint("build", target, "touch built2")
+        self.assertNotEquals(first, second, "Changing a command did not change its fingerprint")
+
+    def test_configFingerprintIncludesDependancies(self):
+        dependancy = self.createTarget("dep", "")
+        target = self.createTarget("foo", "")
+        target.dependancyTargets = [dependancy]
+        dependancy.stepFingerprints["install"] = "1"
+        first = mdState.getStepFingerprint("config", target, "./configure")
+        build = mdState.getStepFingerprint("build", target, "make")
+        dependancy.stepFingerprints["install"] = "2"
+        self.assertNotEquals(first, mdState.getStepFingerprint("config", target, "./configure"), "Config fingerprint ignored its dependancies")
+        self.assertEquals(build, mdState.getStepFingerprint("build", target, "make"), "Only config should depend on dependancies")
+
+    def test_buildStepActorSkipsFinishedSteps(self):
+        target = self.createTarget("foo", "")
+        target.commands["config"] = "touch configured"
+        self.assertTrue(mdCommands.buildStepActor("config", target, self.options, False), "Config step failed")
+        self.assertTrue(os.path.exists(target.path + "/configured"), "Config step did not run")
+        os.remove(target.path + "/configured")
+
+        rerunTarget = mdTarget.Target("foo", target.path)
+        rerunTarget.outputPath = target.outputPath
+        rerunTarget.commands["config"] = "touch configured"
+        self.assertTrue(mdCommands.buildStepActor("config", rerunTarget, self.options, False), "Skipped config step failed")
+        self.assertFalse(os.path.exists(target.path + "/configured"), "Finished config step was run again")
+
+        rerunTarget = mdTarget.Target("foo", target.path)
+        rerunTarget.outputPath = target.outputPath
+        rerunTarget.commands["config"] = "touch configured again"
+        self.assertTrue(mdCommands.buildStepActor("config", rerunTarget, self.options, False), "Changed config step failed")
+        self.assertTrue(os.path.exists(target.path + "/again"), "Config step was not rerun after its command changed")
+
+    def test_buildStepActorAlwaysRunsBuild(self):
+        #The build system itself decides what is out of date in a kept build tree
+        target = self.createTarget("foo", "touch built")
+        self.assertTrue(mdCommands.buildStepActor("build", target, self.options, False), "Build step failed")
+        os.remove(target.path + "/built")
+
+        rerunTarget = mdTarget.Target("foo", target.path)
+        rerunTarget.outputPath = target.outputPath
+        rerunTarget.commands["build"] = "touch built"
+        self.assertTrue(mdCommands.buildStepActor("build", rerunTarget, self.options, False), "Rerun build step failed")
+        self.assertTrue(os.path.exists(target.path + "/built"), "Build step was not run again")
+
+    def test_buildStepActorSkipsCurrentInstall(self):
+        #Installs outside the tree, as into a prefix
+        installCommand = "touch " + self.testDir + "installed"
+        target = self.createTarget("foo", "true")
+        target.commands["install"] = installCommand
+        self.assertTrue(mdCommands.buildStepActor("build", target, self.options, False), "Build step failed")
+        self.assertTrue(mdCommands.buildStepActor("install", target, self.options, False), "Install step failed")
+        os.remove(self.testDir + "installed")
+
+        rerunTarget = self.createRerunTarget(target, installCommand)
+        self.assertTrue(mdCommands.buildStepActor("build", rerunTarget, self.options, False), "Rerun build step failed")
+        self.assertTrue(mdCommands.buildStepActor("install", rerunTarget, self.options, False), "Skipped install step failed")
+        self.assertFalse(os.path.exists(self.testDir + "installed"), "Install was run again after a build that changed nothing")
+
+        #Stands in for make recompiling after a source was edited in the kept tree
+        rerunTarget = self.createRerunTarget(target, installCommand)
+        self.assertTrue(mdCommands.buildStepActor("build", rerunTarget, self.options, False), "Rerun build step failed")
+        open(target.path + "/rebuilt", "w").close()
+        self.assertTrue(mdCommands.buildStepActor("install", rerunTarget, self.options, False), "Install step failed")
+        self.assertTrue(os.path.exists(self.testDir + "installed"), "Install was not run again after the build changed the tree")
+
+    def createRerunTarget(self, target, installCommand):
+        rerunTarget = mdTarget.Target("foo", target.path)
+        rerunTarget.outputPath = target.outputPath
+        rerunTarget.commands["build"] = "true"
+        rerunTarget.commands["install"] = installCommand
+        return rerunTarget
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdState))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -24,9 +24,18 @@ import os, sys, unittest, mdTestUtilities
 
 if not ".." in sys.path:
     sys.path.append("..")
-import mdLogger, mdSvn, utilityFunctions
+import mdLogger, mdSvn, mdTools, utilityFunctions
 
 class Test_mdSvn(unittest.TestCase):
+    def setUp(self):
+        #Tool probes are cached in the state directory, not the developer's
+        self.stateDir = mdTestUtilities.makeTempDir()
+        mdTools.setStateDir(self.stateDir)
+
+    def tearDown(self):
+        mdTools.setStateDir("")
+        utilityFunctions.removeDir(self.stateDir)
+
     def _test_extractCvs(self):
         if not mdCvs.isCvsInstalled():
             self.fail("Cvs is not installed on your system.  All Cvs tests will fail.")
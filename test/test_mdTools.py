@@ -0,0 +1,92 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import json, os, sys, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdLogger, mdTools, utilityFunctions
+
+class Test_mdTools(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        mdTools.setStateDir(self.testDir)
+        self.originalPath = os.environ["PATH"]
+
+    def tearDown(self):
+        os.environ["PATH"] = self.originalPath
+        mdTools.setStateDir("")
+        utilityFunctions.removeDir(self.testDir)
+
+    def readCache(self):
+        cacheFile = open(mdTools.getToolCachePath(), "r")
+        try:
+            return json.load(cacheFile)
+        finally:
+            cacheFile.close()
+
+    def writeCache(self, cache):
+        cacheFile = open(mdTools.getToolCachePath(), "w")
+        try:
+            json.dump(cache, cacheFile)
+        finally:
+            cacheFile.close()
+
+    def test_findExecutable(self):
+        self.assertNotEquals(mdTools.findExecutable("sh"), "", "Failed to find sh on PATH")
+        self.assertEquals(mdTools.findExecutable("mixdownDoesNotExist"), "", "Found executable that does not exist")
+
+    def test_missingToolIsNotProbed(self):
+        self.assertFalse(mdTools.isToolInstalled("mixdownDoesNotExist", "mixdownDoesNotExist --help"), "Missing tool reported as installed")
+        self.assertFalse(os.path.exists(mdTools.getToolCachePath()), "Missing tool should not need a probe to be cached")
+
+    def test_probeIsCached(self):
+        self.assertTrue(mdTools.isToolInstalled("sh", "sh -c true"), "sh reported as not installed")
+        cache = self.readCache()
+        self.assertEquals(cache["path"], os.environ["PATH"], "Cache was not keyed on PATH")
+        self.assertTrue(cache["tools"]["sh"]["installed"], "Probe result was not cached")
+
+        #A cached entry is trusted without probing again
+        cache["tools"]["sh"]["installed"] = False
+        self.writeCache(cache)
+        self.assertFalse(mdTools.isToolInstalled("sh", "sh -c true"), "Cached probe result was not used")
+
+        #Changing PATH invalidates every entry
+        os.environ["PATH"] = self.originalPath + os.pathsep + self.testDir
+        self.assertTrue(mdTools.isToolInstalled("sh", "sh -c true"), "Tool was not probed again after PATH changed")
+
+    def test_changedExecutableIsProbedAgain(self):
+        self.assertTrue(mdTools.isToolInstalled("sh", "sh -c true"), "sh reported as not installed")
+        cache = self.readCache()
+        cache["tools"]["sh"]["installed"] = False
+        cache["tools"]["sh"]["mtime"] -= 1
+        self.writeCache(cache)
+        self.assertTrue(mdTools.isToolInstalled("sh", "sh -c true"), "Tool was not probed again after its binary changed")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_mdTools))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
@@ -0,0 +1,179 @@
+# Copyright (c) 2010, Lawrence Livermore National Security, LLC
+# Produced at Lawrence Livermore National Laboratory
+# LLNL-CODE-462894
+# All rights reserved.
+#
+# This file is part of MixDown. Please read the COPYRIGHT file
+# for Our Notice and the LICENSE file for the GNU Lesser General Public
+# License.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License (as published by
+# the Free Software Foundation) version 3 dated June 2007.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the IMPLIED WARRANTY OF
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the terms and
+# conditions of the GNU Lesser General Public License for more details.
+#
+#  You should have recieved a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+import os, StringIO, sys, tarfile, unittest, mdTestUtilities
+
+if not ".." in sys.path:
+    sys.path.append("..")
+import mdLogger, utilityFunctions
+
+def addFile(tar, name, contents=""):
+    info = tarfile.TarInfo(name)
+    info.size = len(contents)
+    info.mode = 0644
+    tar.addfile(info, StringIO.StringIO(contents))
+
+def addDir(tar, name, mode=0755):
+    info = tarfile.TarInfo(name)
+    info.type = tarfile.DIRTYPE
+    info.mode = mode
+    tar.addfile(info)
+
+def addHardLink(tar, name, linkName):
+    info = tarfile.TarInfo(name)
+    info.type = tarfile.LNKTYPE
+    info.linkname = linkName
+    tar.addfile(info)
+
+class Test_utilityFunctions(unittest.TestCase):
+    def setUp(self):
+        self.testDir = mdTestUtilities.makeTempDir()
+        self.tarPath = self.testDir + "test.tar.gz"
+        self.outPath = self.testDir + "out/"
+
+    def tearDown(self):
+        utilityFunctions.removeDir(self.testDir)
+
+    def createTar(self):
+        return tarfile.open(self.tarPath, "w:gz")
+
+    def test_untarStripsTopDir(self):
+        tar = self.createTar()
+        addDir(tar, "test-1.0")
+        addFile(tar, "test-1.0/" + mdTestUtilities.testFileName, "contents")
+        addDir(tar, "test-1.0/src")
+        addFile(tar, "test-1.0/src/main.c")
+        tar.close()
+        utilityFunctions.untar(self.tarPath, self.outPath, True)
+        self.assertEquals(open(self.outPath + mdTestUtilities.testFileName).read(), "contents", "Top directory was not stripped")
+        self.assertTrue(os.path.isfile(self.outPath + "src/main.c"), "Nested file was not extracted")
+        self.assertFalse(os.path.exists(self.outPath + "test-1.0"), "Top directory should not have been extracted")
+
+    def test_untarWithoutStripping(self):
+        tar = self.createTar()
+        addFile(tar, "test-1.0/" + mdTestUtilities.testFileName)
+        tar.close()
+        utilityFunctions.untar(self.tarPath, self.outPath)
+        self.assertTrue(os.path.isfile(self.outPath + "test-1.0/" + mdTestUtilities.testFileName), "File was not extracted")
+
+    def test_untarSeveralTopDirs(self):
+        #Members already stripped have to end up back under their top directory
+        tar = self.createTar()
+        addDir(tar, "a")
+        addFile(tar, "a/one")
+        addDir(tar, "a/sub")
+        addFile(tar, "a/sub/two")
+        addFile(tar, "b/three")
+        tar.close()
+        utilityFunctions.untar(self.tarPath, self.outPath, True)
+        self.assertEquals(sorted(os.listdir(self.outPath)), ["a", "b"], "Top directories were not kept")
+        self.assertTrue(os.path.isfile(self.outPath + "a/one"), "a/one was not moved back under a")
+        self.assertTrue(os.path.isfile(self.outPath + "a/sub/two"), "a/sub/two was not moved back under a")
+        self.assertTrue(os.path.isfile(self.outPath + "b/three"), "b/three was not extracted")
+
+    def test_untarStripsHardLinks(self):
+        tar = self.createTar()
+        addFile(tar, "test/original", "contents")
+        addHardLink(tar, "test/link", "test/original")
+        tar.close()
+        utilityFunctions.untar(self.tarPath, self.outPath, True)
+        self.assertEquals(open(self.outPath + "link").read(), "contents", "Hard link was not extracted")
+        self.assertEquals(os.stat(self.outPath + "link").st_ino, os.stat(self.outPath + "original").st_ino,
+                          "Hard link does not point at the stripped member")
+
+    def test_untarReadOnlyDir(self):
+        tar = self.createTar()
+        addDir(tar, "test/readonly", 0555)
+        addFile(tar, "test/readonly/file")
+        tar.close()
+        try:
+            utilityFunctions.untar(self.tarPath, self.outPath, True)
+            self.assertTrue(os.path.isfile(self.outPath + "readonly/file"), "File in a read only directory was not extracted")
+            self.assertEquals(os.stat(self.outPath + "readonly").st_mode & 0777, 0555, "Directory mode was not restored")
+        finally:
+            os.chmod(self.outPath + "readonly", 0755)
+
+    def test_untarRejectsUnsafePaths(self):
+        for name in ["../escaped", "/tmp/escaped", "test/../../escaped"]:
+            tar = self.createTar()
+            addFile(tar, name)
+            tar.close()
+            self.assertRaises(tarfile.TarError, utilityFunctions.untar, self.tarPath, self.outPath, True)
+            self.assertFalse(os.path.exists(self.testDir + "escaped"), "Member was written outside of the extraction directory")
+
+    def createTree(self, path):
+        os.makedirs(path + "sub")
+        mdTestUtilities.createBlankFile(path + "sub/" + mdTestUtilities.testFileName)
+
+    def test_removeDirInBackground(self):
+        trashDir = utilityFunctions.getTrashDir(self.testDir + "mdBuild")
+        path = self.testDir + "mdBuild/target/"
+        self.createTree(path)
+        utilityFunctions.removeDirInBackground(path, trashDir)
+        self.assertFalse(os.path.exists(path), "Directory was still in place after returning")
+        os.mkdir(path)
+        utilityFunctions.waitForBackgroundRemovals()
+        self.assertEquals(os.listdir(trashDir), [], "Trashed directory was not deleted")
+        self.assertEquals(os.listdir(path), [], "Directory recreated at the same path was touched")
+
+    def test_removeBuildDirInBackground(self):
+        #The build directory holds the trash, so only its contents are trashed
+        buildDir = self.testDir + "mdBuild/"
+        trashDir = utilityFunctions.getTrashDir(buildDir)
+        self.createTree(buildDir + "target/")
+        mdTestUtilities.createBlankFile(buildDir + "state.json")
+        utilityFunctions.removeDirInBackground(buildDir, trashDir)
+        self.assertEquals(os.listdir(buildDir), [utilityFunctions.trashDirName], "Build directory contents were not trashed")
+        utilityFunctions.waitForBackgroundRemovals()
+        self.assertEquals(os.listdir(trashDir), [], "Trashed contents were not deleted")
+        self.assertEquals(sorted(os.listdir(self.testDir)), ["mdBuild"], "Trash was left outside the build directory")
+
+    def test_emptyTrash(self):
+        #Left behind by a run that exited before its background removal finished
+        trashDir = utilityFunctions.getTrashDir(self.testDir + "mdBuild")
+        self.createTree(trashDir + "/build-leftover/contents/")
+        utilityFunctions.emptyTrash(trashDir)
+        utilityFunctions.waitForBackgroundRemovals()
+        self.assertEquals(os.listdir(trashDir), [], "Leftover trash was not deleted")
+
+    def test_removeDirInBackgroundFile(self):
+        mdTestUtilities.createBlankFile(self.testDir + "file")
+        self.assertRaises(IOError, utilityFunctions.removeDirInBackground, self.testDir + "file/", self.testDir + "mdBuild/.mdTrash")
+
+    def test_executeSubProcessResourceUsage(self):
+        scriptPath = self.testDir + "allocate.py"
+        scriptFile = open(scriptPath, "w")
+        scriptFile.write("import sys\nblock = 'x' * (64 * 1024 * 1024)\nsys.exit(3)\n")
+        scriptFile.close()
+        resourceUsage = dict()
+        returnCode = utilityFunctions.executeSubProcess(sys.executable + " " + scriptPath, self.testDir, resourceUsage=resourceUsage)
+        self.assertEquals(returnCode, 3, "Exit code of the process was not returned")
+        self.assertTrue(resourceUsage["peakMemory"] >= 64, "Peak memory of the process was not recorded")
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(Test_utilityFunctions))
+    return suite
+
+if __name__ == "__main__":
+    mdLogger.SetLogger("Console")
+    unittest.main()
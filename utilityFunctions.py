@@ -20,7 +20,10 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
 
-import os, Queue, shutil, sys, tarfile, tempfile, urllib2, subprocess
+import copy, errno, os, Queue, shutil, sys, tarfile, tempfile, threading, urlparse, subprocess, mdCompression
+
+trashDirName = ".mdTrash"
+__backgroundRemovals = []
 
 def executeCommand(command, args="", workingDirectory="", verbose=False, exitOnError=False):
     try:
@@ -36,7 +39,7 @@ def executeCommand(command, args="", workingDirectory="", verbose=False, exitOnE
     finally:
         os.chdir(lastcwd)
 
-def executeSubProcess(command, workingDirectory="/tmp", outFileHandle=1, verbose=False, exitOnError=False):
+def executeSubProcess(command, workingDirectory="/tmp", outFileHandle=1, verbose=False, exitOnError=False, environment=None, resourceUsage=None):
     if verbose:
         print "Executing: " + command + ": Working Directory: " + workingDirectory
     tempArgs = command.split(" ")
@@ -45,12 +48,31 @@ def executeSubProcess(command, workingDirectory="/tmp", outFileHandle=1, verbose
         arg = arg.strip()
         if arg != "":
             args.append(arg)
-    process = subprocess.Popen(args, stdout=outFileHandle, stderr=outFileHandle, cwd=workingDirectory)
-    process.wait()
+    #close_fds stays False so jobserver pipes are inherited by make
+    process = subprocess.Popen(args, stdout=outFileHandle, stderr=outFileHandle, cwd=workingDirectory, env=environment, close_fds=False)
+    if resourceUsage == None:
+        process.wait()
+    else:
+        __waitWithResourceUsage(process, resourceUsage)
     if exitOnError and process.returncode != 0:
         printErrorAndExit("Command '" + command + "': exited with error code " + str(process.returncode))
     return process.returncode
 
+def __waitWithResourceUsage(process, resourceUsage):
+    #ru_maxrss is the largest resident set of the process or any descendant it waited on, in kilobytes
+    while True:
+        try:
+            pid, status, usage = os.wait4(process.pid, 0)
+            break
+        except OSError, e:
+            if e.errno != errno.EINTR:
+                raise
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    resourceUsage["peakMemory"] = usage.ru_maxrss / 1024.0
+
 def findShallowestFile(startPath, fileList):
     q = Queue.Queue()
     q.put(startPath)
@@ -63,6 +85,12 @@ def findShallowestFile(startPath, fileList):
             elif item in fileList:
                 return currPath + item # success
 
+def getStateDir():
+    #Per-user directory for data that outlives a single build, such as caches
+    if "MIXDOWN_HOME" in os.environ and os.environ["MIXDOWN_HOME"].strip() != "":
+        return includeTrailingPathDelimiter(os.environ["MIXDOWN_HOME"].strip())
+    return includeTrailingPathDelimiter(os.path.expanduser("~/.mixdown"))
+
 def getBasename(path):
     basename = os.path.basename(path)
     if not os.path.isdir(path):
@@ -92,11 +120,12 @@ def includeTrailingPathDelimiter(path):
     return path
 
 def isURL(url):
-    try:
-        f = urllib2.urlopen(url)
-        return True
-    except:
+    #Decided by syntax alone, whether the location can be reached is found out when fetching
+    parsed = urlparse.urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    if not scheme in ("http", "https", "ftp", "file"):
         return False
+    return parsed.netloc != "" or scheme == "file"
 
 def prettyPrintList(list, header="", headerIndent="", itemIndent=""):
     retStr = headerIndent + header
@@ -125,6 +154,64 @@ def removeDir(path):
     if os.path.exists(path):
         shutil.rmtree(path)
 
+def removeDirInBackground(path, trashDir):
+    #Renaming into trashDir is atomic and instant, the slow delete of the renamed tree happens
+    # in a background thread. Trash left by an interrupted run is finished by emptyTrash.
+    if (path[len(path)-1:] == '/') and os.path.isfile(path[:len(path)-1]):
+        raise IOError("Error: Cannot clean directory '" + path + "' : File (not directory) exists by the same name.")
+    if not os.path.exists(path):
+        return
+    path = os.path.abspath(stripTrailingPathDelimiter(path))
+    trashDir = os.path.abspath(stripTrailingPathDelimiter(trashDir))
+    if path == os.path.dirname(trashDir):
+        #The directory holding the trash stays, everything else in it is trashed
+        for item in os.listdir(path):
+            if os.path.join(path, item) != trashDir:
+                __moveToTrash(os.path.join(path, item), trashDir)
+    else:
+        __moveToTrash(path, trashDir)
+
+def __moveToTrash(path, trashDir):
+    if not os.path.isdir(trashDir):
+        try:
+            os.makedirs(trashDir)
+        except OSError:
+            if not os.path.isdir(trashDir):
+                raise
+    trashPath = tempfile.mkdtemp(prefix=os.path.basename(path) + "-", dir=trashDir)
+    try:
+        os.rename(path, os.path.join(trashPath, "contents"))
+    except OSError:
+        #Mount points and other filesystems cannot be renamed into the trash
+        os.rmdir(trashPath)
+        if os.path.isdir(path) and not os.path.islink(path):
+            removeDir(path)
+        else:
+            os.remove(path)
+        return
+    __startBackgroundRemoval(trashPath)
+
+def emptyTrash(trashDir):
+    if not os.path.isdir(trashDir):
+        return
+    for item in os.listdir(trashDir):
+        __startBackgroundRemoval(os.path.join(trashDir, item))
+
+def getTrashDir(buildDir):
+    #Kept inside the build directory so MixDown leaves nothing behind outside its own directories
+    return includeTrailingPathDelimiter(os.path.abspath(buildDir)) + trashDirName
+
+def waitForBackgroundRemovals():
+    while len(__backgroundRemovals) > 0:
+        __backgroundRemovals.pop().join()
+
+def __startBackgroundRemoval(path):
+    #MixDown waits for these before exiting, whatever an interrupted run leaves stays in the trash
+    thread = threading.Thread(target=shutil.rmtree, args=(path, True))
+    thread.daemon = True
+    thread.start()
+    __backgroundRemovals.append(thread)
+
 def splitFileName(fileName):
     basename = fileName
     version = ""
@@ -162,23 +249,93 @@ def stripTrailingPathDelimiter(path):
     return path
 
 def untar(tarPath, outPath = "", stripDir=False):
-    if stripDir:
-        unTarOutpath = tempfile.mkdtemp()
-    else:
-        unTarOutpath = outPath
+    tar, process = mdCompression.openTar(tarPath)
+    try:
+        untarStream(tar, outPath, stripDir)
+    except:
+        mdCompression.closeTar(tar, process, False)
+        raise
+    mdCompression.closeTar(tar, process)
 
-    tar = tarfile.open(tarPath, "r")
-    for item in tar:
-        #TODO: check for relative path's
-        tar.extract(item, unTarOutpath)
+def untarStream(tar, outPath = "", stripDir=False):
+    #Single pass over a stream opened tar, members are written straight into outPath.  When stripping,
+    # the archive's top directory is removed from each name as it is written instead of extracting
+    # to a temporary directory and moving the tree, which is a full copy across filesystems.
+    if outPath == "":
+        outPath = os.getcwd()
+    if not os.path.isdir(outPath):
+        os.makedirs(outPath)
+    topDir = None
+    topDirMember = None
+    extractedNames = set()
+    directories = []
+    for member in tar:
+        parts = __splitTarMemberName(member.name)
+        if len(parts) == 0:
+            continue
+        if stripDir:
+            if topDir == None:
+                if len(parts) == 1 and not member.isdir():
+                    stripDir = False
+                else:
+                    topDir = parts[0]
+            elif parts[0] != topDir:
+                #Not a single top directory after all, put what was stripped back under it
+                __moveTarMembersIntoDir(outPath, extractedNames, topDir)
+                for directory in directories:
+                    directory.name = topDir + "/" + directory.name
+                if topDirMember != None:
+                    directories.append(topDirMember)
+                stripDir = False
+        if stripDir:
+            parts = parts[1:]
+            if member.islnk():
+                linkParts = __splitTarMemberName(member.linkname)
+                if len(linkParts) > 1 and linkParts[0] == topDir:
+                    member.linkname = "/".join(linkParts[1:])
+            if len(parts) == 0:
+                if member.isdir():
+                    topDirMember = member
+                    member.name = topDir
+                continue
+            extractedNames.add(parts[0])
+        member.name = "/".join(parts)
+        if member.isdir():
+            #Like TarFile.extractall, directories stay writable until every member is extracted
+            directories.append(member)
+            member = copy.copy(member)
+            member.mode = 0700
+        tar.extract(member, outPath)
 
-    if stripDir:
-        dirList = os.listdir(unTarOutpath)
-        if len(dirList) == 1:
-            src = includeTrailingPathDelimiter(unTarOutpath) + dirList[0]
-        else:
-            src = includeTrailingPathDelimiter(unTarOutpath)
-        shutil.move(src, outPath)
+    directories.sort(key=lambda directory: directory.name, reverse=True)
+    for directory in directories:
+        directoryPath = os.path.join(outPath, directory.name)
+        try:
+            tar.chown(directory, directoryPath)
+            tar.utime(directory, directoryPath)
+            tar.chmod(directory, directoryPath)
+        except tarfile.ExtractError:
+            if tar.errorlevel > 1:
+                raise
+
+def __splitTarMemberName(name):
+    if os.path.isabs(name):
+        raise tarfile.TarError("Tar member has an absolute path, " + name)
+    parts = []
+    for part in os.path.normpath(name).split("/"):
+        if part == "..":
+            raise tarfile.TarError("Tar member points outside of the extraction directory, " + name)
+        if part != "" and part != ".":
+            parts.append(part)
+    return parts
+
+def __moveTarMembersIntoDir(outPath, names, dirName):
+    #Renames within outPath, nothing is copied
+    tempDir = tempfile.mkdtemp(dir=outPath)
+    os.chmod(tempDir, 0755)
+    for name in names:
+        os.rename(os.path.join(outPath, name), os.path.join(tempDir, name))
+    os.rename(tempDir, os.path.join(outPath, dirName))
 
 def URLToFilename(url):
     filename = url[(str.rfind(url, "/")+1):]